@@ -0,0 +1 @@
+"""Load tests of Buzzing against a fake Telegram Bot API server."""
@@ -0,0 +1,53 @@
+"""Command line of the benchmark suite.
+
+Run ``python -m benchmarks --help`` for the options, e.g.::
+
+    python -m benchmarks --bots 20 --subscribers 500 --label baseline
+    python -m benchmarks --compare benchmarks/results/20260101-120000-baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+from dataclasses import fields
+from benchmarks.harness import RESULTS_DIR, BenchmarkConfig, compare, run_benchmark, save_results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Load test Buzzing against a fake Telegram Bot API.')
+    defaults = BenchmarkConfig()
+    for field in fields(BenchmarkConfig):
+        option = '--' + field.name.replace('_', '-')
+        default = getattr(defaults, field.name)
+        if isinstance(default, bool):
+            parser.add_argument(option, action='store_true', help=f'default: {default}')
+        else:
+            parser.add_argument(option, type=type(default), default=default, help=f'default: {default}')
+    parser.add_argument('--label', help='Suffix of the results file, e.g. a version or branch')
+    parser.add_argument('--output', default=RESULTS_DIR, help=f'Directory of the results (default: {RESULTS_DIR})')
+    parser.add_argument('--compare', metavar='RESULTS', help='Results file of an earlier run to compare with')
+    parser.add_argument('--verbose', action='store_true', help="Show Buzzing's logs")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s [%(levelname)-5.5s] %(name)s: %(message)s')
+    config = BenchmarkConfig(**{field.name: getattr(args, field.name) for field in fields(BenchmarkConfig)})
+    results = asyncio.run(run_benchmark(config))
+    path = save_results(config, results, args.output, args.label)
+    print(json.dumps(results, indent=2))
+    print(f'Results written to {path}')
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        with open(path) as current_file:
+            current = json.load(current_file)
+        print(f'\nCompared with {args.compare}:')
+        print('\n'.join(compare(baseline, current)))
+
+
+if __name__ == '__main__':
+    main()
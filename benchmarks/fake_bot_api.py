@@ -0,0 +1,210 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+from buzzing.util.http_server import HTTPServer, Request, Response
+
+LOG = logging.getLogger(__name__)
+
+# Longest getUpdates long poll the fake holds, whatever the client asks for
+MAX_POLL_TIMEOUT = 1.0
+
+
+@dataclass(frozen=True)
+class SentMessage:
+    """A message received by the fake's sendMessage.
+
+    Attributes:
+        token: Token of the sending bot
+        chat_id: Recipient chat
+        text: Message text
+        received: ``time.perf_counter()`` when the request arrived
+    """
+    token: str
+    chat_id: int
+    text: str
+    received: float
+
+
+class FakeBotApi:
+    """Local stand-in for the Telegram Bot API, for load tests.
+
+    Serves ``getMe``, ``getUpdates``, ``sendMessage``, ``deleteWebhook`` and
+    ``setWebhook`` for the bots added to it, at ``/bot<token>/<method>``. Point
+    bots at it with ``BotsInteractor(api_url=fake.url)``. Every call is
+    delayed by ``latency`` plus up to ``jitter`` seconds. A share of
+    sendMessage calls is answered with 429 (``rate_limited``) or 500
+    (``failure_rate``). Updates pushed with ``push_update`` are returned by
+    the next getUpdates of the bot.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, rate_limited: float = 0.0, retry_after: int = 1,
+                 failure_rate: float = 0.0, seed: Optional[int] = None) -> None:
+        """Initialize the fake. Nothing is bound until start().
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on; 0 picks a free port
+            latency: Seconds every call takes
+            jitter: Up to this many random seconds added to the latency
+            rate_limited: Share of sendMessage calls answered with 429
+            retry_after: ``retry_after`` seconds of the 429 answers
+            failure_rate: Share of sendMessage calls answered with 500
+            seed: Seed of the random generator, for repeatable runs
+        """
+        self.server = HTTPServer(host, port)
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limited = rate_limited
+        self.retry_after = retry_after
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.sent: List[SentMessage] = []
+        self.calls: Dict[str, int] = {}
+        self.rejected = 0
+        self.failed = 0
+        self._updates: Dict[str, List[Dict[str, Any]]] = {}
+        self._update_ids: Dict[str, int] = {}
+        self._new_updates: Dict[str, asyncio.Event] = {}
+        self._waiters: Dict[Tuple[str, int], asyncio.Future] = {}
+        self._message_ids = 0
+        self._closing = asyncio.Event()
+
+    @property
+    def url(self) -> str:
+        """Base URL to pass as ``api_url``; valid once started."""
+        return f'http://{self.server.host}:{self.server.port}'
+
+    async def start(self) -> None:
+        """Start serving."""
+        self._closing.clear()
+        await self.server.start()
+
+    async def stop(self) -> None:
+        """Release pending long polls and stop serving."""
+        self._closing.set()
+        for event in self._new_updates.values():
+            event.set()
+        await self.server.stop()
+
+    def add_bot(self, token: str, bot_id: int, username: str) -> None:
+        """Serve the API of a bot."""
+        methods: Dict[str, Callable[[str, Dict[str, Any]], Awaitable[Any]]] = {
+            'getMe': lambda token, params: self._get_me(bot_id, username),
+            'getUpdates': self._get_updates,
+            'sendMessage': self._send_message,
+            'deleteWebhook': self._set_true,
+            'setWebhook': self._set_true,
+        }
+        self._updates[token] = []
+        self._update_ids[token] = 0
+        self._new_updates[token] = asyncio.Event()
+        for method, handler in methods.items():
+            self.server.route('POST', f'/bot{token}/{method}', self._endpoint(token, method, handler))
+
+    def push_update(self, token: str, chat_id: int, text: str) -> int:
+        """Queue a private message to a bot, as if a user had sent it.
+
+        Returns:
+            The update ID
+        """
+        update_id = self._update_ids[token] = self._update_ids[token] + 1
+        entities = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}] \
+            if text.startswith('/') else []
+        user = {'id': chat_id, 'is_bot': False, 'first_name': f'user{chat_id}'}
+        self._updates[token].append({'update_id': update_id, 'message': {
+            'message_id': update_id, 'date': int(time.time()), 'text': text, 'entities': entities,
+            'from': user, 'chat': {'id': chat_id, 'type': 'private', 'first_name': user['first_name']}}})
+        self._new_updates[token].set()
+        return update_id
+
+    def wait_for_message(self, token: str, chat_id: int) -> 'asyncio.Future[SentMessage]':
+        """Return a future resolved by the next message a bot sends to a chat."""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[(token, chat_id)] = future
+        return future
+
+    def _endpoint(self, token: str, method: str,
+                  handler: Callable[[str, Dict[str, Any]], Awaitable[Any]]) -> Callable[[Request], Awaitable[Response]]:
+        async def endpoint(request: Request) -> Response:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                result = await handler(token, self._params(request))
+            except _ApiError as e:
+                return _reply(e.status, {'ok': False, 'error_code': e.status, 'description': e.description,
+                                         **({'parameters': e.parameters} if e.parameters else {})})
+            return _reply(200, {'ok': True, 'result': result})
+        return endpoint
+
+    @staticmethod
+    def _params(request: Request) -> Dict[str, Any]:
+        if request.headers.get('content-type', '').startswith('application/json'):
+            return json.loads(request.body or b'{}')
+        params: Dict[str, Any] = {}
+        # The Bot API client form-encodes parameters, JSON-encoding non-strings
+        for name, value in parse_qsl(request.body.decode()):
+            try:
+                params[name] = json.loads(value)
+            except ValueError:
+                params[name] = value
+        return params
+
+    async def _get_me(self, bot_id: int, username: str) -> Dict[str, Any]:
+        return {'id': bot_id, 'is_bot': True, 'first_name': username, 'username': username,
+                'can_join_groups': False, 'can_read_all_group_messages': False, 'supports_inline_queries': False}
+
+    async def _set_true(self, token: str, params: Dict[str, Any]) -> bool:
+        return True
+
+    async def _get_updates(self, token: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        offset = int(params.get('offset') or 0)
+        pending = self._updates[token] = [u for u in self._updates[token] if u['update_id'] >= offset]
+        if not pending and not self._closing.is_set():
+            event = self._new_updates[token]
+            event.clear()
+            timeout = min(float(params.get('timeout') or 0), MAX_POLL_TIMEOUT)
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return list(self._updates[token])
+
+    async def _send_message(self, token: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        draw = self.random.random()
+        if draw < self.rate_limited:
+            self.rejected += 1
+            raise _ApiError(429, f'Too Many Requests: retry after {self.retry_after}',
+                            {'retry_after': self.retry_after})
+        if draw < self.rate_limited + self.failure_rate:
+            self.failed += 1
+            raise _ApiError(500, 'Internal Server Error')
+        chat_id = int(params['chat_id'])
+        text = str(params.get('text', ''))
+        message = SentMessage(token, chat_id, text, time.perf_counter())
+        self.sent.append(message)
+        waiter = self._waiters.pop((token, chat_id), None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(message)
+        self._message_ids += 1
+        return {'message_id': self._message_ids, 'date': int(time.time()), 'text': text,
+                'chat': {'id': chat_id, 'type': 'private'}}
+
+
+class _ApiError(Exception):
+    def __init__(self, status: int, description: str, parameters: Optional[Dict[str, Any]] = None) -> None:
+        super().__init__(description)
+        self.status = status
+        self.description = description
+        self.parameters = parameters
+
+
+def _reply(status: int, payload: Dict[str, Any]) -> Response:
+    return Response(status, json.dumps(payload).encode(), content_type='application/json')
@@ -0,0 +1,259 @@
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from importlib import metadata
+from typing import Any, Dict, List, Optional, Sequence
+from benchmarks.fake_bot_api import FakeBotApi
+from buzzing.bots_manager.bots_interactor import BotsInteractor
+from buzzing.dao.migrator import configure_connection, migrate
+
+LOG = logging.getLogger(__name__)
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+# First chat ID of the users sending updates; subscribers use 1..M
+UPDATE_CHAT_BASE = 10_000_000
+
+
+@dataclass(frozen=True)
+class BenchmarkConfig:
+    """Parameters of one benchmark run.
+
+    Attributes:
+        bots: Number of bots
+        subscribers: Subscribers per bot
+        broadcasts: Broadcasts sent by every bot
+        updates: Commands sent to the bots, spread over them round-robin
+        latency: Seconds every fake Bot API call takes
+        jitter: Up to this many random seconds added to the latency
+        rate_limited: Share of sends answered with 429
+        failure_rate: Share of sends answered with 500
+        concurrency: Sends in flight per bot
+        telegram_limits: Apply Telegram's rate limits (30 msg/s per bot, 1 per
+            chat); off by default so the run measures Buzzing, not the limits
+        seed: Seed of the fake's random generator
+    """
+    bots: int = 10
+    subscribers: int = 100
+    broadcasts: int = 3
+    updates: int = 100
+    latency: float = 0.0
+    jitter: float = 0.0
+    rate_limited: float = 0.0
+    failure_rate: float = 0.0
+    concurrency: int = 16
+    telegram_limits: bool = False
+    seed: int = 0
+
+
+def percentile(values: Sequence[float], share: float) -> Optional[float]:
+    """Return the value below which ``share`` of the values fall, by nearest rank."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(share * len(ordered))) - 1))]
+
+
+def latency_summary(values: Sequence[float]) -> Dict[str, Optional[float]]:
+    """Return mean, p50, p99 and max of latencies in milliseconds."""
+    def ms(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value * 1000, 3)
+    return {'mean_ms': ms(statistics.fmean(values)) if values else None,
+            'p50_ms': ms(percentile(values, 0.5)), 'p99_ms': ms(percentile(values, 0.99)),
+            'max_ms': ms(max(values)) if values else None}
+
+
+def rss_mb() -> float:
+    """Return the resident memory of the process in MiB."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        # No procfs; ru_maxrss is the peak, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if platform.system() == 'Darwin' else peak / 2 ** 10
+
+
+def create_database(path: str, config: BenchmarkConfig) -> sqlite3.Connection:
+    """Create a database with the bots and subscribers of a run."""
+    connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    configure_connection(connection)
+    migrate(connection)
+    broadcast: Dict[str, Any] = {'concurrency': config.concurrency}
+    if not config.telegram_limits:
+        broadcast.update(global_rate=1e9, per_chat_rate=1e9)
+    bot_metadata = json.dumps({'broadcast': broadcast})
+    connection.execute('BEGIN')
+    connection.executemany(
+        'INSERT INTO bots_config (name, description, token, password, entry_module, entry_class, metadata, is_active) '
+        "VALUES (?, ?, ?, 'password', 'buzzing.bots.test_bot', 'TestBot', ?, 1)",
+        [(f'bench_{i}', f'Benchmark bot {i}', bot_token(i), bot_metadata) for i in range(config.bots)])
+    bot_ids = [row[0] for row in connection.execute('SELECT id FROM bots_config ORDER BY id')]
+    connection.executemany(
+        'INSERT INTO subscription (user_id, username, bot_id, is_active) VALUES (?, ?, ?, 1)',
+        [(user_id, f'user{user_id}', bot_id) for bot_id in bot_ids for user_id in range(1, config.subscribers + 1)])
+    connection.execute('COMMIT')
+    return connection
+
+
+def bot_token(index: int) -> str:
+    """Return the fake token of the bot with a given index."""
+    return f'{100000 + index}:bench-token-{index}'
+
+
+async def run_benchmark(config: BenchmarkConfig) -> Dict[str, Any]:
+    """Run Buzzing against the fake Bot API and measure it.
+
+    Measures startup time, broadcast throughput and send latency, the
+    latency from a user's command to the bot's reply, and resident memory.
+
+    Returns:
+        The results, as stored by ``save_results``
+    """
+    rss_start = rss_mb()
+    fake = FakeBotApi(latency=config.latency, jitter=config.jitter, rate_limited=config.rate_limited,
+                      failure_rate=config.failure_rate, seed=config.seed)
+    await fake.start()
+    with tempfile.TemporaryDirectory() as directory:
+        connection = create_database(os.path.join(directory, 'bench.db'), config)
+        for index, bot_id in enumerate(row[0] for row in connection.execute('SELECT id FROM bots_config ORDER BY id')):
+            fake.add_bot(bot_token(index), bot_id, f'bench_{index}_bot')
+        bots_interactor = BotsInteractor(connection, task_timeout=60.0, api_url=fake.url)
+        try:
+            await bots_interactor.register_bots()
+            assert bots_interactor.startup_report is not None
+            startup = bots_interactor.startup_report.elapsed
+            rss_started = rss_mb()
+            bots = bots_interactor.bot_interactors
+
+            send_latencies: List[float] = []
+            for bot in bots:
+                bot.broadcaster.send_message = _timed_send(bot.broadcaster.send_message, send_latencies)
+            sent = failed = 0
+            started = time.perf_counter()
+            for _ in range(config.broadcasts):
+                reports = await asyncio.gather(*[bot.fetch() for bot in bots])
+                sent += sum(report.sent for report in reports)
+                failed += sum(report.failed for report in reports)
+            broadcast_elapsed = time.perf_counter() - started
+
+            update_latencies = await _send_updates(fake, len(bots), config.updates)
+            rss_end = rss_mb()
+        finally:
+            await bots_interactor.stop_bots()
+            await fake.stop()
+            connection.close()
+
+    return {
+        'startup': {'seconds': round(startup, 4), 'bots_per_second': round(len(bots) / startup, 2) if startup else None},
+        'broadcast': {'messages': sent, 'failed': failed, 'seconds': round(broadcast_elapsed, 4),
+                      'messages_per_second': round(sent / broadcast_elapsed, 2) if broadcast_elapsed else None,
+                      'rate_limited': fake.rejected, 'send_latency': latency_summary(send_latencies)},
+        'updates': {'handled': len(update_latencies), 'latency': latency_summary(update_latencies)},
+        'memory': {'rss_start_mb': round(rss_start, 2), 'rss_after_startup_mb': round(rss_started, 2),
+                   'rss_end_mb': round(rss_end, 2)},
+        'api_calls': dict(sorted(fake.calls.items())),
+    }
+
+
+def _timed_send(send_message: Any, latencies: List[float]) -> Any:
+    async def timed(chat_id: int, data: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await send_message(chat_id, data)
+        finally:
+            latencies.append(time.perf_counter() - started)
+    return timed
+
+
+async def _send_updates(fake: FakeBotApi, bots: int, updates: int, timeout: float = 30.0) -> List[float]:
+    """Send ``/help`` from distinct users and return the latencies until each reply arrives."""
+    waiting = []
+    for i in range(updates):
+        token, chat_id = bot_token(i % bots), UPDATE_CHAT_BASE + i
+        reply = fake.wait_for_message(token, chat_id)
+        pushed = time.perf_counter()
+        fake.push_update(token, chat_id, '/help')
+        waiting.append((pushed, reply))
+    done, pending = await asyncio.wait([reply for _, reply in waiting], timeout=timeout)
+    for reply in pending:
+        reply.cancel()
+    if pending:
+        LOG.warning(f'{len(pending)} updates not answered within {timeout}s')
+    return [reply.result().received - pushed for pushed, reply in waiting if reply in done]
+
+
+def environment() -> Dict[str, Any]:
+    """Describe the code and machine a run was measured on."""
+    try:
+        version = metadata.version('buzzing')
+    except metadata.PackageNotFoundError:
+        version = None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(__file__), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {'version': version, 'commit': commit, 'python': platform.python_version(),
+            'platform': platform.platform(), 'cpus': os.cpu_count()}
+
+
+def save_results(config: BenchmarkConfig, results: Dict[str, Any], directory: str = RESULTS_DIR,
+                 label: Optional[str] = None) -> str:
+    """Write a run to ``<directory>/<time>[-<label>].json``.
+
+    Returns:
+        Path of the written file
+    """
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(directory, f'{stamp}-{label}.json' if label else f'{stamp}.json')
+    document = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'label': label,
+                'environment': environment(), 'config': asdict(config), 'results': results}
+    with open(path, 'w') as results_file:
+        json.dump(document, results_file, indent=2)
+    return path
+
+
+# Figures compared between runs; higher is better unless listed in LOWER_IS_BETTER
+KEY_FIGURES = {
+    'startup seconds': ('startup', 'seconds'),
+    'broadcast msg/s': ('broadcast', 'messages_per_second'),
+    'send p50 ms': ('broadcast', 'send_latency', 'p50_ms'),
+    'send p99 ms': ('broadcast', 'send_latency', 'p99_ms'),
+    'update p50 ms': ('updates', 'latency', 'p50_ms'),
+    'update p99 ms': ('updates', 'latency', 'p99_ms'),
+    'rss end MiB': ('memory', 'rss_end_mb'),
+}
+LOWER_IS_BETTER = {name for name in KEY_FIGURES if name != 'broadcast msg/s'}
+
+
+def _figure(results: Dict[str, Any], keys: Sequence[str]) -> Optional[float]:
+    value: Any = results
+    for key in keys:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """Return one line per key figure with its change from a baseline run."""
+    lines = []
+    for name, keys in KEY_FIGURES.items():
+        old, new = _figure(baseline['results'], keys), _figure(current['results'], keys)
+        if old is None or new is None:
+            lines.append(f'{name:<16} {old!s:>12} -> {new!s:>12}')
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        worse = change > 0 if name in LOWER_IS_BETTER else change < 0
+        marker = ' (worse)' if worse and abs(change) >= 10 else ''
+        lines.append(f'{name:<16} {old:>12} -> {new:>12} {change:+7.1f}%{marker}')
+    return lines
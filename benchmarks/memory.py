@@ -0,0 +1,138 @@
+"""Memory benchmark of the subscriber storage of one bot.
+
+Compares a list of Subscription dataclasses, as held before subscriptions
+were cached as arrays, with the slotted model and with the array-backed
+SubscriptionIndex. Run e.g.::
+
+    python -m benchmarks.memory --subscribers 1000000 --label array-index
+"""
+import argparse
+import asyncio
+import gc
+import json
+import random
+import time
+import tracemalloc
+from array import array
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict
+from benchmarks.harness import RESULTS_DIR, save_results
+from buzzing.cache.subscription_cache import SubscriptionIndex
+from buzzing.dao.async_bots_config_dao import DEFAULT_PAGE_SIZE
+from buzzing.model.subscription import Subscription
+
+
+@dataclass(frozen=True)
+class MemoryBenchmarkConfig:
+    """Parameters of one memory benchmark run.
+
+    Attributes:
+        subscribers: Active subscribers of the bot
+        lookups: Membership checks timed per storage
+        chunk_size: Size of the slices iterated by ``chunks``
+        seed: Seed of the random lookups
+    """
+    subscribers: int = 1_000_000
+    lookups: int = 100_000
+    chunk_size: int = 1_000
+    seed: int = 0
+
+
+@dataclass(frozen=True)
+class LegacySubscription:
+    """Subscription as defined before it had slots."""
+    user_id: int
+    username: str
+    bot_id: int
+    is_active: bool
+
+
+def _measure(build: Callable[[], Any]) -> Dict[str, Any]:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    storage = build()
+    elapsed = time.perf_counter() - started
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'storage': storage, 'build_seconds': round(elapsed, 3), 'mb': round(size / 2 ** 20, 2)}
+
+
+def _timed(function: Callable[[], Any]) -> float:
+    started = time.perf_counter()
+    function()
+    return round(time.perf_counter() - started, 4)
+
+
+def run_memory_benchmark(config: MemoryBenchmarkConfig) -> Dict[str, Any]:
+    """Build each storage for ``config.subscribers`` users and measure it.
+
+    Returns:
+        Per storage the traced megabytes, bytes per subscriber and the
+        seconds to build it, iterate it and answer the membership checks
+    """
+    count = config.subscribers
+    probes = random.Random(config.seed).sample(range(2 * count), min(config.lookups, 2 * count))
+    builders: Dict[str, Callable[[], Any]] = {
+        'dataclass_list': lambda: [LegacySubscription(i, f'user{i}', 1, True) for i in range(count)],
+        'slotted_list': lambda: [Subscription(i, f'user{i}', 1, True) for i in range(count)],
+        'array_index': lambda: _index(count),
+    }
+    results: Dict[str, Any] = {}
+    for name, build in builders.items():
+        measured = _measure(build)
+        storage = measured.pop('storage')
+        if isinstance(storage, SubscriptionIndex):
+            contains: Callable[[int], bool] = storage.__contains__
+            iterate: Callable[[], Any] = lambda: sum(storage)
+            chunked: Callable[[], Any] = lambda: sum(len(chunk) for chunk in storage.chunks(config.chunk_size))
+        else:
+            # A list of dataclasses needs a scan for membership; time a set of its IDs instead
+            user_ids = {subscription.user_id for subscription in storage}
+            contains = user_ids.__contains__
+            iterate = lambda: sum(subscription.user_id for subscription in storage)
+            chunked = lambda: sum(len([s.user_id for s in storage[start:start + config.chunk_size]])
+                                  for start in range(0, len(storage), config.chunk_size))
+        measured.update({
+            'bytes_per_subscriber': round(measured['mb'] * 2 ** 20 / max(count, 1), 1),
+            'iterate_seconds': _timed(iterate),
+            'chunks_seconds': _timed(chunked),
+            'lookup_seconds': _timed(lambda: sum(1 for user_id in probes if contains(user_id))),
+        })
+        results[name] = measured
+        del storage
+    baseline = results['dataclass_list']['mb']
+    results['array_index']['reduction'] = round(baseline / max(results['array_index']['mb'], 0.01), 1)
+    return results
+
+
+def _index(count: int) -> SubscriptionIndex:
+    # Loaded the way the bots load it: keyset pages of sorted user IDs
+    async def stream(bot_id: int) -> AsyncIterator['array[int]']:
+        for start in range(0, count, DEFAULT_PAGE_SIZE):
+            yield array('q', range(start, min(start + DEFAULT_PAGE_SIZE, count)))
+
+    index = SubscriptionIndex(1, loaded=False)
+    asyncio.run(index.load(stream))
+    return index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.memory',
+                                     description='Measure the memory of the subscriber storage of one bot.')
+    defaults = MemoryBenchmarkConfig()
+    parser.add_argument('--subscribers', type=int, default=defaults.subscribers, help=f'default: {defaults.subscribers}')
+    parser.add_argument('--lookups', type=int, default=defaults.lookups, help=f'default: {defaults.lookups}')
+    parser.add_argument('--chunk-size', type=int, default=defaults.chunk_size, help=f'default: {defaults.chunk_size}')
+    parser.add_argument('--label', help='Suffix of the results file, e.g. a version or branch')
+    parser.add_argument('--output', default=RESULTS_DIR, help=f'Directory of the results (default: {RESULTS_DIR})')
+    args = parser.parse_args()
+    config = MemoryBenchmarkConfig(args.subscribers, args.lookups, args.chunk_size)
+    results = run_memory_benchmark(config)
+    path = save_results(config, results, args.output, f'memory-{args.label}' if args.label else 'memory')
+    print(json.dumps(results, indent=2))
+    print(f'Results written to {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,10 @@ class BotInterface(ABC):
     
     This interface defines the required methods that all bot implementations
     must provide. It supports both scheduled and on-demand data fetching.
+
+    Fetches may also be plain (sync) methods; they are run in a thread pool.
+    Set ``execution = 'thread'`` or ``'process'`` on a class whose async
+    fetches block or are CPU-bound.
     """
 
     @classmethod
@@ -0,0 +1,194 @@
+import asyncio
+import importlib.util
+import logging
+import sys
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple, Type
+from buzzing.bots.bot_interface import BotInterface
+from buzzing.model.plugin_profile import PluginProfile
+from buzzing.util.class_loader import class_from_string
+
+LOG = logging.getLogger(__name__)
+
+
+class LazyBot(BotInterface):
+    """Stand-in for a bot plugin that is imported and created on first use.
+
+    Until then it only knows where the plugin lives, so reading the bot
+    configurations imports nothing. Attributes of the plugin instance are
+    available through the proxy once it is loaded.
+    """
+
+    def __init__(self, registry: 'PluginRegistry', name: str, module_name: str, class_name: str) -> None:
+        """Initialize the proxy.
+
+        Args:
+            registry: Registry resolving and caching the plugin class
+            name: Name of the bot, used in the startup profile
+            module_name: Module of the plugin class
+            class_name: Name of the plugin class
+        """
+        self.registry = registry
+        self.name = name
+        self.module_name = module_name
+        self.class_name = class_name
+        self.error: Optional[BaseException] = None
+        self._instance: Optional[BotInterface] = None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def __subclasshook__(cls, subclass: Type[Any]) -> bool:
+        # Unlike BotInterface, only real subclasses are LazyBots
+        return NotImplemented
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes the proxy lacks itself
+        instance = self.__dict__.get('_instance')
+        if instance is None:
+            raise AttributeError(f"Plugin of bot {self.__dict__.get('name')} is not loaded; no attribute '{name}'")
+        return getattr(instance, name)
+
+    def __repr__(self) -> str:
+        return f'LazyBot({self.module_name}.{self.class_name}, loaded={self.loaded})'
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the plugin instance has been created."""
+        return self._instance is not None
+
+    async def load(self) -> BotInterface:
+        """Return the plugin instance, importing and creating it on the first call.
+
+        Raises:
+            ImportError: If the plugin module cannot be imported
+            AttributeError: If the plugin class does not exist
+            Exception: Any error raised by the plugin's constructor
+        """
+        if self._instance is None:
+            async with self._lock:
+                if self._instance is None:
+                    try:
+                        bot_class = await self.registry.load_class(self.module_name, self.class_name)
+                        started = time.perf_counter()
+                        instance = bot_class()
+                        self.registry.init_times[self.name] = time.perf_counter() - started
+                    except Exception as e:
+                        self.error = e
+                        raise
+                    self.error = None
+                    self._instance = instance
+        return self._instance
+
+    async def fetch(self) -> Any:
+        """Load the plugin if needed and run its scheduled fetch."""
+        return await (await self.load()).fetch()
+
+    async def fetch_now(self) -> Any:
+        """Load the plugin if needed and run its on-demand fetch."""
+        return await (await self.load()).fetch_now()
+
+
+class PluginRegistry:
+    """Resolves bot plugin classes once and loads them off the event loop.
+
+    Classes are cached per ``(entry_module, entry_class)``, so bots sharing a
+    plugin and bots restarted by a reload never import again. Imports run in
+    the default executor: a plugin with heavy dependencies does not block the
+    bots that are already polling, and independent plugins load side by side.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self.import_times: Dict[str, float] = {}
+        self.init_times: Dict[str, float] = {}
+        self._classes: Dict[Tuple[str, str], Type[Any]] = {}
+        self._loading: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    def lazy(self, name: str, module_name: str, class_name: str) -> LazyBot:
+        """Return a proxy that loads the plugin of a bot on first use."""
+        return LazyBot(self, name, module_name, class_name)
+
+    @staticmethod
+    def exists(module_name: str) -> bool:
+        """Return whether a plugin module can be found, without importing it.
+
+        Parent packages are imported to search them, the module itself is not.
+        """
+        try:
+            return importlib.util.find_spec(module_name) is not None
+        except (ImportError, ValueError):
+            return False
+
+    def resolve(self, module_name: str, class_name: str) -> Type[Any]:
+        """Import a plugin class, or return it from the cache.
+
+        Raises:
+            ImportError: If the module cannot be imported
+            AttributeError: If the class does not exist in the module
+        """
+        key = (module_name, class_name)
+        bot_class = self._classes.get(key)
+        if bot_class is None:
+            imported = module_name in sys.modules
+            started = time.perf_counter()
+            bot_class = class_from_string(module_name, class_name)
+            if not imported:
+                self.import_times[module_name] = time.perf_counter() - started
+            self._classes[key] = bot_class
+        return bot_class
+
+    async def load_class(self, module_name: str, class_name: str) -> Type[Any]:
+        """Resolve a plugin class in the executor; concurrent calls share one import."""
+        key = (module_name, class_name)
+        bot_class = self._classes.get(key)
+        if bot_class is not None:
+            return bot_class
+        future = self._loading.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(None, self.resolve, module_name, class_name)
+            self._loading[key] = future
+            future.add_done_callback(lambda _: self._loading.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def warm_up(self, bots: Iterable[BotInterface]) -> PluginProfile:
+        """Load the plugins of several bots concurrently.
+
+        Failures are logged and reported in the profile; such a bot retries
+        loading its plugin on its next fetch.
+
+        Args:
+            bots: Bots to load; instances other than LazyBot are skipped
+
+        Returns:
+            The profile of the loaded plugins
+        """
+        lazy_bots = [bot for bot in bots if isinstance(bot, LazyBot)]
+        started = time.monotonic()
+        results = await asyncio.gather(*[bot.load() for bot in lazy_bots], return_exceptions=True)
+        for bot, result in zip(lazy_bots, results):
+            if isinstance(result, Exception):
+                LOG.error('Could not load plugin %s.%s of bot %s: %s',
+                          bot.module_name, bot.class_name, bot.name, result)
+        return self.profile(lazy_bots, time.monotonic() - started)
+
+    def profile(self, bots: Iterable[BotInterface], elapsed: float) -> PluginProfile:
+        """Return the loading profile of some bots, e.g. when a warm-up ran out of time.
+
+        Args:
+            bots: Bots to report on
+            elapsed: Seconds the warm-up has been running
+        """
+        lazy_bots = [bot for bot in bots if isinstance(bot, LazyBot)]
+        modules = {bot.module_name for bot in lazy_bots}
+        return PluginProfile(
+            import_times={m: t for m, t in self.import_times.items() if m in modules},
+            init_times={bot.name: self.init_times[bot.name] for bot in lazy_bots
+                        if bot.loaded and bot.name in self.init_times},
+            failed={bot.name: str(bot.error) for bot in lazy_bots if bot.error is not None},
+            pending=[bot.name for bot in lazy_bots if not bot.loaded and bot.error is None],
+            elapsed=elapsed,
+        )
+
+
+# Shared by all DAOs of the process, so every plugin class is resolved only once
+PLUGINS = PluginRegistry()
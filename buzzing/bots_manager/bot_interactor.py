@@ -2,11 +2,27 @@ from telegram import Update
 from telegram.ext import (Application, CommandHandler, ContextTypes, 
                          ConversationHandler, filters, MessageHandler)
 from buzzing.model.subscription import Subscription
+from buzzing.cache.fetch_cache import FetchCache
+from buzzing.cache.subscription_cache import SubscriptionIndex
 from buzzing.model.bot_config import BotConfig
-from buzzing.dao.bots_config_dao import BotsConfigDao
+from buzzing.dao.async_bots_config_dao import AsyncBotsConfigDao
+from buzzing.dao.async_outbox_dao import AsyncOutboxDao
+from buzzing.bots_manager.broadcaster import Broadcaster
+from buzzing.bots_manager.send_scheduler import INTERACTIVE, TRANSACTIONAL, SendScheduler
+from buzzing.bots_manager.circuit_breaker import CircuitBreaker, CircuitOpenError
+from buzzing.bots_manager.delta_filter import DeltaFilter
+from buzzing.bots_manager.outbox_dispatcher import OutboxDispatcher
+from buzzing.bots_manager.plugin_executor import ExecutionPolicy, PluginExecutor
+from buzzing.bots_manager.shared_request import SharedRequest
+from buzzing.bots_manager.webhook_ingress import WebhookIngress
+from buzzing.model.broadcast_report import BroadcastReport
+from buzzing.util.log_setup import ContextAdapter
+from buzzing.util.metrics import REGISTRY
 import logging
 import asyncio
-from typing import List, Optional, Dict, Any, cast
+import functools
+import time
+from typing import Any, Awaitable, Callable, Iterable, Optional, Sequence, cast
 
 HELP_STR = """
 Supported commands:
@@ -15,8 +31,15 @@ Supported commands:
 """
 
 PASSWORD = 0
+DEFAULT_DRAIN_TIMEOUT = 0.5
 LOG = logging.getLogger(__name__)
 
+FETCH_SECONDS = REGISTRY.histogram('buzzing_fetch_seconds', 'Latency of plugin fetches', ('bot', 'method'))
+FETCH_FAILURES = REGISTRY.counter('buzzing_fetch_failures_total', 'Plugin fetches that failed', ('bot', 'method'))
+UPDATE_SECONDS = REGISTRY.histogram('buzzing_update_seconds', 'Latency of update handlers', ('bot', 'command'))
+
+Handler = Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[Any]]
+
 class BotInteractor:
     """Handles interactions for a single Telegram bot.
     
@@ -24,87 +47,199 @@ class BotInteractor:
     including user authentication, command processing, and graceful shutdown.
     """
 
-    def __init__(self, config: BotConfig, subscriptions: List[Subscription], 
-                 bots_config_dao: BotsConfigDao) -> None:
+    def __init__(self, config: BotConfig, subscriptions: Iterable[Subscription], 
+                 bots_config_dao: AsyncBotsConfigDao, outbox_dao: Optional[AsyncOutboxDao] = None,
+                 ingress: Optional[WebhookIngress] = None,
+                 request: Optional[SharedRequest] = None,
+                 executor: Optional[PluginExecutor] = None,
+                 api_url: Optional[str] = None,
+                 send_scheduler: Optional[SendScheduler] = None) -> None:
         """Initialize the bot interactor.
 
         Args:
             config: Bot configuration
-            subscriptions: List of user subscriptions for this bot
-            bots_config_dao: DAO for managing bot configurations
+            subscriptions: Live subscription index of this bot; other
+                iterables are copied into a new index
+            bots_config_dao: Async DAO for managing subscriptions
+            outbox_dao: DAO for the durable outbox; broadcasts are sent
+                directly from memory when omitted
+            ingress: Shared webhook endpoint receiving this bot's updates;
+                the bot long-polls when omitted
+            request: HTTP client shared by all bots for Bot API calls; the
+                bot gets its own client when omitted
+            executor: Runs the plugin's fetches according to the
+                ``execution`` metadata; a private one is created when omitted
+            api_url: Base URL of the Bot API, e.g. a local Bot API server;
+                Telegram's public API when omitted
+            send_scheduler: Send slots shared by all bots, giving replies
+                priority over broadcasts; the bot gets its own when omitted
         """
         self.config = config
+        # Tags every record with the bot; %-style arguments are only formatted when enabled
+        self.log = ContextAdapter(LOG, {'bot_id': config.id, 'bot_name': config.name})
+        self._subscriptions = SubscriptionIndex(config.id)
         self.subscriptions = subscriptions
         self.bots_config_dao = bots_config_dao
-        self.application = Application.builder().token(config.token).build()
+        self.ingress = ingress
+        builder = Application.builder().token(config.token)
+        if ingress is not None:
+            # Updates arrive through the ingress; no Updater, no polling loop
+            builder.updater(None)
+        if request is not None:
+            builder.request(request)
+        if api_url:
+            api_url = api_url.rstrip('/')
+            builder.base_url(f'{api_url}/bot').base_file_url(f'{api_url}/file/bot')
+        self.application = builder.build()
+        self.broadcaster = Broadcaster.from_metadata(config.id, self._send_message, config.metadata, config.name,
+                                                     send_scheduler, self._deactivate)
+        self.outbox: Optional[OutboxDispatcher] = None
+        if outbox_dao is not None:
+            self.outbox = OutboxDispatcher.from_metadata(
+                config.id, outbox_dao, self.broadcaster, config.metadata)
+        self.executor = executor or PluginExecutor()
+        self.execution = ExecutionPolicy.from_metadata(config.metadata)
+        # One breaker for both fetches: they hit the same upstream
+        self.breaker = CircuitBreaker.from_metadata(config.name, config.metadata)
+        self.fetch_now_cache = FetchCache.from_metadata(
+            f'{config.name}.fetch_now', self._fetch_now_upstream, config.metadata, 'fetch_now',
+            fallback_on=(CircuitOpenError,))
+        # No last-good fallback: it would broadcast stale content on every tick
+        self.fetch_cache = FetchCache.from_metadata(
+            f'{config.name}.fetch', self._fetch_upstream, config.metadata, 'fetch')
+        # Opt-in: skip broadcasts whose content did not change
+        self.delta = DeltaFilter.from_metadata(config.id, bots_config_dao.database, config.metadata, config.name)
         
         # Initialize bot state
         self.stop_bot = False
+        self.resume_task: Optional[asyncio.Task] = None
+        self.ready = asyncio.Event()
+        self._stop_event = asyncio.Event()
+        self._stop_lock = asyncio.Lock()
+        self.startup_error: Optional[BaseException] = None
+        self._startup_done = asyncio.Event()
         
         # Set up conversation handler for authentication
         self.start_handler = ConversationHandler(
-            entry_points=[CommandHandler("start", self.start)],
+            entry_points=[CommandHandler("start", self._timed("start", self.start))],
             states={
-                PASSWORD: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.password)]
+                PASSWORD: [MessageHandler(filters.TEXT & ~filters.COMMAND, self._timed("password", self.password))]
             },
-            fallbacks=[CommandHandler("cancel", self.cancel)],
+            fallbacks=[CommandHandler("cancel", self._timed("cancel", self.cancel))],
         )
 
+    def _timed(self, command: str, handler: Handler) -> Handler:
+        """Wrap an update handler to record its latency."""
+        series = UPDATE_SECONDS.labels(self.config.name, command)
+
+        @functools.wraps(handler)
+        async def timed(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Any:
+            started = time.perf_counter()
+            try:
+                return await handler(update, context)
+            finally:
+                series.observe(time.perf_counter() - started)
+        return timed
+
+    @property
+    def subscriptions(self) -> SubscriptionIndex:
+        """Active subscriptions of this bot."""
+        return self._subscriptions
+
+    @subscriptions.setter
+    def subscriptions(self, subscriptions: Iterable[Subscription]) -> None:
+        if not isinstance(subscriptions, SubscriptionIndex):
+            subscriptions = SubscriptionIndex(self.config.id, subscriptions)
+        self._subscriptions = subscriptions
+
+    async def _reply(self, update: Update, priority: int, text: str, html: bool = False) -> None:
+        """Reply to an update ahead of the queued broadcast sends.
+
+        Args:
+            update: Update to reply to
+            priority: INTERACTIVE for answers to commands, TRANSACTIONAL
+                for confirmations of subscription changes
+            text: Text of the reply
+            html: Whether the text is HTML
+        """
+        message = cast(Any, update.message)
+        reply = message.reply_html if html else message.reply_text
+        await self.broadcaster.call(lambda: reply(text), priority)
+
+    async def is_subscribed(self, user_id: int) -> bool:
+        """Return whether a user is subscribed, asking the database until the index is loaded."""
+        if self.subscriptions.loaded:
+            return user_id in self.subscriptions
+        subscription = await self.bots_config_dao.fetch_subscription(self.config.id, user_id)
+        return subscription is not None and subscription.is_active
+
     async def initiate(self) -> None:
-        """Start the bot and begin polling for updates.
+        """Start the bot and begin receiving updates by polling or webhook.
 
-        This method runs indefinitely until stop_bot is set to True.
+        This method runs until stop_polling() is called or the task is cancelled.
         """
-        LOG.info(f'Initiating {self.config.description} bot!')
+        self.log.info('Initiating %s bot!', self.config.description)
         try:
             async with self.application:
                 # Register all command handlers
                 self.application.add_handler(self.start_handler)
-                self.application.add_handler(CommandHandler("help", self.help))
-                self.application.add_handler(CommandHandler("fetchnow", self.fetch_now))
-                self.application.add_handler(CommandHandler("stop", self.stop))
-                
-                # First, delete any existing webhook to ensure clean start
-                await self.application.bot.delete_webhook(drop_pending_updates=True)
-                
-                # Start the application and polling
-                await self.application.initialize()
-                await self.application.start()
-                await self.application.updater.start_polling()
-                
-                LOG.info(f'Bot {self.config.name} is now polling for updates!')
-                
-                # Use an event for cleaner shutdown
-                stop_event = asyncio.Event()
+                self.application.add_handler(CommandHandler("help", self._timed("help", self.help)))
+                self.application.add_handler(CommandHandler("fetchnow", self._timed("fetchnow", self.fetch_now)))
+                self.application.add_handler(CommandHandler("stop", self._timed("stop", self.stop)))
                 
-                async def check_stop():
-                    while not self.stop_bot:
-                        try:
-                            await asyncio.sleep(1)  # Check stop flag every second
-                        except asyncio.CancelledError:
-                            LOG.info(f'Bot {self.config.name} task cancelled, cleaning up...')
-                            await self.stop_polling()
-                            raise  # Re-raise to properly handle task cancellation
-                    stop_event.set()
+                if self.ingress:
+                    # Start processing the update queue, then point the webhook at the ingress
+                    await self.application.initialize()
+                    await self.application.start()
+                    await self.ingress.register(self.config.name, self.config.token, self.application)
+                    self.log.info('Bot %s is now receiving updates by webhook!', self.config.name)
+                else:
+                    # First, delete any existing webhook to ensure clean start
+                    await self.application.bot.delete_webhook(drop_pending_updates=True)
+                    
+                    # Start the application and polling
+                    await self.application.initialize()
+                    await self.application.start()
+                    await self.application.updater.start_polling()
+                    
+                    self.log.info('Bot %s is now polling for updates!', self.config.name)
+                self.ready.set()
+                self._startup_done.set()
                 
-                # Create task for stop checking
-                stop_task = asyncio.create_task(check_stop())
+                # Pick up broadcasts interrupted by a previous shutdown or crash
+                if self.outbox:
+                    self.resume_task = asyncio.create_task(self.outbox.resume())
                 
+                # Sleep until stop_polling() sets the stop event; no periodic wakeups
                 try:
-                    await stop_event.wait()
+                    await self._stop_event.wait()
+                except asyncio.CancelledError:
+                    self.log.info('Bot %s task cancelled, cleaning up...', self.config.name)
+                    raise  # Re-raise to properly handle task cancellation
                 finally:
-                    stop_task.cancel()
-                    try:
-                        await stop_task
-                    except asyncio.CancelledError:
-                        pass
-                    
-                    # Graceful shutdown
+                    # Graceful shutdown; undelivered messages stay in the outbox
                     await self.stop_polling()
+                    if self.resume_task and not self.resume_task.done():
+                        self.resume_task.cancel()
+                    self.log.info('Fetch cache stats: %s, %s', self.fetch_now_cache.stats(), self.fetch_cache.stats())
+                    self.log.info('Circuit breaker stats: %s', self.breaker.stats())
         except Exception as e:
-            LOG.error(f'Error in bot {self.config.name}: {e}')
+            self.log.error('Error in bot %s: %s', self.config.name, e)
+            if not self._startup_done.is_set():
+                self.startup_error = e
+                self._startup_done.set()
             raise
 
+    async def wait_ready(self) -> None:
+        """Wait until the bot has deleted its webhook and started polling.
+
+        Raises:
+            Exception: The error that made the startup fail
+        """
+        await self._startup_done.wait()
+        if self.startup_error is not None:
+            raise self.startup_error
+
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         """Handle the /start command and begin authentication.
 
@@ -116,13 +251,14 @@ class BotInteractor:
             The next conversation state (PASSWORD)
         """
         chat = cast(Any, update.effective_chat)
-        LOG.info(f'Start received from: {chat.id}')
-        await update.message.reply_html(
+        self.log.info('Start received from: %s', chat.id, extra={'user_id': chat.id})
+        await self._reply(update, INTERACTIVE,
             f"Welcome <i>{chat.first_name}</i> to <b>'{self.config.name}'</b> bot!\n"
             f"<i>{self.config.description}</i>\n\n"
             f"Kindly provide a magic password to register yourself.\n"
             f"<i>(Reach out to @mehtasankets if you don't know the password!)</i>\n\n"
-            f"Enter Password: "
+            f"Enter Password: ",
+            html=True
         )
         return PASSWORD
 
@@ -130,84 +266,161 @@ class BotInteractor:
         password = update.message.text  # type: ignore
         if(update.message and update.message.text == self.config.password):
             subscription = Subscription(update.effective_user.id, update.effective_user.username, self.config.id, True) # type: ignore
-            self.bots_config_dao.subscribe(subscription)
-            await update.message.reply_text(
+            await self.bots_config_dao.subscribe(subscription)
+            await self._reply(update, TRANSACTIONAL,
                 "Great! Welcome to the bot! You'll start receiving information regularly!"
             )
             return ConversationHandler.END
         else:
-            await update.message.reply_text( # type: ignore
+            await self._reply(update, TRANSACTIONAL,
                 "Nahh! Try again!"
             )
             return PASSWORD
 
     async def cancel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        await update.message.reply_text( # type: ignore
+        await self._reply(update, INTERACTIVE,
             "Bye, Bye!"
         )
         return ConversationHandler.END
 
     async def stop(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        LOG.info(f'Stop command received from{update.effective_chat}')
+        self.log.info('Stop command received from %s', update.effective_chat,
+                      extra={'user_id': update.effective_user.id})  # type: ignore
         subscription = Subscription(update.effective_user.id, update.effective_user.username, self.config.id, False) # type: ignore
-        self.bots_config_dao.unsubscribe(subscription)
-        await update.message.reply_html( # type: ignore
+        await self.bots_config_dao.unsubscribe(subscription)
+        await self._reply(update, TRANSACTIONAL,
             f"Hey <i>{update.effective_chat.first_name}</i>,\n" #type: ignore
-            f"It's sad to see you go. Hope you come back again later!\n"
+            f"It's sad to see you go. Hope you come back again later!\n",
+            html=True
         )
         return PASSWORD
 
     async def help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-         await update.message.reply_text(HELP_STR)  # type: ignore
+         await self._reply(update, INTERACTIVE, HELP_STR)
 
     async def fetch_now(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        LOG.info(f'Fetch now command received from {update.effective_chat}')
+        self.log.info('Fetch now command received from %s', update.effective_chat,
+                      extra={'user_id': update.effective_user.id if update.effective_user else None})
         
         # Check if user is subscribed
-        if not update.effective_user or not any(s.user_id == update.effective_user.id for s in self.subscriptions):
-            await update.message.reply_text(
+        if not update.effective_user or not await self.is_subscribed(update.effective_user.id):
+            await self._reply(update, INTERACTIVE,
                 "You need to /start and authenticate first!"
             )
             return
         
         try:
-            data = await self.config.bot.fetch_now()
-            LOG.info(f'Fetched data: {data}')
-            await update.message.reply_text(data)
+            data = await self.fetch_now_cache.get()
+            self.log.info('Fetched data: %s', data)
+            await self._reply(update, INTERACTIVE, data)
+        except CircuitOpenError as e:
+            self.log.warning('Fetch now rejected: %s', e)
+            await self._reply(update, INTERACTIVE,
+                "The data source is unavailable right now. Please try again later."
+            )
         except Exception as e:
-            LOG.error(f'Error in fetch_now: {e}')
-            await update.message.reply_text(
+            self.log.error('Error in fetch_now: %s', e)
+            await self._reply(update, INTERACTIVE,
                 "Sorry, something went wrong while fetching data."
             )
 
-    async def fetch(self):
-        data = await self.config.bot.fetch()
-        for s in self.subscriptions:
-            await self.application.bot.send_message(s.user_id, data)
+    async def fetch(self) -> BroadcastReport:
+        """Fetch scheduled data and broadcast it to all subscribers.
+
+        The first broadcast streams the bot's subscribers into its index. The
+        broadcast is skipped while the circuit breaker is open and, in delta
+        mode, when the data equals the last broadcast.
 
-    async def stop_polling(self):
-        """Stop the bot polling gracefully."""
+        Returns:
+            Delivery counts and timing for the broadcast
+        """
         try:
-            LOG.info(f'Stopping bot: {self.config.name}')
+            data = await self.fetch_cache.get()
+        except CircuitOpenError as e:
+            self.log.warning('Upstream of bot %s unavailable, skipping broadcast: %s', self.config.name, e)
+            return BroadcastReport(self.config.id, total=0, sent=0, failed=0, elapsed=0.0, skipped=True)
+        if self.delta and not await self.delta.changed(data):
+            self.log.info('Content of bot %s unchanged, skipping broadcast', self.config.name)
+            return BroadcastReport(self.config.id, total=0, sent=0, failed=0, elapsed=0.0, skipped=True)
+        await self.subscriptions.load(self.bots_config_dao.stream_audience)
+        user_ids = self.subscriptions.snapshot()
+        if self.outbox is None:
+            report = await self.broadcaster.broadcast(user_ids, data)
+            if self.delta and report.sent:
+                await self.delta.record(data)
+            return report
+        await self.outbox.enqueue(data, user_ids)
+        if self.delta:
+            # The outbox delivers it from here on, even across restarts
+            await self.delta.record(data)
+        return await self.outbox.drain()
+
+    async def _fetch_now_upstream(self) -> Any:
+        return await self._call_plugin('fetch_now')
+
+    async def _fetch_upstream(self) -> Any:
+        return await self._call_plugin('fetch')
+
+    async def _call_plugin(self, method: str) -> Any:
+        started = time.perf_counter()
+        try:
+            return await self.breaker.call(
+                functools.partial(self.executor.call, self.config.bot, method, self.execution))
+        except Exception:
+            FETCH_FAILURES.labels(self.config.name, method).inc()
+            raise
+        finally:
+            FETCH_SECONDS.labels(self.config.name, method).observe(time.perf_counter() - started)
+
+    async def _deactivate(self, user_ids: Sequence[int]) -> int:
+        return await self.bots_config_dao.deactivate_subscriptions(self.config.id, user_ids)
+
+    async def _send_message(self, chat_id: int, data: Any) -> None:
+        await self.application.bot.send_message(chat_id, data)
+
+    async def stop_polling(self, drain_timeout: float = DEFAULT_DRAIN_TIMEOUT) -> None:
+        """Stop the bot polling gracefully.
+
+        Wakes up initiate() immediately, then gives sends already in flight up
+        to ``drain_timeout`` seconds to finish. Messages not yet sent stay
+        pending in the outbox for the next process.
+
+        Args:
+            drain_timeout: Seconds to wait for in-flight sends
+        """
+        try:
+            self.log.info('Stopping bot: %s', self.config.name)
             self.stop_bot = True
+            self._stop_event.set()
             
-            try:
-                # First stop polling if updater exists and is running
-                if hasattr(self.application, 'updater') and self.application.updater and self.application.updater.running:
-                    await self.application.updater.stop()
+            # initiate() also stops the bot once woken; a second caller
+            # waits for the first instead of shutting down under it
+            async with self._stop_lock:
+                try:
+                    await self.broadcaster.close(drain_timeout)
+                    if self.outbox:
+                        self.outbox.close()
+                    self.fetch_now_cache.close()
+                    self.fetch_cache.close()
+                    if self.ingress:
+                        self.ingress.unregister(self.config.token)
+                
+                    # First stop polling if updater exists and is running
+                    if hasattr(self.application, 'updater') and self.application.updater and self.application.updater.running:
+                        await self.application.updater.stop()
                 
-                # Then stop and shutdown the application if it's running
-                if hasattr(self.application, 'running') and self.application.running:
-                    await self.application.stop()
-                    if hasattr(self.application, 'shutdown'):
-                        await self.application.shutdown()
+                    # Then stop and shutdown the application if it's running
+                    if hasattr(self.application, 'running') and self.application.running:
+                        await self.application.stop()
+                        if hasattr(self.application, 'shutdown'):
+                            await self.application.shutdown()
                 
-                LOG.info(f'Bot stopped: {self.config.name}')
-            except RuntimeError as e:
-                # Handle case where components are already stopped
-                if 'not running' not in str(e).lower():
-                    raise
-                LOG.debug(f'Component already stopped for bot {self.config.name}: {str(e)}')
+                    self.log.info('Bot stopped: %s', self.config.name)
+                except RuntimeError as e:
+                    # Handle case where components are already stopped
+                    if 'not running' not in str(e).lower():
+                        raise
+                    self.log.debug('Component already stopped for bot %s: %s', self.config.name, e)
                 
         except Exception as e:
-            LOG.error(f'Error stopping bot {self.config.name}: {str(e)}')
+            self.log.error('Error stopping bot %s: %s', self.config.name, e)
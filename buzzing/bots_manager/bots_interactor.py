@@ -1,11 +1,26 @@
-from sqlite3 import Connection
+from sqlite3 import Connection, Error as SQLiteError
+from buzzing.cache.subscription_cache import SubscriptionCache
+from buzzing.dao.async_bots_config_dao import AsyncBotsConfigDao
+from buzzing.dao.async_sqlite import AsyncSQLite
 from buzzing.dao.bots_config_dao import BotsConfigDao
-from buzzing.bots_manager.bot_interactor import BotInteractor
+from buzzing.dao.async_outbox_dao import AsyncOutboxDao
+from buzzing.bots_manager.bot_interactor import BotInteractor, DEFAULT_DRAIN_TIMEOUT
+from buzzing.bots_manager.config_watcher import ConfigWatcher
+from buzzing.bots_manager.metrics_server import MetricsServer
+from buzzing.bots_manager.plugin_executor import PROCESS, ExecutionPolicy, PluginExecutor
+from buzzing.bots_manager.send_scheduler import SendScheduler
+from buzzing.bots_manager.scheduler import Scheduler, ScheduledJob
+from buzzing.bots_manager.shared_request import SharedRequest
+from buzzing.bots_manager.webhook_ingress import WebhookIngress
 from buzzing.model.bot_config import BotConfig
-from buzzing.model.subscription import Subscription
+from buzzing.model.startup_report import StartupReport
+from buzzing.util.hash_ring import shard_for
 import asyncio
+import functools
 import logging
-from typing import List, Optional
+import time
+import uuid
+from typing import AbstractSet, Dict, List, Optional, Tuple
 
 LOG = logging.getLogger(__name__)
 
@@ -17,86 +32,399 @@ class BotsInteractor:
     proper cleanup of resources.
     """
 
-    def __init__(self, db_connection: Connection, task_timeout: float = 1.0):
+    def __init__(self, db_connection: Connection, task_timeout: float = 30.0,
+                 restart_delay: float = 5.0, max_restart_delay: float = 300.0,
+                 drain_timeout: float = DEFAULT_DRAIN_TIMEOUT,
+                 ingress: Optional[WebhookIngress] = None,
+                 request: Optional[SharedRequest] = None,
+                 shard: Optional[Tuple[int, int]] = None,
+                 reload_interval: Optional[float] = None,
+                 startup_budget: Optional[float] = None,
+                 executor: Optional[PluginExecutor] = None,
+                 metrics: Optional[MetricsServer] = None,
+                 api_url: Optional[str] = None,
+                 send_scheduler: Optional[SendScheduler] = None):
         """Initialize the BotsInteractor.
 
         Args:
             db_connection: SQLite database connection for bot configurations
-            task_timeout: Timeout in seconds to wait for each bot task to start
+            task_timeout: Timeout in seconds to wait for the bots to become ready
+            restart_delay: Delay in seconds before a failed bot is first restarted
+            max_restart_delay: Upper bound for the exponential restart delay
+            drain_timeout: Seconds in-flight sends get to finish on shutdown
+            ingress: Shared webhook endpoint for all bots; bots long-poll
+                when omitted
+            request: HTTP client shared by all bots for Bot API calls;
+                a default SharedRequest is created when omitted
+            shard: ``(index, workers)`` of this worker process; only the bots
+                hashed to this shard are run. All bots run when omitted
+            reload_interval: Seconds between checks for changed bot
+                configurations and subscriptions; no checks when omitted
+            startup_budget: Upper bound in seconds for register_bots();
+                bots and plugins not ready by then keep starting in the
+                background. Only ``task_timeout`` applies when omitted
+            executor: Thread pool shared by all bots and process pools per
+                plugin, for blocking or CPU-bound fetches; a default one is
+                created when omitted
+            metrics: Endpoint serving metrics and the state of these bots;
+                nothing is served when omitted
+            api_url: Base URL of the Bot API for all bots; Telegram's
+                public API when omitted
+            send_scheduler: Send slots shared by all bots, serving replies before
+                broadcasts and bots in turn; a default one is created when omitted
         """
+        self.db_connection = db_connection
+        self.shard = shard
         self.bots_config_dao = BotsConfigDao(db_connection)
-        self.bots_config: List[BotConfig] = self.bots_config_dao.fetch_all_bots_configs()
-        self.subscriptions: List[Subscription] = self.bots_config_dao.fetch_all_subscriptions()
+        self.plugins = self.bots_config_dao.plugins
+        self.bots_config: List[BotConfig] = [
+            config for config in self.bots_config_dao.fetch_all_bots_configs() if self.owns(config.id)]
+        self.fingerprints: Dict[int, str] = {
+            bot_id: fingerprint for bot_id, fingerprint in self.bots_config_dao.fetch_config_fingerprints().items()
+            if self.owns(bot_id)}
+        # Each bot's subscribers are streamed from the database on its first broadcast
+        self.subscription_cache = SubscriptionCache(lazy=True)
+        # Own subscription writes are counted under this origin, so hot reload can tell them from others'
+        self.origin = uuid.uuid4().hex
+        self.database = AsyncSQLite.from_connection(
+            db_connection, setup=lambda connection: BotsConfigDao(connection).track_own_changes(self.origin))
+        self.async_bots_config_dao = AsyncBotsConfigDao(self.database, self.subscription_cache)
+        self.outbox_dao = AsyncOutboxDao(self.database)
         self.bot_interactors: List[BotInteractor] = []
         self.tasks: List[asyncio.Task] = []
+        self.bot_tasks: Dict[int, asyncio.Task] = {}
         self.task_timeout = task_timeout
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.drain_timeout = drain_timeout
+        self.ingress = ingress
+        self.request = request or SharedRequest()
+        self.executor = executor or PluginExecutor()
+        self.send_scheduler = send_scheduler or SendScheduler()
+        self.metrics = metrics
+        self.api_url = api_url
+        self.stopping = asyncio.Event()
+        self.scheduler = Scheduler()
+        self.startup_report: Optional[StartupReport] = None
+        self.reload_interval = reload_interval
+        self.watcher: Optional[ConfigWatcher] = None
+        self.startup_budget = startup_budget
+        self.warm_up_task: Optional[asyncio.Task] = None
+
+    def owns(self, bot_id: int) -> bool:
+        """Return whether a bot belongs to this process's shard."""
+        if self.shard is None:
+            return True
+        index, workers = self.shard
+        return shard_for(bot_id, workers) == index
+
+    def create_bot_interactor(self, config: BotConfig) -> BotInteractor:
+        """Create the interactor for a bot sharing its live subscription index."""
+        return BotInteractor(config, self.subscription_cache.index(config.id),
+                             self.async_bots_config_dao, self.outbox_dao, self.ingress, self.request,
+                             self.executor, self.api_url, self.send_scheduler)
+
+    def bot_interactor(self, bot_id: int) -> Optional[BotInteractor]:
+        """Return the running interactor of a bot, if any."""
+        return next((b for b in self.bot_interactors if b.config.id == bot_id), None)
+
+    def start_bot(self, config: BotConfig) -> BotInteractor:
+        """Create a bot and run it in a supervised task.
+
+        Raises:
+            Exception: If the bot cannot be created
+        """
+        bot_interactor = self.create_bot_interactor(config)
+        self.bot_interactors.append(bot_interactor)
+        task = asyncio.get_running_loop().create_task(self._supervise(bot_interactor), name=f"bot_{config.name}")
+        self.tasks.append(task)
+        self.bot_tasks[config.id] = task
+        LOG.info('Created task for bot: %s', config.name)
+        return bot_interactor
+
+    async def stop_bot(self, bot_id: int) -> None:
+        """Stop one bot gracefully, leaving the others running.
+
+        The bot gets ``drain_timeout`` seconds to finish sends in flight
+        before its task is cancelled.
+        """
+        bot_interactor = self.bot_interactor(bot_id)
+        task = self.bot_tasks.pop(bot_id, None)
+        if bot_interactor:
+            self.bot_interactors.remove(bot_interactor)
+            self.scheduler.remove_job(f'fetch_{bot_interactor.config.name}')
+            await bot_interactor.stop_polling(self.drain_timeout)
+        if task:
+            _, pending = await asyncio.wait([task], timeout=self.drain_timeout)
+            for straggler in pending:
+                LOG.warning('Cancelling task %s after shutdown timeout', straggler.get_name())
+                straggler.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            self.tasks.remove(task)
+
+    async def reload_bots(self) -> None:
+        """Apply changes to the bot configurations without restarting.
+
+        Only bots that were added, removed or whose row changed are started,
+        stopped or restarted; all other bots keep running untouched.
+        """
+        if self.stopping.is_set():
+            return
+        fingerprints = {
+            bot_id: fingerprint for bot_id, fingerprint in self.bots_config_dao.fetch_config_fingerprints().items()
+            if self.owns(bot_id)}
+        removed = self.fingerprints.keys() - fingerprints.keys()
+        added = fingerprints.keys() - self.fingerprints.keys()
+        changed = {bot_id for bot_id in fingerprints.keys() & self.fingerprints.keys()
+                   if fingerprints[bot_id] != self.fingerprints[bot_id]}
+        self.fingerprints = fingerprints
+        if not (removed or added or changed):
+            return
+        LOG.info('Reloading bots: added %s, removed %s, changed %s', sorted(added), sorted(removed), sorted(changed))
+
+        await asyncio.gather(*[self.stop_bot(bot_id) for bot_id in removed | changed])
+        for bot_id in removed:
+            self.subscription_cache.index(bot_id).invalidate()
+        configs = self.bots_config_dao.fetch_all_bots_configs(added | changed)
+        self.bots_config = [config for config in self.bots_config if config.id not in removed | changed] + configs
+        for config in configs:
+            # Subscriptions may have changed while the bot was not running
+            self.subscription_cache.index(config.id).invalidate()
+            try:
+                self.schedule_bot(self.start_bot(config))
+            except Exception as e:
+                LOG.error('Could not create bot %s: %s', config.name, e)
+        if self.scheduler.jobs:
+            self.scheduler.start()
+        await self.plugins.warm_up(config.bot for config in configs if _loads_plugin_here(config))
+
+    async def reload_subscriptions(self, bot_ids: Optional[AbstractSet[int]] = None) -> None:
+        """Reload the subscriptions of this process's bots, e.g. after changes by another process.
+
+        Loaded indexes are streamed again one bot at a time, serving the old
+        subscriptions meanwhile; the others stay unloaded until first used.
+
+        Args:
+            bot_ids: Only reload the subscriptions of these bots; all of
+                them when omitted
+        """
+        loaded = [index for index in self.subscription_cache.indexes()
+                  if index.loaded and (bot_ids is None or index.bot_id in bot_ids)]
+        for index in loaded:
+            await index.reload(self.async_bots_config_dao.stream_audience)
+        LOG.info('Reloaded %d subscriptions of %d bots', len(self.subscription_cache), len(loaded))
 
     async def register_bots(self) -> asyncio.AbstractEventLoop:
-        """Register and initialize all bots asynchronously.
+        """Start all bots concurrently and wait until they are ready.
+
+        Each bot signals readiness once it receives updates, i.e. polling has
+        started or its webhook points at the ingress. A bot that fails does not affect the others; it is restarted
+        in the background with exponential backoff. Meanwhile the bot plugins
+        are loaded concurrently, off the event loop. With a ``startup_budget``
+        this returns once it is spent, leaving the rest to finish in the background.
 
         Returns:
             The event loop managing the bot tasks
+        """
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        if self.metrics:
+            # Up first, so readiness can be watched during startup
+            self.metrics.attach(self)
+            await self.metrics.start()
+        if self.ingress:
+            await self.ingress.start()
+        failed: Dict[str, str] = {}
+        for config in self.bots_config:
+            try:
+                self.start_bot(config)
+            except Exception as e:
+                LOG.error('Could not create bot %s: %s', config.name, e)
+                failed[config.name] = str(e)
+
+        bots = [config.bot for config in self.bots_config if _loads_plugin_here(config)]
+        self.warm_up_task = loop.create_task(self.plugins.warm_up(bots), name='plugin_warm_up')
+        timeout = self.task_timeout if self.startup_budget is None else min(self.task_timeout, self.startup_budget)
+        results = await asyncio.gather(
+            *[self._wait_ready(bot_interactor, started, timeout) for bot_interactor in self.bot_interactors],
+            return_exceptions=True
+        )
+        remaining = None if self.startup_budget is None else max(0.0, self.startup_budget - (time.monotonic() - started))
+        done, _ = await asyncio.wait([self.warm_up_task], timeout=remaining)
+        if done:
+            plugins = self.warm_up_task.result()
+        else:
+            plugins = self.plugins.profile(bots, time.monotonic() - started)
+            LOG.warning('Startup budget of %ss spent; plugins of %s keep loading in the background',
+                        self.startup_budget, plugins.pending)
+
+        ready: Dict[str, float] = {}
+        pending: List[str] = []
+        for bot_interactor, result in zip(self.bot_interactors, results):
+            name = bot_interactor.config.name
+            if isinstance(result, BaseException):
+                failed[name] = str(result)
+            elif result is None:
+                pending.append(name)
+            else:
+                ready[name] = result
+            self.schedule_bot(bot_interactor)
+
+        self.startup_report = StartupReport(
+            ready=ready, failed=failed, pending=pending, elapsed=time.monotonic() - started, plugins=plugins)
+        LOG.info('Startup finished in %.2fs: %d ready, %d failed, %d still starting',
+                 self.startup_report.elapsed, len(ready), len(failed), len(pending))
+        for name, seconds in sorted(ready.items(), key=lambda item: item[1], reverse=True):
+            LOG.info('Bot %s ready in %.2fs', name, seconds)
+        for module, seconds in sorted(plugins.import_times.items(), key=lambda item: item[1], reverse=True):
+            LOG.info('Plugin module %s imported in %.3fs', module, seconds)
+        for name, seconds in sorted(plugins.init_times.items(), key=lambda item: item[1], reverse=True):
+            LOG.info('Plugin of bot %s created in %.3fs', name, seconds)
+
+        if self.scheduler.jobs:
+            self.scheduler.start()
+
+        if self.reload_interval:
+            self.watcher = ConfigWatcher(
+                self.db_connection, self.reload_bots, self.reload_subscriptions,
+                self.database, self.origin, self.reload_interval)
+            try:
+                await self.watcher.snapshot()
+            except Exception as e:
+                LOG.error('Hot reload disabled, cannot read change versions: %s', e)
+                self.watcher = None
+            else:
+                # Part of the tasks, so the process keeps running while no bot is configured
+                self.tasks.append(loop.create_task(self.watcher.run(), name='config_watcher'))
+        return loop
+
+    async def _wait_ready(self, bot_interactor: BotInteractor, started: float,
+                          timeout: float) -> Optional[float]:
+        """Wait for a bot's first startup attempt.
+
+        Returns:
+            Seconds from the start of registration until the bot was ready,
+            or None if it is not ready within ``timeout`` seconds
 
         Raises:
-            Exception: If bot initialization fails
+            Exception: The error that made the startup attempt fail
         """
         try:
-            loop = asyncio.get_running_loop()
-            for config in self.bots_config:
-                bot_subscriptions = [s for s in self.subscriptions if s.bot_id == config.id]
-                bot_interactor = BotInteractor(config, bot_subscriptions, self.bots_config_dao)
-                self.bot_interactors.append(bot_interactor)
-                
-                # Create and track the task
-                task = loop.create_task(
-                    bot_interactor.initiate(), 
-                    name=f"bot_{config.name}"
-                )
-                self.tasks.append(task)
-                LOG.info(f'Created task for bot: {config.name}')
-                
-                # Wait for task to start or fail
-                done, pending = await asyncio.wait(
-                    [task], 
-                    timeout=self.task_timeout,
-                    return_when=asyncio.FIRST_EXCEPTION
-                )
-                
-                # If task completed (probably with error), get the result to propagate exception
-                if done:
-                    await task
-                elif pending:
-                    LOG.info(f'Bot {config.name} started successfully')
-            
-            return loop
-        except Exception as e:
-            LOG.error(f"Error registering bots: {e}")
-            await self.stop_bots()
-            raise
+            await asyncio.wait_for(bot_interactor.wait_ready(), timeout=timeout)
+        except asyncio.TimeoutError:
+            LOG.warning('Bot %s not ready after %ss', bot_interactor.config.name, timeout)
+            return None
+        return time.monotonic() - started
+
+    async def _supervise(self, bot_interactor: BotInteractor) -> None:
+        """Run a bot, restarting it with exponential backoff when it fails."""
+        attempt = 0
+        while True:
+            try:
+                await bot_interactor.initiate()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if bot_interactor.stop_bot or self.stopping.is_set():
+                    return
+                attempt += 1
+                delay = min(self.max_restart_delay, self.restart_delay * 2 ** (attempt - 1))
+                LOG.error('Bot %s failed: %s. Restarting in %.0fs', bot_interactor.config.name, e, delay)
+                try:
+                    # Wake up early if shutdown starts during the backoff
+                    await asyncio.wait_for(self.stopping.wait(), timeout=delay)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+            if bot_interactor.stop_bot or bot_interactor not in self.bot_interactors:
+                # Removed by a reload during the backoff
+                return
+            try:
+                replacement = self.create_bot_interactor(bot_interactor.config)
+            except Exception as e:
+                LOG.error('Could not recreate bot %s: %s', bot_interactor.config.name, e)
+                continue
+            self.bot_interactors[self.bot_interactors.index(bot_interactor)] = replacement
+            bot_interactor = replacement
+
+    async def _fetch_bot(self, bot_id: int) -> None:
+        bot_interactor = self.bot_interactor(bot_id)
+        if bot_interactor:
+            await bot_interactor.fetch()
+
+    def schedule_bot(self, bot_interactor: BotInteractor) -> None:
+        """Schedule a bot's fetch and broadcast according to its metadata.
+
+        Args:
+            bot_interactor: The bot to schedule
+        """
+        config = bot_interactor.config
+        try:
+            job = ScheduledJob.from_metadata(
+                f'fetch_{config.name}', functools.partial(self._fetch_bot, config.id), config.metadata)
+        except ValueError as e:
+            LOG.error('Invalid schedule for bot %s: %s', config.name, e)
+            return
+        if job:
+            self.scheduler.add_job(job)
 
     async def stop_bots(self) -> None:
-        """Stop all bots gracefully."""
+        """Stop all bots gracefully.
+
+        Every bot is signalled at once. Draining sends in flight and waiting
+        for the bot tasks share one deadline, ``drain_timeout`` seconds from
+        now; tasks still running after that are cancelled.
+        """
         LOG.info('Stopping all bots...')
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.drain_timeout
+        self.stopping.set()
+        if self.watcher:
+            self.watcher.stop()
+        if self.warm_up_task and not self.warm_up_task.done():
+            # Imports already running in the executor finish on their own
+            self.warm_up_task.cancel()
         try:
-            # First cancel all tasks
-            for task in self.tasks:
-                if not task.done():
-                    task.cancel()
-            
-            # Wait for all tasks to complete their cleanup
+            # Signal every bot at once; each drains its in-flight sends
             await asyncio.gather(
-                *[task for task in self.tasks if not task.done()],
+                *[bot.stop_polling(self.drain_timeout) for bot in self.bot_interactors],
                 return_exceptions=True
             )
+            await self.scheduler.stop()
+            if self.ingress:
+                await self.ingress.stop()
+            if self.metrics:
+                await self.metrics.stop()
             
-            # Now stop the bots (they will handle their own cleanup)
-            await asyncio.gather(
-                *[bot.stop_polling() for bot in self.bot_interactors],
-                return_exceptions=True
-            )
+            # Bot tasks return on their own once signalled; cancel stragglers
+            pending = [task for task in self.tasks if not task.done()]
+            if pending:
+                _, stragglers = await asyncio.wait(pending, timeout=max(0.0, deadline - loop.time()))
+                for task in stragglers:
+                    LOG.warning('Cancelling task %s after shutdown timeout', task.get_name())
+                    task.cancel()
+                await asyncio.gather(*stragglers, return_exceptions=True)
             
             self.tasks.clear()
+            LOG.info('Shared connection pool stats: %s', self.request.stats())
+            self.executor.close()
+            try:
+                await self.async_bots_config_dao.forget_own_changes(self.origin)
+            except SQLiteError as e:
+                LOG.error('Could not delete own change counts: %s', e)
+            # Commits writes still queued, e.g. a subscribe racing the shutdown
+            await loop.run_in_executor(None, self.database.close)
             LOG.info('All bots stopped successfully')
         except Exception as e:
-            LOG.error(f'Error during bot shutdown: {e}')
-            raise
\ No newline at end of file
+            LOG.error('Error during bot shutdown: %s', e)
+            raise
+
+
+def _loads_plugin_here(config: BotConfig) -> bool:
+    """Return whether a bot's plugin is created in this process; process mode creates it in the workers only."""
+    try:
+        return ExecutionPolicy.from_metadata(config.metadata).mode != PROCESS
+    except ValueError:
+        # The bot itself fails to start and reports the bad metadata
+        return True
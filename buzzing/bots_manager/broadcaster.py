@@ -0,0 +1,336 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+from telegram.error import BadRequest, Forbidden, RetryAfter
+from buzzing.bots_manager.send_scheduler import BULK, INTERACTIVE, SendScheduler, parse_priority
+from buzzing.model.broadcast_report import BroadcastReport
+from buzzing.util.log_setup import ContextAdapter
+from buzzing.util.metrics import REGISTRY
+from buzzing.util.rate_limiter import KeyedRateLimiter, TokenBucket
+
+LOG = logging.getLogger(__name__)
+
+SEND_SECONDS = REGISTRY.histogram('buzzing_send_seconds', 'Latency of send_message calls', ('bot',))
+SENDS = REGISTRY.counter('buzzing_sends_total', 'Messages delivered', ('bot',))
+SEND_FAILURES = REGISTRY.counter('buzzing_send_failures_total', 'Messages that could not be delivered', ('bot',))
+RATE_LIMITED = REGISTRY.counter('buzzing_send_rate_limited_total',
+                                'RetryAfter (429) responses from the Bot API', ('bot',))
+PRUNED = REGISTRY.counter('buzzing_subscriptions_pruned_total',
+                          'Subscriptions deactivated because their chat cannot be reached', ('bot',))
+
+# Telegram allows roughly 30 messages per second per token and
+# one message per second to the same chat.
+DEFAULT_CONCURRENCY = 16
+DEFAULT_GLOBAL_RATE = 30.0
+DEFAULT_PER_CHAT_RATE = 1.0
+DEFAULT_MAX_RETRIES = 3
+
+SendMessage = Callable[[int, Any], Awaitable[Any]]
+# Deactivates the subscriptions of some chats, returning how many it changed
+Deactivate = Callable[[Sequence[int]], Awaitable[int]]
+T = TypeVar('T')
+
+# Bad requests about the chat rather than the message; lower case
+DEAD_CHAT_ERRORS = ('chat not found', 'user not found', 'peer_id_invalid', 'user is deactivated',
+                    'group chat was deactivated')
+
+
+def is_dead_chat(error: BaseException) -> bool:
+    """Return whether a send error means the chat will never accept a message.
+
+    True for every Forbidden (the user blocked the bot or was deactivated,
+    the bot was removed from the group) and for bad requests about the
+    chat itself. Errors about the message, such as bad markup, are not.
+    """
+    if isinstance(error, Forbidden):
+        return True
+    if isinstance(error, BadRequest):
+        message = str(error).lower()
+        return any(text in message for text in DEAD_CHAT_ERRORS)
+    return False
+
+
+class BroadcastAborted(Exception):
+    """Raised for messages that were not sent because the broadcaster closed."""
+
+
+class Broadcaster:
+    """Sends a message to many chats concurrently under Telegram's rate limits.
+
+    A bounded pool of workers drains the recipients, each send first taking a
+    token from the per-token bucket and then from the recipient's own bucket.
+    ``RetryAfter`` responses pause the whole bucket before the send is retried.
+    Every send then waits for a slot of the SendScheduler at the
+    broadcaster's priority, so replies sent through call() overtake it.
+    Chats that fail with a permanent error are pruned in one write at the
+    end of the broadcast.
+    """
+
+    def __init__(self, bot_id: int, send_message: SendMessage,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 global_rate: float = DEFAULT_GLOBAL_RATE,
+                 per_chat_rate: float = DEFAULT_PER_CHAT_RATE,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 name: Optional[str] = None,
+                 scheduler: Optional[SendScheduler] = None,
+                 priority: int = BULK,
+                 deactivate: Optional[Deactivate] = None) -> None:
+        """Initialize the broadcaster.
+
+        Args:
+            bot_id: ID of the bot the messages are sent from
+            send_message: Coroutine function sending one message to a chat
+            concurrency: Maximum number of sends in flight
+            global_rate: Messages per second allowed for the bot token
+            per_chat_rate: Messages per second allowed for a single chat
+            max_retries: Attempts per recipient after a ``RetryAfter``
+            name: Bot name used as metrics label; the bot ID when omitted
+            scheduler: Send slots shared with the other bots of the process;
+                a private one with ``concurrency`` slots when omitted
+            priority: Class of the broadcast sends, BULK unless the bot's
+                broadcasts are more urgent
+            deactivate: Coroutine function deactivating the subscriptions
+                of chats that cannot be reached; nothing is pruned when omitted
+        """
+        self.bot_id = bot_id
+        self.send_message = send_message
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_limiter = KeyedRateLimiter(per_chat_rate)
+        self.scheduler = scheduler or SendScheduler(self.concurrency)
+        self.priority = priority
+        self.deactivate = deactivate
+        self.closed = False
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        # Resolved once; a send only touches the series
+        label = name or str(bot_id)
+        self.log = ContextAdapter(LOG, {'bot_id': bot_id, 'bot_name': label})
+        self._send_seconds = SEND_SECONDS.labels(label)
+        self._sends = SENDS.labels(label)
+        self._send_failures = SEND_FAILURES.labels(label)
+        self._rate_limited = RATE_LIMITED.labels(label)
+        self._pruned = PRUNED.labels(label)
+
+    @classmethod
+    def from_metadata(cls, bot_id: int, send_message: SendMessage,
+                      metadata: Dict[str, Any], name: Optional[str] = None,
+                      scheduler: Optional[SendScheduler] = None,
+                      deactivate: Optional[Deactivate] = None) -> 'Broadcaster':
+        """Create a broadcaster using the ``broadcast`` section of bot metadata.
+
+        Args:
+            bot_id: ID of the bot the messages are sent from
+            send_message: Coroutine function sending one message to a chat
+            metadata: Bot metadata, e.g. ``{"broadcast": {"concurrency": 8, "priority": "transactional"}}``
+            name: Bot name used as metrics label
+            scheduler: Send slots shared with the other bots of the process
+            deactivate: Coroutine function deactivating the subscriptions of
+                unreachable chats; ``{"broadcast": {"prune": false}}`` keeps them
+
+        Returns:
+            A configured broadcaster
+
+        Raises:
+            ValueError: If the priority is unknown
+        """
+        settings = metadata.get('broadcast') or {}
+        return cls(
+            bot_id,
+            send_message,
+            concurrency=int(settings.get('concurrency', DEFAULT_CONCURRENCY)),
+            global_rate=float(settings.get('global_rate', DEFAULT_GLOBAL_RATE)),
+            per_chat_rate=float(settings.get('per_chat_rate', DEFAULT_PER_CHAT_RATE)),
+            max_retries=int(settings.get('max_retries', DEFAULT_MAX_RETRIES)),
+            name=name,
+            scheduler=scheduler,
+            priority=parse_priority(settings.get('priority', 'bulk')),
+            deactivate=deactivate if settings.get('prune', True) else None,
+        )
+
+    async def send(self, chat_id: int, data: Any) -> None:
+        """Send one message honouring both rate limits.
+
+        Raises:
+            TelegramError: If the message could not be delivered
+            BroadcastAborted: If the broadcaster was closed before sending
+        """
+        attempt = 0
+        while True:
+            await self.global_bucket.acquire()
+            await self.chat_limiter.acquire(chat_id)
+            await self.scheduler.acquire(self.bot_id, self.priority)
+            if self.closed:
+                self.scheduler.release()
+                raise BroadcastAborted(f'Broadcaster of bot {self.bot_id} is closed')
+            self._in_flight += 1
+            self._idle.clear()
+            started = time.perf_counter()
+            try:
+                await self.send_message(chat_id, data)
+                self._sends.inc()
+                return
+            except RetryAfter as e:
+                self._rate_limited.inc()
+                attempt += 1
+                retry_after = float(getattr(e, 'retry_after', 1))
+                self.log.warning('Rate limited on bot %s, retrying in %ss', self.bot_id, retry_after)
+                self.global_bucket.pause(retry_after)
+                if attempt > self.max_retries:
+                    self._send_failures.inc()
+                    raise
+            except Exception:
+                self._send_failures.inc()
+                raise
+            finally:
+                self.scheduler.release()
+                self._send_seconds.observe(time.perf_counter() - started)
+                self._in_flight -= 1
+                if not self._in_flight:
+                    self._idle.set()
+
+    async def call(self, request: Callable[[], Awaitable[T]], priority: int = INTERACTIVE) -> T:
+        """Make a Bot API call, e.g. a reply, ahead of the queued broadcast sends.
+
+        The call borrows a token of the bot's bucket instead of queueing for
+        one, and waits for a send slot at ``priority``. While the bucket is
+        paused by a ``RetryAfter`` it waits like send() does.
+
+        Args:
+            request: Coroutine function making the call
+            priority: Class of the call, INTERACTIVE for replies
+
+        Returns:
+            The result of the call
+        """
+        await self.global_bucket.wait_unpaused()
+        self.global_bucket.consume()
+        async with self.scheduler.slot(self.bot_id, priority):
+            return await request()
+
+    async def prune(self, chat_ids: Sequence[int]) -> int:
+        """Deactivate the subscriptions of chats that can no longer be reached.
+
+        Failures are logged, not raised: the chats are pruned by a later
+        broadcast instead.
+
+        Args:
+            chat_ids: Chats whose sends failed with a permanent error
+
+        Returns:
+            Number of subscriptions deactivated
+        """
+        if not chat_ids or self.deactivate is None:
+            return 0
+        try:
+            pruned = await self.deactivate(chat_ids)
+        except Exception as e:
+            self.log.error('Could not prune %d dead chats of bot %s: %s', len(chat_ids), self.bot_id, e)
+            return 0
+        self._pruned.inc(pruned)
+        self.log.info('Pruned %d dead chats of bot %s', pruned, self.bot_id)
+        return pruned
+
+    @property
+    def in_flight(self) -> int:
+        """Number of sends currently waiting for the Bot API."""
+        return self._in_flight
+
+    async def close(self, timeout: float) -> bool:
+        """Stop taking new messages and wait for sends in flight.
+
+        Workers stop picking up recipients immediately; messages already
+        handed to Telegram get up to ``timeout`` seconds to complete.
+
+        Returns:
+            True if all in-flight sends finished within the timeout
+        """
+        self.closed = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            self.log.warning('Bot %s still has %d sends in flight after %ss', self.bot_id, self._in_flight, timeout)
+            return False
+
+    async def _deliver(self, messages: Iterable[Tuple[int, Any]],
+                       on_result: Callable[[int, int, Optional[Exception]], None]) -> None:
+        """Send messages with the worker pool, reporting each outcome by index and chat."""
+        pending = enumerate(messages)
+
+        async def worker() -> None:
+            for index, (chat_id, data) in pending:
+                if self.closed:
+                    return
+                try:
+                    await self.send(chat_id, data)
+                except BroadcastAborted:
+                    return
+                except Exception as e:
+                    self.log.warning('Failed to send to %s from bot %s: %s', chat_id, self.bot_id, e,
+                                     extra={'user_id': chat_id})
+                    on_result(index, chat_id, e)
+                else:
+                    on_result(index, chat_id, None)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+    async def send_batch(self, messages: Sequence[Tuple[int, Any]]) -> List[Optional[Exception]]:
+        """Send a batch of ``(chat_id, data)`` messages concurrently.
+
+        Args:
+            messages: Messages to send
+
+        Returns:
+            For each message, ``None`` if it was delivered or the error raised;
+            messages skipped because the broadcaster closed get BroadcastAborted
+        """
+        aborted = BroadcastAborted(f'Broadcaster of bot {self.bot_id} is closed')
+        results: List[Optional[Exception]] = [aborted] * len(messages)
+
+        def on_result(index: int, chat_id: int, error: Optional[Exception]) -> None:
+            results[index] = error
+
+        await self._deliver(messages, on_result)
+        return results
+
+    async def broadcast(self, chat_ids: Iterable[int], data: Any) -> BroadcastReport:
+        """Send ``data`` to every chat in ``chat_ids``.
+
+        Args:
+            chat_ids: Recipients of the message
+            data: Message to send
+
+        Returns:
+            Delivery counts and timing for this broadcast
+        """
+        started = time.monotonic()
+        counts = {'total': 0, 'sent': 0, 'failed': 0}
+        dead: List[int] = []
+
+        def on_result(index: int, chat_id: int, error: Optional[Exception]) -> None:
+            counts['total'] += 1
+            counts['failed' if error else 'sent'] += 1
+            if error is not None and is_dead_chat(error):
+                dead.append(chat_id)
+
+        await self._deliver(((chat_id, data) for chat_id in chat_ids), on_result)
+        pruned = await self.prune(dead)
+        report = BroadcastReport(
+            bot_id=self.bot_id,
+            total=counts['total'],
+            sent=counts['sent'],
+            failed=counts['failed'],
+            elapsed=time.monotonic() - started,
+            aborted=self.closed,
+            pruned=pruned,
+        )
+        if report.aborted:
+            self.log.warning('Broadcast from bot %s stopped early by shutdown', self.bot_id)
+        self.log.info('Broadcast from bot %s finished: %d/%d sent, %d failed, %d pruned in %.2fs (%.1f msg/s)',
+                      self.bot_id, report.sent, report.total, report.failed, report.pruned, report.elapsed,
+                      report.throughput)
+        return report
@@ -0,0 +1,134 @@
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict
+from buzzing.model.breaker_stats import BreakerStats
+
+LOG = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+DEFAULT_MAX_RESET_TIMEOUT = 600.0
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Stops calling an upstream that keeps failing.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    calls fail fast with CircuitOpenError. Once ``reset_timeout`` has passed
+    a single probe call is let through (half-open): its success closes the
+    breaker, its failure opens it again for twice as long, up to
+    ``max_reset_timeout``.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+                 max_reset_timeout: float = DEFAULT_MAX_RESET_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Initialize a closed breaker.
+
+        Args:
+            name: Name used in logs and stats
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds the breaker first stays open
+            max_reset_timeout: Upper bound for the doubling open period
+            clock: Monotonic time source
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._clock = clock
+        self.state = CLOSED
+        self._failures = 0
+        self._open_streak = 0
+        self._retry_at = 0.0
+        self._opened = self._rejected = 0
+
+    @classmethod
+    def from_metadata(cls, name: str, metadata: Dict[str, Any]) -> 'CircuitBreaker':
+        """Create a breaker using the ``circuit_breaker`` section of bot metadata.
+
+        Args:
+            name: Name used in logs and stats
+            metadata: Bot metadata, e.g.
+                ``{"circuit_breaker": {"failure_threshold": 3, "reset_timeout": 60}}``
+
+        Raises:
+            ValueError: If the threshold is not positive
+        """
+        settings = metadata.get('circuit_breaker') or {}
+        failure_threshold = int(settings.get('failure_threshold', DEFAULT_FAILURE_THRESHOLD))
+        if failure_threshold <= 0:
+            raise ValueError(f'Circuit breaker failure_threshold must be positive, got {failure_threshold}')
+        return cls(
+            name,
+            failure_threshold=failure_threshold,
+            reset_timeout=float(settings.get('reset_timeout', DEFAULT_RESET_TIMEOUT)),
+            max_reset_timeout=float(settings.get('max_reset_timeout', DEFAULT_MAX_RESET_TIMEOUT)),
+        )
+
+    async def call(self, function: Callable[[], Awaitable[Any]]) -> Any:
+        """Call the upstream unless the breaker is open.
+
+        Raises:
+            CircuitOpenError: If the breaker is open or a probe is in progress
+            Exception: The upstream error, which counts as a failure
+        """
+        if self.state != CLOSED:
+            if self.state == HALF_OPEN or self._clock() < self._retry_at:
+                self._rejected += 1
+                raise CircuitOpenError(f'Circuit of {self.name} is open, retry in {self._retry_in():.0f}s')
+            self.state = HALF_OPEN
+            LOG.info('Circuit of %s half-open, probing upstream', self.name)
+        try:
+            result = await function()
+        except Exception:
+            self._record_failure()
+            raise
+        except BaseException:
+            # Cancelled: no verdict on the upstream, let the next call probe
+            if self.state == HALF_OPEN:
+                self.state = OPEN
+            raise
+        self._record_success()
+        return result
+
+    def _record_success(self) -> None:
+        if self.state != CLOSED:
+            LOG.info('Circuit of %s closed', self.name)
+        self.state = CLOSED
+        self._failures = 0
+        self._open_streak = 0
+
+    def _record_failure(self) -> None:
+        self._failures += 1
+        if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+            self._open_streak += 1
+            timeout = min(self.max_reset_timeout, self.reset_timeout * 2 ** (self._open_streak - 1))
+            self._retry_at = self._clock() + timeout
+            self._opened += 1
+            self.state = OPEN
+            LOG.warning('Circuit of %s opened after %d failures, retrying in %.0fs',
+                        self.name, self._failures, timeout)
+
+    def _retry_in(self) -> float:
+        return max(0.0, self._retry_at - self._clock())
+
+    def stats(self) -> BreakerStats:
+        """Return a snapshot of the breaker's state."""
+        return BreakerStats(
+            name=self.name,
+            state=self.state,
+            consecutive_failures=self._failures,
+            opened=self._opened,
+            rejected=self._rejected,
+            retry_in=self._retry_in() if self.state == OPEN else None,
+        )
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+from sqlite3 import Connection, Error as SQLiteError
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+from buzzing.dao.async_sqlite import AsyncSQLite
+from buzzing.dao.bots_config_dao import BotsConfigDao
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_RELOAD_INTERVAL = 5.0
+
+BOTS_CONFIG = 'bots_config'
+
+
+class ConfigWatcher:
+    """Notices changes to bot configurations and subscriptions made by others.
+
+    Every ``interval`` seconds it reads ``PRAGMA data_version``, which only
+    changes when another connection commits and costs no table access. Only
+    then are the trigger-maintained counters read on a reader connection:
+    ``change_version`` for bots_config and ``subscription_change_version``
+    per bot. Subscription changes made by this process are already in
+    memory, so its own counts, kept under its ``origin`` by
+    BotsConfigDao.track_own_changes(), are subtracted in the same query. An
+    own write is therefore never mistaken for another process's, and only
+    the bots others wrote to are reloaded.
+    """
+
+    def __init__(self, connection: Connection,
+                 on_bots_changed: Callable[[], Awaitable[None]],
+                 on_subscriptions_changed: Callable[[Set[int]], Awaitable[None]],
+                 database: Optional[AsyncSQLite] = None,
+                 origin: Optional[str] = None,
+                 interval: float = DEFAULT_RELOAD_INTERVAL) -> None:
+        """Initialize the watcher.
+
+        Args:
+            connection: Connection used to detect changes
+            on_bots_changed: Called when bots_config rows changed
+            on_subscriptions_changed: Called with the IDs of the bots whose
+                subscription rows were changed by another process
+            database: Database to read the counters from, off the event
+                loop; they are read on ``connection`` when omitted
+            origin: Writer of this process's own subscription changes, see
+                track_own_changes(); every change counts as another
+                process's when omitted
+            interval: Seconds between checks
+        """
+        self.dao = BotsConfigDao(connection)
+        self.connection = connection
+        self.on_bots_changed = on_bots_changed
+        self.on_subscriptions_changed = on_subscriptions_changed
+        self.database = database
+        self.origin = origin
+        self.interval = interval
+        self._data_version: Optional[int] = None
+        self._bots_version: Optional[int] = None
+        self._subscription_versions: Dict[int, int] = {}
+        self._stopped = asyncio.Event()
+
+    async def snapshot(self) -> None:
+        """Take the current state of the database as the baseline."""
+        self._data_version = self._read_data_version()
+        self._bots_version, self._subscription_versions = await self._fetch_versions()
+
+    def _read_data_version(self) -> int:
+        return self.connection.execute('PRAGMA data_version').fetchone()[0]
+
+    async def _fetch_versions(self) -> Tuple[int, Dict[int, int]]:
+        if self.database is None:
+            return _fetch_versions(self.connection, self.origin)
+        return await self.database.read(_fetch_versions, self.origin)
+
+    async def check(self) -> None:
+        """Run the callbacks for the changes since the previous check."""
+        data_version = self._read_data_version()
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+
+        bots_version, subscription_versions = await self._fetch_versions()
+        bots_changed = bots_version != self._bots_version
+        changed_bots = {bot_id for bot_id, version in subscription_versions.items()
+                        if version != self._subscription_versions.get(bot_id, 0)}
+        self._bots_version, self._subscription_versions = bots_version, subscription_versions
+
+        if bots_changed:
+            await self.on_bots_changed()
+        if changed_bots:
+            LOG.info('Subscriptions of %d bots changed outside this process', len(changed_bots))
+            await self.on_subscriptions_changed(changed_bots)
+
+    async def run(self) -> None:
+        """Check for changes every ``interval`` seconds until stop() is called."""
+        while not self._stopped.is_set():
+            try:
+                await asyncio.wait_for(self._stopped.wait(), timeout=self.interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.check()
+            except SQLiteError as e:
+                LOG.error('Error checking for configuration changes: %s', e)
+            except Exception as e:
+                LOG.error('Error applying configuration changes: %s', e)
+
+    def stop(self) -> None:
+        """Make run() return."""
+        self._stopped.set()
+
+
+def _fetch_versions(connection: Connection, origin: Optional[str]) -> Tuple[int, Dict[int, int]]:
+    dao = BotsConfigDao(connection)
+    return (dao.fetch_change_versions().get(BOTS_CONFIG, 0),
+            dao.fetch_foreign_subscription_versions(origin))
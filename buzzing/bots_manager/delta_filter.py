@@ -0,0 +1,116 @@
+import hashlib
+import json
+import logging
+import time
+from sqlite3 import Connection
+from typing import Any, Callable, Dict, Optional
+from buzzing.dao.async_sqlite import AsyncSQLite
+from buzzing.dao.broadcast_state_dao import BroadcastStateDao
+from buzzing.model.broadcast_state import BroadcastState
+from buzzing.util.metrics import REGISTRY
+
+LOG = logging.getLogger(__name__)
+
+SKIPPED = REGISTRY.counter('buzzing_broadcasts_skipped_total',
+                           'Broadcasts skipped because the content did not change', ('bot',))
+
+
+def content_hash(data: Any) -> str:
+    """Return the SHA-256 hex digest of a broadcast payload.
+
+    Strings and bytes are hashed as they are; other payloads as canonical JSON.
+    """
+    if isinstance(data, bytes):
+        raw = data
+    elif isinstance(data, str):
+        raw = data.encode()
+    else:
+        raw = json.dumps(data, sort_keys=True, separators=(',', ':'), default=repr).encode()
+    return hashlib.sha256(raw).hexdigest()
+
+
+class DeltaFilter:
+    """Skips broadcasts whose payload equals the last one sent.
+
+    The hash of the last broadcast is kept in ``broadcast_state``, so the
+    first fetch after a restart is compared with the last broadcast before
+    it. With a ``min_resend_interval`` unchanged content is broadcast again
+    once that many seconds have passed since the last broadcast.
+    """
+
+    def __init__(self, bot_id: int, database: AsyncSQLite,
+                 min_resend_interval: Optional[float] = None,
+                 clock: Callable[[], float] = time.time,
+                 name: Optional[str] = None) -> None:
+        """Initialize the filter. The stored state is read on first use.
+
+        Args:
+            bot_id: ID of the bot
+            database: Database holding the broadcast state
+            min_resend_interval: Seconds after which unchanged content is
+                sent again; never when None
+            clock: Wall clock, as the state outlives the process
+            name: Bot name used as metrics label; the bot ID when omitted
+        """
+        self.bot_id = bot_id
+        self.database = database
+        self.min_resend_interval = min_resend_interval
+        self._clock = clock
+        self.state: Optional[BroadcastState] = None
+        self._loaded = False
+        self.skipped = 0
+        self._skipped = SKIPPED.labels(name or str(bot_id))
+
+    @classmethod
+    def from_metadata(cls, bot_id: int, database: AsyncSQLite, metadata: Dict[str, Any],
+                      name: Optional[str] = None) -> Optional['DeltaFilter']:
+        """Create a filter from the ``delta`` section of bot metadata.
+
+        Args:
+            bot_id: ID of the bot
+            database: Database holding the broadcast state
+            metadata: Bot metadata, e.g. ``{"delta": true}`` or
+                ``{"delta": {"min_resend_interval": 86400}}``
+            name: Bot name used as metrics label
+
+        Returns:
+            The filter, or None if delta mode is off for the bot
+
+        Raises:
+            ValueError: If the resend interval is negative
+        """
+        settings = metadata.get('delta')
+        if not settings:
+            return None
+        interval = settings.get('min_resend_interval') if isinstance(settings, dict) else None
+        if interval is not None and float(interval) < 0:
+            raise ValueError(f'min_resend_interval must not be negative, got {interval}')
+        return cls(bot_id, database, None if interval is None else float(interval), name=name)
+
+    async def changed(self, data: Any) -> bool:
+        """Return whether ``data`` should be broadcast; counts it as skipped if not."""
+        if not self._loaded:
+            self.state = await self.database.read(_fetch_state, self.bot_id)
+            self._loaded = True
+        state = self.state
+        if state is None or state.content_hash != content_hash(data):
+            return True
+        if self.min_resend_interval is not None and self._clock() - state.sent_at >= self.min_resend_interval:
+            return True
+        self.skipped += 1
+        self._skipped.inc()
+        return False
+
+    async def record(self, data: Any) -> None:
+        """Remember ``data`` as the last broadcast."""
+        state = BroadcastState(self.bot_id, content_hash(data), self._clock())
+        await self.database.write(_save_state, state)
+        self.state = state
+        self._loaded = True
+
+
+def _fetch_state(connection: Connection, bot_id: int) -> Optional[BroadcastState]:
+    return BroadcastStateDao(connection).fetch_state(bot_id)
+
+def _save_state(connection: Connection, state: BroadcastState) -> None:
+    BroadcastStateDao(connection).save_state(state)
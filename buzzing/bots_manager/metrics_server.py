@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from urllib.parse import parse_qs
+from buzzing.bots_manager.circuit_breaker import CLOSED, HALF_OPEN, OPEN
+from buzzing.util.http_server import HTTPServer, Request, Response
+from buzzing.util.metrics import REGISTRY, Counter, Gauge, Metric, MetricsRegistry
+from buzzing.util.sampling_profiler import ProfilerBusy, SamplingProfiler
+
+if TYPE_CHECKING:
+    from buzzing.bots_manager.bots_interactor import BotsInteractor
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_METRICS_PORT = 9100
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+CIRCUIT_STATES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+DEFAULT_PROFILE_SECONDS = 10.0
+MAX_PROFILE_SECONDS = 300.0
+
+
+class MetricsServer:
+    """Local HTTP endpoint for metrics, liveness and readiness.
+
+    ``GET /metrics`` renders the registry in Prometheus text format, adding
+    per-bot gauges that are read only when scraped. ``GET /health`` answers
+    as long as the event loop does. ``GET /ready`` returns the state of
+    every bot as JSON, with status 503 until all bots receive updates.
+    Subscriber counts are left out until a bot's subscriptions are loaded.
+    ``GET /debug/profile?seconds=N`` samples the event loop for N seconds
+    and returns the collapsed stacks, ready for a flame graph.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_METRICS_PORT,
+                 registry: MetricsRegistry = REGISTRY) -> None:
+        """Initialize the server. Nothing is bound until start().
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on; 0 picks a free port
+            registry: Registry to serve
+        """
+        self.registry = registry
+        self.server = HTTPServer(host, port)
+        self.server.route('GET', '/metrics', self._metrics)
+        self.server.route('GET', '/health', self._health)
+        self.server.route('GET', '/ready', self._ready)
+        self.server.route('GET', '/debug/profile', self._profile)
+        self.bots_interactor: Optional['BotsInteractor'] = None
+        self.profiler: Optional[SamplingProfiler] = None
+
+    def attach(self, bots_interactor: 'BotsInteractor') -> None:
+        """Report on the bots of a BotsInteractor."""
+        self.bots_interactor = bots_interactor
+
+    async def start(self) -> None:
+        """Start serving, profiling the event loop this is called on."""
+        if self.profiler is None:
+            self.profiler = SamplingProfiler()
+        self.registry.add_collector(self.collect)
+        await self.server.start()
+        LOG.info('Serving metrics on http://%s:%s/metrics', self.server.host, self.server.port)
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        self.registry.remove_collector(self.collect)
+        await self.server.stop()
+
+    def collect(self) -> List[Metric]:
+        """Return the gauges read at scrape time."""
+        tasks = Gauge('buzzing_tasks', 'Asyncio tasks of the process')
+        tasks.labels().set(len(asyncio.all_tasks()))
+        metrics: List[Metric] = [tasks]
+        if self.bots_interactor is None:
+            return metrics
+
+        labels = ('bot',)
+        ready = Gauge('buzzing_bot_ready', '1 while the bot receives updates', labels)
+        subscribers = Gauge('buzzing_subscribers', 'Active subscriptions', labels)
+        update_queue = Gauge('buzzing_update_queue_depth', 'Updates waiting to be handled', labels)
+        sends_in_flight = Gauge('buzzing_sends_in_flight', 'Sends waiting for the Bot API', labels)
+        circuit = Gauge('buzzing_circuit_state', 'Circuit breaker state: 0 closed, 1 half-open, 2 open', labels)
+        circuit_opened = Counter('buzzing_circuit_opened_total', 'Times the circuit breaker opened', labels)
+        circuit_rejected = Counter('buzzing_circuit_rejected_total',
+                                   'Fetches failed fast by an open circuit breaker', labels)
+        cache_calls = Counter('buzzing_fetch_cache_calls_total',
+                              'Fetch cache calls by outcome: hit, stale_hit, miss or coalesced',
+                              ('bot', 'method', 'result'))
+        cache_errors = Counter('buzzing_fetch_cache_errors_total', 'Upstream fetches of a fetch cache that failed',
+                               ('bot', 'method'))
+        cache_fallbacks = Counter('buzzing_fetch_cache_fallbacks_total',
+                                  'Failed fetches answered with the last good value', ('bot', 'method'))
+        for bot in list(self.bots_interactor.bot_interactors):
+            name = bot.config.name
+            ready.labels(name).set(int(bot.ready.is_set() and not bot.stop_bot))
+            if bot.subscriptions.loaded:
+                # Unknown until the first broadcast loads them
+                subscribers.labels(name).set(len(bot.subscriptions))
+            update_queue.labels(name).set(bot.application.update_queue.qsize())
+            sends_in_flight.labels(name).set(bot.broadcaster.in_flight)
+            stats = bot.breaker.stats()
+            circuit.labels(name).set(CIRCUIT_STATES[stats.state])
+            circuit_opened.labels(name).inc(stats.opened)
+            circuit_rejected.labels(name).inc(stats.rejected)
+            for method, cache in (('fetch_now', bot.fetch_now_cache), ('fetch', bot.fetch_cache)):
+                cache_stats = cache.stats()
+                cache_calls.labels(name, method, 'hit').inc(cache_stats.hits)
+                cache_calls.labels(name, method, 'stale_hit').inc(cache_stats.stale_hits)
+                cache_calls.labels(name, method, 'miss').inc(cache_stats.misses)
+                cache_calls.labels(name, method, 'coalesced').inc(cache_stats.coalesced)
+                cache_errors.labels(name, method).inc(cache_stats.errors)
+                cache_fallbacks.labels(name, method).inc(cache_stats.fallbacks)
+        return metrics + [ready, subscribers, update_queue, sends_in_flight, circuit, circuit_opened, circuit_rejected,
+                          cache_calls, cache_errors, cache_fallbacks]
+
+    def bot_states(self) -> Dict[str, Dict[str, Any]]:
+        """Return the state of every bot, as served by ``/ready``."""
+        states: Dict[str, Dict[str, Any]] = {}
+        if self.bots_interactor is None:
+            return states
+        for bot in list(self.bots_interactor.bot_interactors):
+            if bot.stop_bot:
+                state = 'stopped'
+            elif bot.ready.is_set():
+                state = 'ready'
+            elif bot.startup_error is not None:
+                state = 'failed'
+            else:
+                state = 'starting'
+            states[bot.config.name] = {'state': state, 'circuit': bot.breaker.state,
+                                       'subscribers': len(bot.subscriptions) if bot.subscriptions.loaded else None}
+        return states
+
+    async def _metrics(self, request: Request) -> Response:
+        return Response(200, self.registry.render().encode(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    async def _health(self, request: Request) -> Response:
+        return Response(200, b'ok')
+
+    async def _ready(self, request: Request) -> Response:
+        bots = self.bot_states()
+        ready = (self.bots_interactor is not None and self.bots_interactor.startup_report is not None
+                 and all(bot['state'] == 'ready' for bot in bots.values()))
+        body = json.dumps({'ready': ready, 'bots': bots}).encode()
+        return Response(200 if ready else 503, body, content_type='application/json')
+
+    async def _profile(self, request: Request) -> Response:
+        try:
+            seconds = float(parse_qs(request.query).get('seconds', [DEFAULT_PROFILE_SECONDS])[0])
+        except ValueError:
+            return Response(400, b'seconds must be a number')
+        if not 0 < seconds <= MAX_PROFILE_SECONDS:
+            return Response(400, f'seconds must be in (0, {MAX_PROFILE_SECONDS:g}]'.encode())
+        assert self.profiler is not None
+        try:
+            counts = await self.profiler.profile(seconds)
+        except ProfilerBusy as e:
+            return Response(409, str(e).encode())
+        return Response(200, SamplingProfiler.collapse(counts).encode())
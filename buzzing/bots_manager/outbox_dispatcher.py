@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import random
+import time
+from sqlite3 import Error as SQLiteError
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from telegram.error import BadRequest, Forbidden
+from buzzing.bots_manager.broadcaster import BroadcastAborted, Broadcaster, is_dead_chat
+from buzzing.dao.async_outbox_dao import AsyncOutboxDao
+from buzzing.model.broadcast_report import BroadcastReport
+from buzzing.model.outbox_entry import OutboxEntry
+from buzzing.util.log_setup import ContextAdapter
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_BACKOFF = 2.0
+DEFAULT_MAX_BACKOFF = 300.0
+# Seconds done broadcasts and their dead letters are kept
+DEFAULT_RETENTION = 7 * 24 * 3600.0
+
+# Errors that will not go away by retrying the same message to the same chat.
+PERMANENT_ERRORS = (Forbidden, BadRequest)
+
+
+class OutboxDispatcher:
+    """Delivers a bot's broadcasts from the durable outbox.
+
+    Broadcasts are written to the outbox before anything is sent. The
+    dispatcher then drains due deliveries in batches, recording each batch's
+    outcome in a single commit. Delivery is at-least-once: a crash between a
+    send and its commit re-sends at most one batch. Failed deliveries are
+    retried with exponential backoff and dead-lettered after ``max_attempts``
+    or on a permanent error. Done broadcasts are purged after ``retention``.
+    """
+
+    def __init__(self, bot_id: int, outbox_dao: AsyncOutboxDao, broadcaster: Broadcaster,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 base_backoff: float = DEFAULT_BASE_BACKOFF,
+                 max_backoff: float = DEFAULT_MAX_BACKOFF,
+                 retention: float = DEFAULT_RETENTION) -> None:
+        """Initialize the dispatcher.
+
+        Args:
+            bot_id: ID of the bot whose outbox is drained
+            outbox_dao: DAO for the outbox tables
+            broadcaster: Broadcaster used to send the messages
+            batch_size: Deliveries sent and committed together
+            max_attempts: Attempts before a delivery is dead-lettered
+            base_backoff: Delay in seconds before the first retry
+            max_backoff: Upper bound for the retry delay in seconds
+            retention: Seconds a done broadcast and its dead letters are kept
+        """
+        self.bot_id = bot_id
+        self.log = ContextAdapter(LOG, {'bot_id': bot_id})
+        self.outbox_dao = outbox_dao
+        self.broadcaster = broadcaster
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.retention = retention
+        self._lock = asyncio.Lock()
+        self._retry_handle: Optional[asyncio.TimerHandle] = None
+        self._retry_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_metadata(cls, bot_id: int, outbox_dao: AsyncOutboxDao, broadcaster: Broadcaster,
+                      metadata: Dict[str, Any]) -> 'OutboxDispatcher':
+        """Create a dispatcher using the ``outbox`` section of bot metadata.
+
+        Args:
+            bot_id: ID of the bot whose outbox is drained
+            outbox_dao: DAO for the outbox tables
+            broadcaster: Broadcaster used to send the messages
+            metadata: Bot metadata, e.g. ``{"outbox": {"max_attempts": 3}}``
+
+        Returns:
+            A configured dispatcher
+        """
+        settings = metadata.get('outbox') or {}
+        return cls(
+            bot_id,
+            outbox_dao,
+            broadcaster,
+            batch_size=int(settings.get('batch_size', DEFAULT_BATCH_SIZE)),
+            max_attempts=int(settings.get('max_attempts', DEFAULT_MAX_ATTEMPTS)),
+            base_backoff=float(settings.get('base_backoff', DEFAULT_BASE_BACKOFF)),
+            max_backoff=float(settings.get('max_backoff', DEFAULT_MAX_BACKOFF)),
+            retention=float(settings.get('retention', DEFAULT_RETENTION)),
+        )
+
+    async def enqueue(self, data: Any, user_ids: Iterable[int]) -> int:
+        """Persist a broadcast of ``data`` to ``user_ids``. Returns once it is committed.
+
+        Args:
+            data: Message to broadcast
+            user_ids: Recipients, e.g. a snapshot of the bot's audience; it
+                must not change until this returns
+
+        Returns:
+            ID of the new broadcast
+        """
+        broadcast_id = await self.outbox_dao.create_broadcast(self.bot_id, data, user_ids)
+        self.log.info('Enqueued broadcast %s for bot %s', broadcast_id, self.bot_id)
+        return broadcast_id
+
+    def backoff(self, attempts: int) -> float:
+        """Return the delay before the next attempt, with jitter."""
+        delay = min(self.max_backoff, self.base_backoff * 2 ** max(attempts - 1, 0))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def drain(self) -> BroadcastReport:
+        """Send every delivery that is currently due.
+
+        Returns:
+            Delivery counts and timing for the drained entries
+        """
+        async with self._lock:
+            started = time.monotonic()
+            total = sent = failed = pruned = 0
+            while not self.broadcaster.closed:
+                batch = await self.outbox_dao.fetch_due(self.bot_id, time.time(), self.batch_size)
+                if not batch:
+                    break
+                results = await self.broadcaster.send_batch([(e.user_id, e.payload) for e in batch])
+                delivered, retries, dead = self._classify(batch, results)
+                await self.outbox_dao.record_results(delivered, retries, dead)
+                pruned += await self.broadcaster.prune(
+                    [entry.user_id for entry, error in zip(batch, results) if error is not None and is_dead_chat(error)])
+                total += len(delivered) + len(retries) + len(dead)
+                sent += len(delivered)
+                failed += len(dead)
+            if not self.broadcaster.closed:
+                await self._schedule_retry()
+                await self._purge()
+
+        report = BroadcastReport(
+            bot_id=self.bot_id,
+            total=total,
+            sent=sent,
+            failed=failed,
+            elapsed=time.monotonic() - started,
+            aborted=self.broadcaster.closed,
+            pruned=pruned,
+        )
+        if total:
+            self.log.info('Outbox drain for bot %s: %d/%d sent, %d dead-lettered, %d pruned in %.2fs (%.1f msg/s)',
+                          self.bot_id, sent, total, failed, pruned, report.elapsed, report.throughput)
+        return report
+
+    def _classify(self, batch: List[OutboxEntry], results: List[Optional[Exception]]) -> Tuple[
+            List[OutboxEntry], List[Tuple[OutboxEntry, float, str]], List[Tuple[OutboxEntry, str]]]:
+        delivered: List[OutboxEntry] = []
+        retries: List[Tuple[OutboxEntry, float, str]] = []
+        dead: List[Tuple[OutboxEntry, str]] = []
+        now = time.time()
+        for entry, error in zip(batch, results):
+            attempts = entry.attempts + 1
+            if error is None:
+                delivered.append(entry)
+            elif isinstance(error, BroadcastAborted):
+                # Never attempted; stays pending for the next process
+                continue
+            elif isinstance(error, PERMANENT_ERRORS) or attempts >= self.max_attempts:
+                dead.append((entry, str(error)))
+            else:
+                retries.append((entry, now + self.backoff(attempts), str(error)))
+        return delivered, retries, dead
+
+    async def _purge(self) -> None:
+        """Delete done broadcasts older than the retention; retried after the next drain."""
+        try:
+            purged = await self.outbox_dao.purge_done(self.bot_id, time.time() - self.retention)
+        except SQLiteError as e:
+            self.log.error('Could not purge the outbox of bot %s: %s', self.bot_id, e)
+            return
+        if purged:
+            self.log.info('Purged %d done broadcasts of bot %s', purged, self.bot_id)
+
+    async def _schedule_retry(self) -> None:
+        """Arm a timer for the earliest delivery still waiting for a retry."""
+        if self._retry_handle:
+            self._retry_handle.cancel()
+            self._retry_handle = None
+        next_at = await self.outbox_dao.next_attempt_at(self.bot_id)
+        if next_at is None:
+            return
+        delay = max(0.0, next_at - time.time())
+        self._retry_handle = asyncio.get_running_loop().call_later(delay, self._start_retry)
+
+    def _start_retry(self) -> None:
+        self._retry_handle = None
+        self._retry_task = asyncio.ensure_future(self.resume())
+
+    async def resume(self) -> None:
+        """Continue any broadcast left pending, e.g. by a previous process."""
+        try:
+            pending = await self.outbox_dao.pending_count(self.bot_id)
+            if pending:
+                self.log.info('Resuming %d pending deliveries for bot %s', pending, self.bot_id)
+                await self.drain()
+        except Exception as e:
+            self.log.error('Error resuming outbox for bot %s: %s', self.bot_id, e)
+
+    def close(self) -> None:
+        """Stop scheduling retries. Pending deliveries stay in the outbox."""
+        if self._retry_handle:
+            self._retry_handle.cancel()
+            self._retry_handle = None
+        if self._retry_task and not self._retry_task.done():
+            self._retry_task.cancel()
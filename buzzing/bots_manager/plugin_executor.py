@@ -0,0 +1,198 @@
+import asyncio
+import inspect
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+from buzzing.bots.bot_interface import BotInterface
+from buzzing.bots.plugin_registry import LazyBot
+from buzzing.util.class_loader import class_from_string
+
+LOG = logging.getLogger(__name__)
+
+# Where a plugin's fetch runs: awaited on the event loop, in a thread or in a process
+ASYNC = 'async'
+THREAD = 'thread'
+PROCESS = 'process'
+MODES = (ASYNC, THREAD, PROCESS)
+
+# Seconds a fetch may take unless the bot's metadata says otherwise
+DEFAULT_FETCH_TIMEOUT = 60.0
+
+DEFAULT_THREADS = 8
+DEFAULT_PROCESSES = min(4, os.cpu_count() or 1)
+
+# Plugin instances of a pool worker process, created on first use
+_process_plugins: Dict[Tuple[str, str], Any] = {}
+
+
+def _complete(result: Any) -> Any:
+    # An async fetch that blocks anyway gets its own loop in the worker
+    return asyncio.run(result) if inspect.isawaitable(result) else result
+
+
+def _call_in_thread(function: Callable[[], Any]) -> Any:
+    return _complete(function())
+
+
+def _call_in_process(module_name: str, class_name: str, method: str) -> Any:
+    key = (module_name, class_name)
+    plugin = _process_plugins.get(key)
+    if plugin is None:
+        plugin = _process_plugins[key] = class_from_string(module_name, class_name)()
+    return _complete(getattr(plugin, method)())
+
+
+@dataclass(frozen=True)
+class ExecutionPolicy:
+    """How the fetches of one bot are run.
+
+    Attributes:
+        mode: ``async``, ``thread`` or ``process``; None lets the plugin
+            decide with an ``execution`` class attribute
+        timeout: Seconds a fetch may take; no limit when None
+    """
+    mode: Optional[str] = None
+    timeout: Optional[float] = DEFAULT_FETCH_TIMEOUT
+
+    @classmethod
+    def from_metadata(cls, metadata: Dict[str, Any]) -> 'ExecutionPolicy':
+        """Create a policy from the ``execution`` section of bot metadata.
+
+        Args:
+            metadata: Bot metadata, e.g. ``{"execution": {"mode": "process", "timeout": 20}}``;
+                a ``null`` timeout disables the deadline
+
+        Raises:
+            ValueError: If the mode is unknown or the timeout is not positive
+        """
+        settings = metadata.get('execution') or {}
+        mode = settings.get('mode')
+        if mode is not None and mode not in MODES:
+            raise ValueError(f"Unknown execution mode '{mode}', expected one of {', '.join(MODES)}")
+        timeout = settings.get('timeout', DEFAULT_FETCH_TIMEOUT)
+        if timeout is not None and float(timeout) <= 0:
+            raise ValueError(f'Execution timeout must be positive, got {timeout}')
+        return cls(mode=mode, timeout=None if timeout is None else float(timeout))
+
+
+class PluginExecutor:
+    """Runs plugin fetches where they do not stall the event loop.
+
+    Coroutine fetches are awaited directly unless the bot's policy says
+    otherwise. Plain sync fetches, and plugins declaring ``thread``, run in
+    a thread pool. Each ``process`` plugin gets its own pool of spawned
+    processes; only the plugin's location is sent, each worker creates its
+    own instance and results are pickled back. Pools are created on first
+    use.
+
+    A timed-out thread cannot be stopped and runs to completion in the
+    background. A timed-out process is stopped by recycling its plugin's
+    pool, which only fails the other calls of the same plugin.
+    """
+
+    def __init__(self, threads: int = DEFAULT_THREADS, processes: int = DEFAULT_PROCESSES) -> None:
+        """Initialize the executor.
+
+        Args:
+            threads: Size of the thread pool for blocking fetches
+            processes: Size of the process pool of each CPU-bound plugin
+        """
+        self.threads = threads
+        self.processes = processes
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pools: Dict[Tuple[str, str], ProcessPoolExecutor] = {}
+
+    def _threads(self) -> Executor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(self.threads, thread_name_prefix='plugin')
+        return self._thread_pool
+
+    def _processes(self, location: Tuple[str, str]) -> Executor:
+        pool = self._process_pools.get(location)
+        if pool is None:
+            pool = self._process_pools[location] = ProcessPoolExecutor(
+                self.processes, mp_context=multiprocessing.get_context('spawn'))
+        return pool
+
+    @staticmethod
+    def mode_for(plugin: Any, method: str, policy: ExecutionPolicy) -> str:
+        """Return where a plugin method runs under a policy.
+
+        Args:
+            plugin: Plugin instance, or its class
+            method: Name of the method to call
+            policy: Execution mode and timeout of the bot
+        """
+        mode = policy.mode or getattr(plugin, 'execution', ASYNC)
+        if mode not in MODES:
+            name = plugin.__name__ if isinstance(plugin, type) else type(plugin).__name__
+            raise ValueError(f"Unknown execution mode '{mode}' of plugin {name}")
+        if mode == ASYNC and not inspect.iscoroutinefunction(getattr(plugin, method)):
+            return THREAD
+        return mode
+
+    async def call(self, bot: BotInterface, method: str, policy: ExecutionPolicy = ExecutionPolicy()) -> Any:
+        """Run ``fetch`` or ``fetch_now`` of a bot's plugin.
+
+        Args:
+            bot: The bot; a LazyBot is loaded first unless it runs in
+                process mode, where only its worker creates the plugin
+            method: Name of the method to call
+            policy: Execution mode and timeout of the bot
+
+        Returns:
+            The fetched data
+
+        Raises:
+            asyncio.TimeoutError: If the call exceeds the policy's timeout
+            Exception: Any error raised by the plugin
+        """
+        if isinstance(bot, LazyBot):
+            location = (bot.module_name, bot.class_name)
+        else:
+            location = (type(bot).__module__, type(bot).__qualname__)
+        if policy.mode == PROCESS:
+            mode = PROCESS
+        else:
+            # A LazyBot's class decides, so a process plugin is never created here
+            declaring = await bot.registry.load_class(*location) if isinstance(bot, LazyBot) else bot
+            mode = self.mode_for(declaring, method, policy)
+        loop = asyncio.get_running_loop()
+        if mode == PROCESS:
+            pending = loop.run_in_executor(self._processes(location), _call_in_process, *location, method)
+        else:
+            plugin = await bot.load() if isinstance(bot, LazyBot) else bot
+            if mode == ASYNC:
+                pending = getattr(plugin, method)()
+            else:
+                pending = loop.run_in_executor(self._threads(), _call_in_thread, getattr(plugin, method))
+        if policy.timeout is None:
+            return await pending
+        try:
+            return await asyncio.wait_for(pending, policy.timeout)
+        except asyncio.TimeoutError:
+            LOG.warning('%s.%s timed out after %ss in %s mode', location[1], method, policy.timeout, mode)
+            if mode == PROCESS:
+                self._recycle_processes(location)
+            raise
+
+    def _recycle_processes(self, location: Tuple[str, str]) -> None:
+        pool = self._process_pools.pop(location, None)
+        if pool is None:
+            return
+        # The pool cannot cancel a running call; stop its workers instead
+        for process in list(getattr(pool, '_processes', {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self) -> None:
+        """Shut the pools down without waiting for calls in progress."""
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+        for pool in self._process_pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        self._process_pools.clear()
@@ -0,0 +1,257 @@
+import asyncio
+import heapq
+import logging
+import random
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from buzzing.util.cron import CronSchedule
+
+LOG = logging.getLogger(__name__)
+
+# What to do with runs that were missed or that fire while the job is still running
+POLICY_SKIP = 'skip'
+POLICY_COALESCE = 'coalesce'
+POLICY_QUEUE = 'queue'
+POLICIES = (POLICY_SKIP, POLICY_COALESCE, POLICY_QUEUE)
+
+DEFAULT_MISFIRE_GRACE = 60.0
+DEFAULT_STAGGER = 30.0
+MAX_QUEUED_RUNS = 100
+
+
+class IntervalTrigger:
+    """Fires every ``seconds``, aligned to multiples of the interval since the epoch."""
+
+    def __init__(self, seconds: float) -> None:
+        if seconds <= 0:
+            raise ValueError("interval must be positive")
+        self.seconds = seconds
+
+    def next_fire(self, after: float) -> float:
+        periods = after // self.seconds + 1
+        fire_at = periods * self.seconds
+        # Guard against floating point rounding returning a time not after ``after``
+        return fire_at if fire_at > after else (periods + 1) * self.seconds
+
+
+class CronTrigger:
+    """Fires at the times matched by a cron expression, in local time."""
+
+    def __init__(self, expression: str) -> None:
+        self.schedule = CronSchedule(expression)
+
+    def next_fire(self, after: float) -> float:
+        return self.schedule.next_after(datetime.fromtimestamp(after)).timestamp()
+
+
+class ScheduledJob:
+    """A periodic coroutine managed by the Scheduler.
+
+    The nominal fire times come from the trigger. Each job is shifted by a
+    fixed ``stagger`` offset derived from its name, so jobs sharing a schedule
+    are spread over a window, and each run is further delayed by a random
+    ``jitter``.
+    """
+
+    def __init__(self, name: str, callback: Callable[[], Awaitable[Any]], trigger: Any,
+                 jitter: float = 0.0, stagger: float = 0.0,
+                 misfire_policy: str = POLICY_COALESCE, overlap_policy: str = POLICY_SKIP,
+                 misfire_grace: float = DEFAULT_MISFIRE_GRACE) -> None:
+        """Initialize the job.
+
+        Args:
+            name: Unique name of the job
+            callback: Coroutine function to run
+            trigger: IntervalTrigger or CronTrigger producing fire times
+            jitter: Maximum random delay added to each run, in seconds
+            stagger: Width of the window the job's fixed offset is chosen from
+            misfire_policy: Handling of runs missed by more than ``misfire_grace``
+            overlap_policy: Handling of runs due while the job is still running
+            misfire_grace: Lateness in seconds after which a run counts as missed
+
+        Raises:
+            ValueError: If a policy is unknown
+        """
+        for policy in (misfire_policy, overlap_policy):
+            if policy not in POLICIES:
+                raise ValueError(f"Unknown schedule policy {policy!r}, expected one of {POLICIES}")
+        self.name = name
+        self.callback = callback
+        self.trigger = trigger
+        self.jitter = jitter
+        self.offset = (zlib.crc32(name.encode()) % 10000) / 10000 * stagger
+        self.misfire_policy = misfire_policy
+        self.overlap_policy = overlap_policy
+        self.misfire_grace = misfire_grace
+        self.nominal: float = 0.0
+        self.pending_runs = 0
+        self.task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_metadata(cls, name: str, callback: Callable[[], Awaitable[Any]],
+                      metadata: Dict[str, Any],
+                      default_stagger: float = DEFAULT_STAGGER) -> Optional['ScheduledJob']:
+        """Create a job from the ``schedule`` section of bot metadata.
+
+        Example: ``{"schedule": {"cron": "0 7 * * *", "jitter": 10, "overlap": "skip"}}``
+        or ``{"schedule": {"interval": 3600, "misfire": "coalesce"}}``.
+
+        Returns:
+            The job, or None if the bot has no schedule
+
+        Raises:
+            ValueError: If the schedule is invalid
+        """
+        spec = metadata.get('schedule')
+        if not spec:
+            return None
+        if 'cron' in spec:
+            trigger: Any = CronTrigger(spec['cron'])
+        elif 'interval' in spec:
+            trigger = IntervalTrigger(float(spec['interval']))
+        else:
+            raise ValueError(f"Schedule for {name} needs either 'cron' or 'interval'")
+        return cls(
+            name,
+            callback,
+            trigger,
+            jitter=float(spec.get('jitter', 0.0)),
+            stagger=float(spec.get('stagger', default_stagger)),
+            misfire_policy=spec.get('misfire', POLICY_COALESCE),
+            overlap_policy=spec.get('overlap', POLICY_SKIP),
+            misfire_grace=float(spec.get('misfire_grace', DEFAULT_MISFIRE_GRACE)),
+        )
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def advance(self, now: float) -> Tuple[int, float]:
+        """Move to the next nominal fire time after ``now``.
+
+        Returns:
+            Number of nominal fire times skipped over, and the next run time
+        """
+        missed = 0
+        nominal = self.trigger.next_fire(self.nominal)
+        while nominal + self.offset <= now:
+            missed += 1
+            nominal = self.trigger.next_fire(nominal)
+        self.nominal = nominal
+        return missed, nominal + self.offset + random.uniform(0, self.jitter)
+
+
+class Scheduler:
+    """Runs all periodic jobs of the process from a single timer task.
+
+    Upcoming runs are kept in a heap and one coroutine sleeps until the
+    earliest of them, so hundreds of jobs cost one timer rather than one
+    sleeping task per job.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        """Initialize the scheduler.
+
+        Args:
+            clock: Wall clock returning UNIX timestamps
+        """
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._clock = clock
+        self._heap: List[Tuple[float, int, ScheduledJob]] = []
+        self._counter = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def add_job(self, job: ScheduledJob) -> None:
+        """Add or replace a job and schedule its first run."""
+        self.remove_job(job.name)
+        now = self._clock()
+        job.nominal = now - job.offset
+        _, run_at = job.advance(now)
+        self.jobs[job.name] = job
+        self._push(run_at, job)
+        LOG.info('Scheduled job %s, first run at %s', job.name, datetime.fromtimestamp(run_at))
+
+    def remove_job(self, name: str) -> None:
+        """Remove a job. A run already in progress is left to finish."""
+        job = self.jobs.pop(name, None)
+        if job:
+            job.pending_runs = 0
+
+    def _push(self, run_at: float, job: ScheduledJob) -> None:
+        self._counter += 1
+        heapq.heappush(self._heap, (run_at, self._counter, job))
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """Start the timer task on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name='scheduler')
+
+    async def stop(self) -> None:
+        """Stop the timer task and cancel runs in progress."""
+        tasks = [job.task for job in self.jobs.values() if job.running]
+        if self._task:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            delay = self._heap[0][0] - self._clock()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, _, job = heapq.heappop(self._heap)
+            if self.jobs.get(job.name) is job:
+                self._fire(job)
+
+    def _fire(self, job: ScheduledJob) -> None:
+        now = self._clock()
+        due_nominal = job.nominal
+        missed, next_run = job.advance(now)
+        self._push(next_run, job)
+
+        runs = 1
+        if now - (due_nominal + job.offset) > job.misfire_grace + job.jitter:
+            if job.misfire_policy == POLICY_SKIP:
+                LOG.warning('Job %s missed its run, skipping', job.name)
+                return
+            if job.misfire_policy == POLICY_QUEUE:
+                runs += missed
+            LOG.warning('Job %s is late by %.1fs, running %d time(s)',
+                        job.name, now - due_nominal - job.offset, runs)
+
+        if job.running:
+            if job.overlap_policy == POLICY_SKIP:
+                LOG.warning('Job %s is still running, skipping this run', job.name)
+                return
+            if job.overlap_policy == POLICY_COALESCE:
+                job.pending_runs = 1
+            else:
+                job.pending_runs = min(job.pending_runs + runs, MAX_QUEUED_RUNS)
+            return
+
+        job.pending_runs = runs
+        job.task = asyncio.get_running_loop().create_task(self._execute(job), name=f'schedule_{job.name}')
+
+    async def _execute(self, job: ScheduledJob) -> None:
+        while job.pending_runs > 0:
+            job.pending_runs -= 1
+            try:
+                await job.callback()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                LOG.error('Error in scheduled job %s: %s', job.name, e)
@@ -0,0 +1,170 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional
+from buzzing.util.metrics import REGISTRY
+
+# Priority classes, most urgent first
+INTERACTIVE = 0
+TRANSACTIONAL = 1
+BULK = 2
+PRIORITY_NAMES = ('interactive', 'transactional', 'bulk')
+PRIORITIES = {name: priority for priority, name in enumerate(PRIORITY_NAMES)}
+
+# As many sends in flight as the shared Bot API connection pool holds
+DEFAULT_SEND_SLOTS = 64
+# Seconds of waiting that lift a send by one priority class
+DEFAULT_AGING = 5.0
+
+WAIT_SECONDS = REGISTRY.histogram('buzzing_send_wait_seconds', 'Time sends waited for a send slot', ('priority',),
+                                  buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+
+
+def parse_priority(value: object) -> int:
+    """Return the priority class named ``value``, e.g. ``"bulk"``.
+
+    Raises:
+        ValueError: If the name is unknown
+    """
+    if value not in PRIORITIES:
+        raise ValueError(f"Unknown send priority '{value}', expected one of {', '.join(PRIORITY_NAMES)}")
+    return PRIORITIES[str(value)]
+
+
+class _Waiter:
+    __slots__ = ('future', 'enqueued')
+
+    def __init__(self, future: asyncio.Future, enqueued: float) -> None:
+        self.future = future
+        self.enqueued = enqueued
+
+
+class SendScheduler:
+    """Hands out the process's Bot API send slots by priority, fairly between bots.
+
+    A send holds a slot while its request is in flight. When all slots are
+    taken, waiting sends are served by deadline: the time they started
+    waiting plus ``aging`` seconds per class below interactive. An
+    interactive reply therefore goes before any bulk send that has waited
+    less than ``2 * aging`` seconds, and a bulk send waiting longer goes
+    first, so no class starves. Within a class the bots take turns, one send
+    each, so one bot's large broadcast does not delay another bot's.
+
+    Broadcasts take a slot per message, which makes each send a point where
+    a reply can overtake the rest of the broadcast.
+    """
+
+    def __init__(self, slots: int = DEFAULT_SEND_SLOTS, aging: float = DEFAULT_AGING,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Initialize the scheduler.
+
+        Args:
+            slots: Maximum number of sends in flight in the process
+            aging: Seconds of waiting that lift a send by one class; 0
+                serves sends in arrival order
+            clock: Monotonic clock used to measure waiting time
+        """
+        self.slots = max(1, slots)
+        self.aging = aging
+        self._clock = clock
+        self._free = self.slots
+        # Per class, the bots with waiting sends in turn order
+        self._queues: List['OrderedDict[int, Deque[_Waiter]]'] = [OrderedDict() for _ in PRIORITY_NAMES]
+        self._wait_seconds = [WAIT_SECONDS.labels(name) for name in PRIORITY_NAMES]
+
+    @property
+    def in_flight(self) -> int:
+        """Number of slots taken."""
+        return self.slots - self._free
+
+    def waiting(self, priority: Optional[int] = None) -> int:
+        """Return the number of sends waiting for a slot, in one class or all."""
+        queues = self._queues if priority is None else [self._queues[priority]]
+        return sum(len(waiters) for bots in queues for waiters in bots.values())
+
+    async def acquire(self, bot_id: int, priority: int = BULK) -> None:
+        """Wait for a send slot; release() returns it.
+
+        Args:
+            bot_id: Bot sending the message
+            priority: INTERACTIVE, TRANSACTIONAL or BULK
+        """
+        if self._free > 0:
+            self._free -= 1
+            self._wait_seconds[priority].observe(0.0)
+            return
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), self._clock())
+        self._queues[priority].setdefault(bot_id, deque()).append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just before the cancellation; pass the slot on
+                self.release()
+            else:
+                self._remove(priority, bot_id, waiter)
+            raise
+        self._wait_seconds[priority].observe(self._clock() - waiter.enqueued)
+
+    def release(self) -> None:
+        """Return a slot taken by acquire()."""
+        self._free += 1
+        while self._free > 0:
+            waiter = self._next()
+            if waiter is None:
+                return
+            if waiter.future.done():
+                # Cancelled, its task not yet resumed to remove it
+                continue
+            self._free -= 1
+            waiter.future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, bot_id: int, priority: int = BULK) -> AsyncIterator[None]:
+        """Hold a send slot for the duration of the block."""
+        await self.acquire(bot_id, priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _next(self) -> Optional[_Waiter]:
+        best: Optional[float] = None
+        chosen = -1
+        for priority, bots in enumerate(self._queues):
+            if not bots:
+                continue
+            # The bot whose turn it is in this class
+            head = next(iter(bots.values()))[0]
+            deadline = head.enqueued + priority * self.aging
+            if best is None or deadline < best:
+                best, chosen = deadline, priority
+        if best is None:
+            return None
+        bots = self._queues[chosen]
+        bot_id, waiters = next(iter(bots.items()))
+        waiter = waiters.popleft()
+        if waiters:
+            bots.move_to_end(bot_id)
+        else:
+            del bots[bot_id]
+        return waiter
+
+    def _remove(self, priority: int, bot_id: int, waiter: _Waiter) -> None:
+        bots = self._queues[priority]
+        waiters = bots.get(bot_id)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            return
+        if not waiters:
+            del bots[bot_id]
+
+    def stats(self) -> Dict[str, int]:
+        """Return the slots in flight and the sends waiting per class."""
+        stats = {'in_flight': self.in_flight}
+        stats.update({name: self.waiting(priority) for priority, name in enumerate(PRIORITY_NAMES)})
+        return stats
@@ -0,0 +1,139 @@
+import asyncio
+import importlib.util
+import logging
+import time
+from typing import Any, Optional, Tuple
+import httpx
+from telegram.error import TimedOut
+from telegram.request import HTTPXRequest
+from buzzing.model.pool_stats import PoolStats
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 64
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_POOL_TIMEOUT = 5.0
+# Streams allowed per HTTP/2 connection before a request has to wait
+H2_STREAMS_PER_CONNECTION = 100
+
+
+def http2_available() -> bool:
+    """Return whether the ``h2`` package needed for HTTP/2 is installed."""
+    return importlib.util.find_spec('h2') is not None
+
+
+class SharedRequest(HTTPXRequest):
+    """One Bot API HTTP client shared by the Applications of all bots.
+
+    The Bot API URL contains the token, so a single client can serve every
+    bot. Sharing it replaces one small pool per bot with one pool of kept-alive
+    (and, with HTTP/2, multiplexed) connections. Bots initialize and shut it
+    down as they start and stop, so the client is reference counted and
+    only closed when the last bot releases it.
+
+    Long polling keeps using a per-bot request, since each pending
+    ``getUpdates`` would otherwise hold a shared connection.
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE,
+                 keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+                 pool_timeout: float = DEFAULT_POOL_TIMEOUT,
+                 http2: bool = False, **kwargs: Any) -> None:
+        """Initialize the shared client.
+
+        Args:
+            pool_size: Maximum number of open connections
+            keepalive_expiry: Seconds an idle connection is kept open
+            pool_timeout: Seconds a request may wait for a connection
+            http2: Multiplex requests over HTTP/2 if ``h2`` is installed
+            **kwargs: Further HTTPXRequest arguments, e.g. ``read_timeout``
+        """
+        if http2 and not http2_available():
+            LOG.warning('HTTP/2 requested but h2 is not installed; using HTTP/1.1')
+            http2 = False
+        self.http2 = http2
+        # Read by _build_client, which the base constructor already calls
+        self.limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=keepalive_expiry,
+        )
+        super().__init__(
+            connection_pool_size=pool_size,
+            pool_timeout=pool_timeout,
+            http_version='2' if http2 else '1.1',
+            **kwargs,
+        )
+        self.pool_timeout = pool_timeout
+        self._slots = asyncio.Semaphore(pool_size * (H2_STREAMS_PER_CONNECTION if http2 else 1))
+        self._users = 0
+        self._requests = self._active = self._waiting = 0
+        self._total_wait = self._max_wait = 0.0
+
+    def _build_client(self) -> httpx.AsyncClient:
+        # HTTPXRequest only takes extra client arguments from PTB 21.6 on
+        self._client_kwargs['limits'] = self.limits
+        return super()._build_client()
+
+    async def initialize(self) -> None:
+        """Open the client for one more bot."""
+        self._users += 1
+        if self._users == 1:
+            try:
+                await super().initialize()
+            except BaseException:
+                # Not a user if opening failed; the next bot tries again
+                self._users -= 1
+                raise
+
+    async def shutdown(self) -> None:
+        """Release the client for one bot; closes it after the last one."""
+        if self._users == 0:
+            return
+        self._users -= 1
+        if self._users == 0:
+            await super().shutdown()
+
+    async def do_request(self, *args: Any, **kwargs: Any) -> Tuple[int, bytes]:
+        """Send a request once a connection slot is free, recording the wait."""
+        started = time.monotonic()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.pool_timeout)
+        except asyncio.TimeoutError:
+            raise TimedOut('Pool timeout: all shared connections are busy')
+        finally:
+            self._waiting -= 1
+        waited = time.monotonic() - started
+        self._requests += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+        self._active += 1
+        try:
+            return await super().do_request(*args, **kwargs)
+        finally:
+            self._active -= 1
+            self._slots.release()
+
+    def _connection_counts(self) -> Tuple[Optional[int], Optional[int]]:
+        # httpx does not expose its pool; read httpcore's when it is there
+        pool = getattr(getattr(self._client, '_transport', None), '_pool', None)
+        connections = getattr(pool, 'connections', None)
+        if connections is None:
+            return None, None
+        return len(connections), sum(1 for c in connections if c.is_idle())
+
+    def stats(self) -> PoolStats:
+        """Return a snapshot of the pool's usage."""
+        open_connections, idle_connections = self._connection_counts()
+        return PoolStats(
+            users=self._users,
+            requests=self._requests,
+            active=self._active,
+            waiting=self._waiting,
+            total_wait=self._total_wait,
+            max_wait=self._max_wait,
+            open_connections=open_connections,
+            idle_connections=idle_connections,
+            http2=self.http2,
+        )
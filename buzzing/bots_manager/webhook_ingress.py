@@ -0,0 +1,96 @@
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+from typing import Dict, Tuple
+from telegram import Update
+from telegram.ext import Application
+from buzzing.util.http_server import HTTPServer, Request, Response
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_WEBHOOK_PORT = 8080
+SECRET_HEADER = 'x-telegram-bot-api-secret-token'
+
+
+class WebhookIngress:
+    """One HTTP endpoint receiving webhook updates for every bot.
+
+    Each bot gets its own path derived from its token, so Telegram's requests
+    are routed to the right Application without parsing the update. Requests
+    must also carry the per-process secret token Telegram echoes in the
+    ``X-Telegram-Bot-Api-Secret-Token`` header. Updates are put on the
+    Application's update queue, exactly where polling would have put them.
+    """
+
+    def __init__(self, base_url: str, host: str = '0.0.0.0', port: int = DEFAULT_WEBHOOK_PORT) -> None:
+        """Initialize the ingress. Nothing is bound until start().
+
+        Args:
+            base_url: Public URL under which Telegram reaches this server,
+                e.g. ``https://bots.example.com``
+            host: Interface to listen on
+            port: Port to listen on; 0 picks a free port
+        """
+        self.base_url = base_url.rstrip('/')
+        self.server = HTTPServer(host, port)
+        self.secret_token = secrets.token_urlsafe(32)
+        self._applications: Dict[str, Tuple[str, Application]] = {}
+
+    @staticmethod
+    def path_for(token: str) -> str:
+        """Return the webhook path of a bot. Stable across restarts, token not revealed."""
+        return f'/webhook/{hashlib.sha256(token.encode()).hexdigest()[:32]}'
+
+    def url_for(self, token: str) -> str:
+        """Return the public webhook URL of a bot."""
+        return f'{self.base_url}{self.path_for(token)}'
+
+    async def start(self) -> None:
+        """Start accepting webhook requests."""
+        await self.server.start()
+
+    async def stop(self) -> None:
+        """Stop accepting webhook requests."""
+        await self.server.stop()
+
+    async def register(self, name: str, token: str, application: Application) -> None:
+        """Route a bot's updates to its Application and point its webhook here.
+
+        Args:
+            name: Bot name used in logs
+            token: The bot's Telegram token
+            application: The bot's Application; it must be started to
+                process its update queue
+        """
+        path = self.path_for(token)
+        self._applications[path] = (name, application)
+        self.server.route('POST', path, self._handle_update)
+        await application.bot.set_webhook(
+            url=self.url_for(token),
+            secret_token=self.secret_token,
+            allowed_updates=Update.ALL_TYPES,
+        )
+        LOG.info('Webhook registered for bot %s', name)
+
+    def unregister(self, token: str) -> None:
+        """Stop routing a bot's updates. Telegram keeps queueing them until it is registered again."""
+        path = self.path_for(token)
+        self._applications.pop(path, None)
+        self.server.remove_route('POST', path)
+
+    async def _handle_update(self, request: Request) -> Response:
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ''), self.secret_token):
+            return Response(403, b'Forbidden')
+        entry = self._applications.get(request.path)
+        if entry is None:
+            return Response(404, b'Not Found')
+        name, application = entry
+        try:
+            update = Update.de_json(json.loads(request.body), application.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            LOG.warning('Invalid update for bot %s: %s', name, e)
+            return Response(400, b'Bad Request')
+        await application.update_queue.put(update)
+        return Response(200)
@@ -0,0 +1,84 @@
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Iterator
+
+# Removals up to this many shift the buffer one by one; more rebuild it in one pass
+_REBUILD_THRESHOLD = 64
+
+
+class Audience:
+    """Sorted set of user IDs stored in one contiguous ``array('q')``.
+
+    Takes 8 bytes per subscriber instead of a Python object per subscriber.
+    Membership is a binary search. Adding or removing an ID shifts the tail
+    of the buffer, a single memmove even for millions of IDs.
+    """
+    __slots__ = ('_ids',)
+
+    def __init__(self, user_ids: Iterable[int] = ()) -> None:
+        """Initialize the audience.
+
+        Args:
+            user_ids: User IDs in any order; duplicates are dropped
+        """
+        self._ids = array('q', sorted(set(user_ids)))
+
+    @classmethod
+    def from_sorted(cls, user_ids: 'array[int]') -> 'Audience':
+        """Wrap a buffer that is already sorted and free of duplicates, without copying it."""
+        audience = cls()
+        audience._ids = user_ids
+        return audience
+
+    def __contains__(self, user_id: object) -> bool:
+        if not isinstance(user_id, int):
+            return False
+        ids = self._ids
+        position = bisect_left(ids, user_id)
+        return position < len(ids) and ids[position] == user_id
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ids)
+
+    def add(self, user_id: int) -> bool:
+        """Add a user; returns whether it was missing."""
+        position = bisect_left(self._ids, user_id)
+        if position < len(self._ids) and self._ids[position] == user_id:
+            return False
+        self._ids.insert(position, user_id)
+        return True
+
+    def discard(self, user_id: int) -> bool:
+        """Remove a user; returns whether it was present."""
+        position = bisect_left(self._ids, user_id)
+        if position < len(self._ids) and self._ids[position] == user_id:
+            self._ids.pop(position)
+            return True
+        return False
+
+    def discard_all(self, user_ids: Iterable[int]) -> int:
+        """Remove several users; returns how many were present."""
+        removed = set(user_ids)
+        if len(removed) <= _REBUILD_THRESHOLD:
+            return sum(self.discard(user_id) for user_id in removed)
+        before = len(self._ids)
+        self._ids = array('q', (user_id for user_id in self._ids if user_id not in removed))
+        return before - len(self._ids)
+
+    def snapshot(self) -> 'array[int]':
+        """Return a copy of the user IDs, unaffected by later changes."""
+        return self._ids[:]
+
+    def chunks(self, size: int) -> Iterator['array[int]']:
+        """Yield the user IDs of a snapshot in slices of at most ``size``, e.g. for batched sends."""
+        ids = self.snapshot()
+        for start in range(0, len(ids), size):
+            yield ids[start:start + size]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the ID buffer."""
+        return self._ids.buffer_info()[1] * self._ids.itemsize
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+from buzzing.model.cache_stats import CacheStats
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_TTL = 0.0
+DEFAULT_STALE_TTL = 0.0
+
+Fetch = Callable[[], Awaitable[Any]]
+
+
+class FetchCache:
+    """Caches the result of a bot's fetch with single-flight semantics.
+
+    Concurrent callers share one upstream call. A value younger than ``ttl``
+    is returned as is; one younger than ``ttl + stale_ttl`` is returned
+    immediately while a single background refresh replaces it
+    (stale-while-revalidate). Failures are never cached: the error goes to
+    the callers of that fetch and the last good value stays in place. For
+    the error types in ``fallback_on``, e.g. an open circuit breaker, the
+    last good value is returned instead, however old it is.
+
+    With the defaults nothing is cached, but concurrent calls are still
+    coalesced.
+    """
+
+    def __init__(self, name: str, fetch: Fetch, ttl: float = DEFAULT_TTL,
+                 stale_ttl: float = DEFAULT_STALE_TTL,
+                 clock: Callable[[], float] = time.monotonic,
+                 fallback_on: Tuple[Type[BaseException], ...] = ()) -> None:
+        """Initialize the cache.
+
+        Args:
+            name: Name used in logs and stats
+            fetch: Coroutine function performing the upstream fetch
+            ttl: Seconds a fetched value is served as fresh
+            stale_ttl: Further seconds a value is served while refreshing
+            clock: Monotonic time source
+            fallback_on: Errors answered with the last good value, if any
+        """
+        self.name = name
+        self._fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._clock = clock
+        self.fallback_on = fallback_on
+        self._value: Any = None
+        self._fetched_at: Optional[float] = None
+        self._in_flight: Optional[asyncio.Task] = None
+        self._hits = self._stale_hits = self._misses = self._coalesced = self._errors = 0
+        self._fallbacks = 0
+
+    @classmethod
+    def from_metadata(cls, name: str, fetch: Fetch, metadata: Dict[str, Any], key: str,
+                      fallback_on: Tuple[Type[BaseException], ...] = ()) -> 'FetchCache':
+        """Create a cache using the ``fetch_cache`` section of bot metadata.
+
+        Args:
+            name: Name used in logs and stats
+            fetch: Coroutine function performing the upstream fetch
+            metadata: Bot metadata, e.g.
+                ``{"fetch_cache": {"fetch_now": {"ttl": 30, "stale_ttl": 300}}}``
+            key: Which fetch to configure, ``fetch_now`` or ``fetch``
+            fallback_on: Errors answered with the last good value, if any
+
+        Returns:
+            A configured cache
+        """
+        settings = (metadata.get('fetch_cache') or {}).get(key) or {}
+        return cls(
+            name,
+            fetch,
+            ttl=float(settings.get('ttl', DEFAULT_TTL)),
+            stale_ttl=float(settings.get('stale_ttl', DEFAULT_STALE_TTL)),
+            fallback_on=fallback_on,
+        )
+
+    async def get(self) -> Any:
+        """Return the cached value, fetching or refreshing it as needed.
+
+        Raises:
+            Exception: The upstream error, if there is no usable value
+        """
+        if self._fetched_at is not None:
+            age = self._clock() - self._fetched_at
+            if age < self.ttl:
+                self._hits += 1
+                return self._value
+            if age < self.ttl + self.stale_ttl:
+                self._stale_hits += 1
+                if self._in_flight is None:
+                    self._start_fetch()
+                return self._value
+
+        if self._in_flight is None:
+            self._misses += 1
+            self._start_fetch()
+        else:
+            self._coalesced += 1
+        # A cancelled caller must not cancel the fetch other callers wait for
+        return await asyncio.shield(self._in_flight)  # type: ignore[arg-type]
+
+    def _start_fetch(self) -> None:
+        self._in_flight = asyncio.ensure_future(self._run_fetch())
+        # Background refreshes may have no awaiting caller
+        self._in_flight.add_done_callback(_consume_error)
+
+    async def _run_fetch(self) -> Any:
+        try:
+            value = await self._fetch()
+        except Exception as e:
+            if isinstance(e, self.fallback_on) and self._fetched_at is not None:
+                self._fallbacks += 1
+                LOG.warning('Fetch for %s failed: %s. Serving the last good value', self.name, e)
+                return self._value
+            self._errors += 1
+            LOG.error('Fetch for %s failed: %s', self.name, e)
+            raise
+        else:
+            self._value = value
+            self._fetched_at = self._clock()
+            return value
+        finally:
+            self._in_flight = None
+
+    def invalidate(self) -> None:
+        """Drop the cached value; the next call fetches again."""
+        self._value = None
+        self._fetched_at = None
+
+    def stats(self) -> CacheStats:
+        """Return a snapshot of the cache's counters."""
+        return CacheStats(
+            name=self.name,
+            hits=self._hits,
+            stale_hits=self._stale_hits,
+            misses=self._misses,
+            coalesced=self._coalesced,
+            errors=self._errors,
+            fallbacks=self._fallbacks,
+        )
+
+    def close(self) -> None:
+        """Cancel a fetch still in flight."""
+        if self._in_flight and not self._in_flight.done():
+            self._in_flight.cancel()
+
+
+def _consume_error(task: asyncio.Task) -> None:
+    if not task.cancelled():
+        task.exception()
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+from array import array
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
+from buzzing.cache.audience import Audience
+from buzzing.model.subscription import Subscription
+
+LOG = logging.getLogger(__name__)
+
+# Yields the sorted user IDs of a bot in ascending pages, e.g. AsyncBotsConfigDao.stream_audience
+AudienceStream = Callable[[int], AsyncIterator['array[int]']]
+
+class SubscriptionIndex:
+    """Active subscribers of one bot.
+
+    Only user IDs are kept, in a sorted Audience: 8 bytes per subscriber,
+    O(log n) membership checks and broadcasts in a stable order. Usernames
+    are not needed to send; ``BotsConfigDao.fetch_subscription`` loads one
+    when it is.
+
+    An index created unloaded is empty until load() streams it from the
+    database, so bots start without reading their audience. Changes applied
+    while it streams are replayed on the result, none are lost.
+    """
+
+    def __init__(self, bot_id: int, subscriptions: Iterable[Subscription] = (), loaded: bool = True) -> None:
+        """Initialize the index.
+
+        Args:
+            bot_id: ID of the bot the subscriptions belong to
+            subscriptions: Initial subscriptions; inactive ones are ignored
+            loaded: Whether the subscriptions are complete; an unloaded
+                index is filled by load()
+        """
+        self.bot_id = bot_id
+        self.audience = Audience()
+        self._generation = 0
+        # Changes applied while streaming, replayed on the streamed audience
+        self._pending: Optional[Dict[int, bool]] = None
+        self._loading: Optional[asyncio.Future] = None
+        self.reset(subscriptions)
+        self.loaded = loaded
+
+    def __contains__(self, user_id: object) -> bool:
+        return user_id in self.audience
+
+    def __len__(self) -> int:
+        return len(self.audience)
+
+    def __iter__(self) -> Iterator[int]:
+        """Iterate the subscribed user IDs in ascending order."""
+        return iter(self.audience)
+
+    def user_ids(self) -> List[int]:
+        """Return the IDs of all subscribed users as a list.
+
+        Prefer snapshot() for large audiences: it copies a buffer instead of
+        creating an int object per subscriber.
+        """
+        return list(self.audience)
+
+    def snapshot(self) -> 'array[int]':
+        """Return the subscribed user IDs in ascending order, unaffected by later changes."""
+        return self.audience.snapshot()
+
+    def chunks(self, size: int) -> Iterator['array[int]']:
+        """Yield the subscribed user IDs in slices of at most ``size``."""
+        return self.audience.chunks(size)
+
+    def reset(self, subscriptions: Iterable[Subscription]) -> None:
+        """Replace the contents in place, keeping the index shared with its bot."""
+        active: Dict[int, None] = {}
+        for subscription in subscriptions:
+            if subscription.is_active:
+                active[subscription.user_id] = None
+            else:
+                active.pop(subscription.user_id, None)
+        self._replace(Audience(active))
+
+    def _replace(self, audience: Audience) -> None:
+        # Newer than anything being streamed
+        self._generation += 1
+        self.audience = audience
+        self.loaded = True
+
+    def invalidate(self) -> None:
+        """Drop the contents; the next load() streams them again."""
+        self._generation += 1
+        self.audience = Audience()
+        self.loaded = False
+
+    def apply(self, subscription: Subscription) -> None:
+        """Add an active subscription or remove an inactive one."""
+        if self._pending is not None:
+            self._pending[subscription.user_id] = subscription.is_active
+        if not self.loaded:
+            # The next load() reads the committed change from the database
+            return
+        if subscription.is_active:
+            self.audience.add(subscription.user_id)
+        else:
+            self.audience.discard(subscription.user_id)
+
+    def discard(self, user_ids: Iterable[int]) -> None:
+        """Remove several users, e.g. after their subscriptions were deactivated together."""
+        user_ids = list(user_ids)
+        if self._pending is not None:
+            self._pending.update((user_id, False) for user_id in user_ids)
+        if self.loaded:
+            self.audience.discard_all(user_ids)
+
+    async def load(self, stream: AudienceStream) -> None:
+        """Stream the subscriptions from the database unless they are loaded.
+
+        Concurrent calls share one stream, and cancelling a caller does not
+        cancel it.
+
+        Args:
+            stream: Source of the bot's user IDs
+
+        Raises:
+            Exception: Any error of the stream; the next call retries
+        """
+        while not self.loaded:
+            await self._stream(stream)
+
+    async def reload(self, stream: AudienceStream) -> None:
+        """Stream the subscriptions again, serving the current ones until done.
+
+        Args:
+            stream: Source of the bot's user IDs
+        """
+        await self._stream(stream)
+
+    async def _stream(self, stream: AudienceStream) -> None:
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(self._read(stream))
+            self._loading.add_done_callback(self._streamed)
+        await asyncio.shield(self._loading)
+
+    def _streamed(self, future: asyncio.Future) -> None:
+        self._loading = None
+        if not future.cancelled():
+            # Retrieved here so an error nobody awaits is not reported as lost
+            future.exception()
+
+    async def _read(self, stream: AudienceStream) -> None:
+        generation = self._generation
+        self._pending = {}
+        try:
+            user_ids = array('q')
+            async for page in stream(self.bot_id):
+                user_ids.extend(page)
+            if generation != self._generation:
+                # Invalidated or replaced while streaming
+                return
+            audience = Audience.from_sorted(user_ids)
+            for user_id, active in self._pending.items():
+                if active:
+                    audience.add(user_id)
+                else:
+                    audience.discard(user_id)
+            self.audience = audience
+            self.loaded = True
+            LOG.debug('Loaded %d subscriptions of bot %s', len(audience), self.bot_id)
+        finally:
+            self._pending = None
+
+
+class SubscriptionCache:
+    """In-memory view of all active subscriptions, indexed per bot.
+
+    Kept current by the DAO after each committed write, so the audience of
+    a broadcast never requires a query once it is loaded. A lazy cache
+    creates its indexes unloaded; each is streamed from the database on
+    first use instead of all of them at startup.
+    """
+
+    def __init__(self, subscriptions: Iterable[Subscription] = (), lazy: bool = False) -> None:
+        """Initialize the cache.
+
+        Args:
+            subscriptions: Subscriptions to load
+            lazy: Whether indexes of bots without given subscriptions are
+                created unloaded
+        """
+        self.lazy = lazy
+        self._indexes: Dict[int, SubscriptionIndex] = {}
+        by_bot: Dict[int, List[Subscription]] = {}
+        for subscription in subscriptions:
+            by_bot.setdefault(subscription.bot_id, []).append(subscription)
+        for bot_id, bot_subscriptions in by_bot.items():
+            self.index(bot_id).reset(bot_subscriptions)
+
+    def index(self, bot_id: int) -> SubscriptionIndex:
+        """Return the live index of a bot, creating an empty one if needed."""
+        index = self._indexes.get(bot_id)
+        if index is None:
+            index = self._indexes[bot_id] = SubscriptionIndex(bot_id, loaded=not self.lazy)
+        return index
+
+    def indexes(self) -> List[SubscriptionIndex]:
+        """Return the indexes of all bots seen so far."""
+        return list(self._indexes.values())
+
+    def apply(self, subscription: Subscription) -> None:
+        """Reflect a committed subscription change."""
+        self.index(subscription.bot_id).apply(subscription)
+
+    def __len__(self) -> int:
+        return sum(len(index) for index in self._indexes.values())
@@ -0,0 +1,162 @@
+import logging
+from array import array
+from sqlite3 import Connection
+from typing import AsyncIterator, List, Optional, Sequence
+from buzzing.cache.subscription_cache import SubscriptionCache
+from buzzing.dao.async_sqlite import AsyncSQLite
+from buzzing.dao.bots_config_dao import BotsConfigDao
+from buzzing.model.bot_config import BotConfig
+from buzzing.model.subscription import Subscription
+
+LOG = logging.getLogger(__name__)
+
+# Rows per keyset page when streaming subscriptions
+DEFAULT_PAGE_SIZE = 10_000
+# Below every SQLite integer, so the first page starts at the lowest user ID
+_BEFORE_FIRST = -2 ** 63
+
+class AsyncBotsConfigDao:
+    """Awaitable Data Access Object for bot configurations and subscriptions.
+
+    Runs the queries of BotsConfigDao off the event loop: writes are
+    group-committed by the database's writer thread and reads use its pool
+    of reader connections. Committed subscription changes are applied to
+    the subscription cache, if one is given.
+    """
+
+    def __init__(self, database: AsyncSQLite, cache: Optional[SubscriptionCache] = None):
+        """Initialize the DAO.
+
+        Args:
+            database: Asynchronous access to the SQLite database
+            cache: Subscription cache to keep in sync with the database
+        """
+        self.database = database
+        self.cache = cache
+
+    async def fetch_all_bots_configs(self) -> List[BotConfig]:
+        """Fetch all active bot configurations.
+
+        Returns:
+            List of active bot configurations
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        return await self.database.read(_fetch_all_bots_configs)
+
+    async def stream_audience(self, bot_id: int, page_size: int = DEFAULT_PAGE_SIZE) -> AsyncIterator['array[int]']:
+        """Stream the sorted user IDs of a bot's active subscribers in keyset pages.
+
+        Only one page is held at a time, and each page is a separate read,
+        so writes can commit between pages. A subscription changed during
+        the stream may or may not be included.
+
+        Args:
+            bot_id: ID of the bot
+            page_size: Maximum number of user IDs per page
+
+        Yields:
+            Non-empty pages of user IDs, ascending across pages
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        after = _BEFORE_FIRST
+        while True:
+            page = await self.database.read(_fetch_audience_page, bot_id, after, page_size)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after = page[-1]
+
+    async def fetch_subscription(self, bot_id: int, user_id: int) -> Optional[Subscription]:
+        """Fetch the subscription of one user, e.g. for the username the cache does not keep.
+
+        Args:
+            bot_id: ID of the bot
+            user_id: Telegram user ID
+
+        Returns:
+            The subscription, active or not, or None if the user never subscribed
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        return await self.database.read(_fetch_subscription, bot_id, user_id)
+
+    async def subscribe(self, subscription: Subscription) -> None:
+        """Subscribe a user to a bot. Returns once the write is committed.
+
+        Args:
+            subscription: Subscription details
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        await self.database.write(_subscribe, subscription)
+        if self.cache is not None:
+            self.cache.apply(subscription)
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        """Unsubscribe a user from a bot. Returns once the write is committed.
+
+        Args:
+            subscription: Subscription to deactivate
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        await self.database.write(_unsubscribe, subscription)
+        if self.cache is not None:
+            self.cache.apply(subscription)
+
+    async def deactivate_subscriptions(self, bot_id: int, user_ids: Sequence[int]) -> int:
+        """Deactivate the subscriptions of many users of a bot in one transaction.
+
+        Args:
+            bot_id: ID of the bot
+            user_ids: Telegram user IDs to unsubscribe
+
+        Returns:
+            Number of subscriptions that were active and are now deactivated
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        changed = await self.database.write(_deactivate_subscriptions, bot_id, list(user_ids))
+        if self.cache is not None:
+            self.cache.index(bot_id).discard(user_ids)
+        return changed
+
+    async def forget_own_changes(self, origin: str) -> None:
+        """Delete the own change counts of a writer that stopped.
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        await self.database.write(_forget_own_changes, origin)
+
+
+def _fetch_all_bots_configs(connection: Connection) -> List[BotConfig]:
+    return BotsConfigDao(connection).fetch_all_bots_configs()
+
+def _fetch_audience_page(connection: Connection, bot_id: int, after_user_id: int, limit: int) -> 'array[int]':
+    return BotsConfigDao(connection).fetch_audience_page(bot_id, after_user_id, limit)
+
+def _fetch_subscription(connection: Connection, bot_id: int, user_id: int) -> Optional[Subscription]:
+    return BotsConfigDao(connection).fetch_subscription(bot_id, user_id)
+
+def _subscribe(connection: Connection, subscription: Subscription) -> int:
+    return BotsConfigDao(connection).subscribe(subscription)
+
+def _unsubscribe(connection: Connection, subscription: Subscription) -> int:
+    return BotsConfigDao(connection).unsubscribe(subscription)
+
+def _deactivate_subscriptions(connection: Connection, bot_id: int, user_ids: List[int]) -> int:
+    return BotsConfigDao(connection).deactivate_subscriptions(bot_id, user_ids)
+
+def _forget_own_changes(connection: Connection, origin: str) -> None:
+    BotsConfigDao(connection).forget_own_changes(origin)
@@ -0,0 +1,120 @@
+import logging
+from sqlite3 import Connection
+from typing import Any, Iterable, List, Optional, Tuple
+from buzzing.dao.async_sqlite import AsyncSQLite
+from buzzing.dao.outbox_dao import OutboxDao
+from buzzing.model.outbox_entry import OutboxEntry
+
+LOG = logging.getLogger(__name__)
+
+
+class AsyncOutboxDao:
+    """Awaitable Data Access Object for the durable broadcast outbox.
+
+    Runs the queries of OutboxDao off the event loop: writes are
+    group-committed by the database's writer thread and reads use its pool
+    of reader connections.
+    """
+
+    def __init__(self, database: AsyncSQLite):
+        """Initialize the DAO.
+
+        Args:
+            database: Asynchronous access to the SQLite database
+        """
+        self.database = database
+
+    async def create_broadcast(self, bot_id: int, payload: Any, user_ids: Iterable[int]) -> int:
+        """Persist a broadcast and one pending delivery per recipient.
+
+        Args:
+            bot_id: ID of the bot sending the broadcast
+            payload: JSON-serializable message to deliver
+            user_ids: Recipients of the broadcast; read on the writer thread,
+                so it must not change until this returns
+
+        Returns:
+            ID of the new broadcast
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        return await self.database.write(_create_broadcast, bot_id, payload, user_ids)
+
+    async def fetch_due(self, bot_id: int, now: float, limit: int) -> List[OutboxEntry]:
+        """Fetch pending deliveries of a bot that are due for an attempt.
+
+        Args:
+            bot_id: ID of the bot
+            now: Current UNIX timestamp
+            limit: Maximum number of entries to return
+
+        Returns:
+            Due entries, oldest attempt time first
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        return await self.database.read(_fetch_due, bot_id, now, limit)
+
+    async def next_attempt_at(self, bot_id: int) -> Optional[float]:
+        """Return when the earliest pending delivery of a bot becomes due.
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        return await self.database.read(_next_attempt_at, bot_id)
+
+    async def pending_count(self, bot_id: int) -> int:
+        """Count deliveries of a bot that have not been sent or dead-lettered.
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        return await self.database.read(_pending_count, bot_id)
+
+    async def record_results(self, sent: Iterable[OutboxEntry],
+                             retries: Iterable[Tuple[OutboxEntry, float, str]],
+                             dead: Iterable[Tuple[OutboxEntry, str]]) -> None:
+        """Record the outcome of a batch of deliveries in one transaction.
+
+        Args:
+            sent: Entries that were delivered
+            retries: Entries to retry, with their next attempt time and error
+            dead: Entries that will not be retried, with their error
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        await self.database.write(_record_results, list(sent), list(retries), list(dead))
+
+    async def purge_done(self, bot_id: int, before: float) -> int:
+        """Delete done broadcasts of a bot created before ``before``, with their dead letters.
+
+        Returns:
+            Number of broadcasts deleted
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        return await self.database.write(_purge_done, bot_id, before)
+
+
+def _create_broadcast(connection: Connection, bot_id: int, payload: Any, user_ids: Iterable[int]) -> int:
+    return OutboxDao(connection).create_broadcast(bot_id, payload, user_ids)
+
+def _fetch_due(connection: Connection, bot_id: int, now: float, limit: int) -> List[OutboxEntry]:
+    return OutboxDao(connection).fetch_due(bot_id, now, limit)
+
+def _next_attempt_at(connection: Connection, bot_id: int) -> Optional[float]:
+    return OutboxDao(connection).next_attempt_at(bot_id)
+
+def _pending_count(connection: Connection, bot_id: int) -> int:
+    return OutboxDao(connection).pending_count(bot_id)
+
+def _record_results(connection: Connection, sent: List[OutboxEntry],
+                    retries: List[Tuple[OutboxEntry, float, str]], dead: List[Tuple[OutboxEntry, str]]) -> None:
+    OutboxDao(connection).record_results(sent, retries, dead)
+
+def _purge_done(connection: Connection, bot_id: int, before: float) -> int:
+    return OutboxDao(connection).purge_done(bot_id, before)
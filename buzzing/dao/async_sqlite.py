@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from sqlite3 import Connection
+from typing import Any, Callable, List, Optional, Tuple
+from buzzing.dao.migrator import configure_connection
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_READERS = 2
+DEFAULT_MAX_BATCH = 256
+
+Operation = Callable[..., Any]
+
+
+def database_file(connection: Connection) -> str:
+    """Return the file backing the main database of a connection.
+
+    Returns:
+        Absolute path of the database file, or '' for in-memory databases
+    """
+    for _, name, path in connection.execute('PRAGMA database_list'):
+        if name == 'main':
+            return path or ''
+    return ''
+
+
+def _resolve(future: asyncio.Future, result: Any, error: Optional[BaseException]) -> None:
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class SQLiteWriter:
+    """Serializes all writes through one thread and group-commits them.
+
+    Each queued operation runs inside its own savepoint, so a failing
+    operation only rolls back itself, while every operation that was waiting
+    when the thread woke up shares a single transaction and commit.
+    """
+
+    def __init__(self, connect: Callable[[], Connection], max_batch: int = DEFAULT_MAX_BATCH) -> None:
+        """Initialize the writer. The thread starts on the first write.
+
+        Args:
+            connect: Factory creating the writer's connection
+            max_batch: Maximum number of operations committed together
+        """
+        self._connect = connect
+        self.max_batch = max_batch
+        self._queue: 'queue.Queue[Optional[Tuple[Operation, tuple, asyncio.Future]]]' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, operation: Operation, *args: Any) -> 'asyncio.Future[Any]':
+        """Queue ``operation(connection, *args)`` for the writer thread.
+
+        Returns:
+            A future resolved with the operation's result once committed
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._ensure_started()
+        self._queue.put((operation, args, future))
+        return future
+
+    def _run(self) -> None:
+        connection = self._connect()
+        try:
+            running = True
+            while running:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                while len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        running = False
+                        break
+                    batch.append(item)
+                self._execute(connection, batch)
+        finally:
+            connection.close()
+
+    def _execute(self, connection: Connection, batch: List[Tuple[Operation, tuple, asyncio.Future]]) -> None:
+        outcomes: List[Tuple[asyncio.Future, Any, Optional[BaseException]]] = []
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            for operation, args, future in batch:
+                connection.execute('SAVEPOINT operation')
+                try:
+                    result = operation(connection, *args)
+                except Exception as e:
+                    connection.execute('ROLLBACK TO operation')
+                    outcomes.append((future, None, e))
+                else:
+                    outcomes.append((future, result, None))
+                connection.execute('RELEASE operation')
+            connection.execute('COMMIT')
+        except sqlite3.Error as e:
+            LOG.error('Group commit of %d writes failed: %s', len(batch), e)
+            if connection.in_transaction:
+                connection.rollback()
+            outcomes = [(future, None, e) for _, _, future in batch]
+        for future, result, error in outcomes:
+            future.get_loop().call_soon_threadsafe(_resolve, future, result, error)
+
+    def close(self) -> None:
+        """Commit queued writes and stop the thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+class AsyncSQLite:
+    """Awaitable access to a SQLite database without blocking the event loop.
+
+    Writes go through a single SQLiteWriter thread; reads run on a small pool
+    of reader threads, each with its own connection. An in-memory database
+    cannot be shared between connections, so it is accessed through the given
+    connection on the calling thread instead.
+    """
+
+    def __init__(self, path: str, readers: int = DEFAULT_READERS,
+                 connection: Optional[Connection] = None,
+                 setup: Optional[Callable[[Connection], None]] = None) -> None:
+        """Initialize access to a database.
+
+        Args:
+            path: Path of the database file
+            readers: Number of reader connections
+            connection: Connection to use directly instead of opening new
+                ones; required for in-memory databases
+            setup: Called with every connection opened, and with
+                ``connection`` right away, e.g. to create temporary triggers
+        """
+        self.path = path
+        self.setup = setup
+        if connection is not None and setup is not None:
+            setup(connection)
+        self.writer = SQLiteWriter(self._connect)
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='sqlite-reader')
+        self._local = threading.local()
+        self._reader_connections: List[Connection] = []
+        self._connection = connection
+
+    @classmethod
+    def from_connection(cls, connection: Connection, readers: int = DEFAULT_READERS,
+                        setup: Optional[Callable[[Connection], None]] = None) -> 'AsyncSQLite':
+        """Create access to the same database as an existing connection."""
+        path = database_file(connection)
+        if path:
+            return cls(path, readers, setup=setup)
+        return cls(path, readers, connection=connection, setup=setup)
+
+    def _connect(self) -> Connection:
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        configure_connection(connection)
+        if self.setup is not None:
+            self.setup(connection)
+        return connection
+
+    def _reader_connection(self) -> Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+            self._reader_connections.append(connection)
+        return connection
+
+    def _read(self, operation: Operation, args: tuple) -> Any:
+        return operation(self._reader_connection(), *args)
+
+    async def write(self, operation: Operation, *args: Any) -> Any:
+        """Run ``operation(connection, *args)`` in a group-committed transaction."""
+        if self._connection is not None:
+            return operation(self._connection, *args)
+        return await self.writer.submit(operation, *args)
+
+    async def read(self, operation: Operation, *args: Any) -> Any:
+        """Run ``operation(connection, *args)`` on a reader connection."""
+        if self._connection is not None:
+            return operation(self._connection, *args)
+        return await asyncio.get_running_loop().run_in_executor(self._readers, self._read, operation, args)
+
+    def close(self) -> None:
+        """Flush pending writes and release all connections."""
+        if self._connection is not None:
+            return
+        self.writer.close()
+        self._readers.shutdown(wait=True)
+        for connection in self._reader_connections:
+            connection.close()
+        self._reader_connections.clear()
@@ -1,10 +1,13 @@
+import hashlib
 import json
 import logging
+from array import array
 from sqlite3 import Connection, Error as SQLiteError
-from typing import List, Optional
+from typing import AbstractSet, Dict, List, Optional, Sequence
+from buzzing.bots.plugin_registry import PLUGINS, PluginRegistry
+from buzzing.dao.database import transaction
 from buzzing.model.bot_config import BotConfig
 from buzzing.model.subscription import Subscription
-from buzzing.util.class_loader import class_from_string
 
 LOG = logging.getLogger(__name__)
 
@@ -15,17 +18,27 @@ class BotsConfigDao:
     Uses parameterized queries to prevent SQL injection.
     """
 
-    def __init__(self, db_connection: Connection):
+    def __init__(self, db_connection: Connection, plugins: PluginRegistry = PLUGINS):
         """Initialize the DAO with a database connection.
 
         Args:
             db_connection: SQLite database connection
+            plugins: Registry loading the bot plugins; the process-wide
+                registry by default
         """
         self.db_connection = db_connection
+        self.plugins = plugins
 
-    def fetch_all_bots_configs(self) -> List[BotConfig]:
+    def fetch_all_bots_configs(self, bot_ids: Optional[AbstractSet[int]] = None) -> List[BotConfig]:
         """Fetch all active bot configurations.
 
+        Plugins are not imported here. Each configuration gets a LazyBot that
+        loads its plugin on first use; rows whose plugin module cannot be
+        found are skipped.
+
+        Args:
+            bot_ids: Only create the configurations of these bots
+
         Returns:
             List of active bot configurations
 
@@ -44,9 +57,12 @@ class BotsConfigDao:
             
             bot_configs = []
             for row in cursor:
+                if bot_ids is not None and row[0] not in bot_ids:
+                    continue
                 try:
-                    bot_class = class_from_string(row[5], row[6])
-                    bot = bot_class()
+                    if not self.plugins.exists(row[5]):
+                        raise ImportError(f"No module named '{row[5]}'")
+                    bot = self.plugins.lazy(row[1], row[5], row[6])
                     metadata = '{}' if row[7] is None else row[7]
                     is_active = bool(int(row[8]))
                     config = BotConfig(
@@ -61,17 +77,20 @@ class BotsConfigDao:
                     )
                     bot_configs.append(config)
                 except Exception as e:
-                    LOG.error(f"Error creating bot config for {row[1]}: {e}")
+                    LOG.error("Error creating bot config for %s: %s", row[1], e)
             return bot_configs
         except SQLiteError as e:
-            LOG.error(f"Database error in fetch_all_bots_configs: {e}")
+            LOG.error("Database error in fetch_all_bots_configs: %s", e)
             raise
 
-    def fetch_all_subscriptions(self) -> List[Subscription]:
-        """Fetch all active subscriptions.
+    def fetch_config_fingerprints(self) -> Dict[int, str]:
+        """Fetch a fingerprint of every active bot configuration.
+
+        A fingerprint changes whenever any column of the bot's row changes,
+        which lets callers find changed bots without loading bot classes.
 
         Returns:
-            List of active subscriptions
+            Fingerprint keyed by bot ID
 
         Raises:
             SQLiteError: If database operation fails
@@ -80,71 +99,263 @@ class BotsConfigDao:
             cursor = self.db_connection.execute(
                 """
                 SELECT
-                    user_id, username, bot_id, is_active
-                FROM subscription
+                    id, name, description, token, password,
+                    entry_module, entry_class, metadata
+                FROM bots_config
                 WHERE is_active = ?
-                """, ('True',))
-            return [Subscription(
-                user_id=row[0],
-                username=row[1],
-                bot_id=row[2],
-                is_active=bool(row[3])
-            ) for row in cursor]
+                """, (1,))
+            return {row[0]: hashlib.sha256(repr(row[1:]).encode()).hexdigest() for row in cursor}
+        except SQLiteError as e:
+            LOG.error("Database error in fetch_config_fingerprints: %s", e)
+            raise
+
+    def fetch_change_versions(self) -> Dict[str, int]:
+        """Fetch the change counters maintained by triggers on each table.
+
+        Returns:
+            Version keyed by table name
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        try:
+            return dict(self.db_connection.execute('SELECT name, version FROM change_version'))
         except SQLiteError as e:
-            LOG.error(f"Database error in fetch_all_subscriptions: {e}")
+            LOG.error("Database error in fetch_change_versions: %s", e)
             raise
 
-    def subscribe(self, subscription: Subscription) -> None:
+    def track_own_changes(self, origin: str) -> None:
+        """Count this connection's subscription changes per bot under ``origin``.
+
+        Temporary triggers only fire for writes made through this
+        connection, inside the same transaction as the
+        ``subscription_change_version`` triggers, so a rolled back write is
+        not counted either. The counts are ordinary rows, readable from any
+        connection. Call it before the connection writes anything. Does
+        nothing on a database that was not migrated, which has no counters.
+
+        Args:
+            origin: Name of the writer, unique among the running processes
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        quoted = "'" + origin.replace("'", "''") + "'"
+        # Rows counted per event, with the condition for counting them
+        rows = {
+            'INSERT': (('NEW', '1'),),
+            'UPDATE': (('NEW', '1'), ('OLD', 'OLD.bot_id IS NOT NEW.bot_id')),
+            'DELETE': (('OLD', '1'),),
+        }
+        try:
+            if self.db_connection.execute(
+                    "SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = 'own_subscription_change_version'"
+            ).fetchone() is None:
+                return
+            for event, records in rows.items():
+                counts = ''.join(
+                    f"""
+                        INSERT INTO own_subscription_change_version(origin, bot_id, version)
+                            SELECT {quoted}, {record}.bot_id, 1 WHERE {condition}
+                            ON CONFLICT(origin, bot_id) DO UPDATE SET version = version + 1;"""
+                    for record, condition in records)
+                self.db_connection.execute(
+                    f"""
+                    CREATE TEMP TRIGGER IF NOT EXISTS own_subscription_{event.lower()} AFTER {event} ON main.subscription
+                    BEGIN{counts}
+                    END
+                    """)
+        except SQLiteError as e:
+            LOG.error("Database error in track_own_changes: %s", e)
+            raise
+
+    def fetch_foreign_subscription_versions(self, origin: Optional[str] = None) -> Dict[int, int]:
+        """Fetch the subscription change counter of each bot less the changes made by ``origin``.
+
+        The counters and the own counts come from one query, so they always
+        agree: a write of ``origin`` is either counted in both or in neither.
+
+        Args:
+            origin: Writer whose changes are left out, see track_own_changes()
+
+        Returns:
+            Version keyed by bot ID, counting other writers' changes only
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        try:
+            return dict(self.db_connection.execute(
+                """
+                SELECT c.bot_id, c.version - COALESCE(o.version, 0)
+                FROM subscription_change_version c
+                LEFT JOIN own_subscription_change_version o ON o.bot_id = c.bot_id AND o.origin = ?
+                """, (origin,)))
+        except SQLiteError as e:
+            LOG.error("Database error in fetch_foreign_subscription_versions: %s", e)
+            raise
+
+    def forget_own_changes(self, origin: str) -> None:
+        """Delete the own change counts of a writer that stopped.
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        try:
+            with transaction(self.db_connection) as connection:
+                connection.execute('DELETE FROM own_subscription_change_version WHERE origin = ?', (origin,))
+        except SQLiteError as e:
+            LOG.error("Database error in forget_own_changes: %s", e)
+            raise
+
+    def fetch_audience_page(self, bot_id: int, after_user_id: int, limit: int) -> 'array[int]':
+        """Fetch one page of the sorted user IDs of a bot's active subscribers.
+
+        Keyset pagination: each page seeks past the last user ID of the
+        previous one in the covering index, so every page costs the same
+        however deep into the audience it is.
+
+        Args:
+            bot_id: ID of the bot
+            after_user_id: Last user ID of the previous page; pass a value
+                below every user ID for the first page
+            limit: Maximum number of user IDs
+
+        Returns:
+            Up to ``limit`` user IDs, ascending; fewer at the end
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        try:
+            cursor = self.db_connection.execute(
+                """
+                SELECT
+                    user_id
+                FROM subscription
+                WHERE bot_id = ? AND is_active = ? AND user_id > ?
+                ORDER BY user_id
+                LIMIT ?
+                """, (bot_id, 1, after_user_id, limit))
+            return array('q', (row[0] for row in cursor))
+        except SQLiteError as e:
+            LOG.error("Database error in fetch_audience_page: %s", e)
+            raise
+
+    def fetch_subscription(self, bot_id: int, user_id: int) -> Optional[Subscription]:
+        """Fetch the subscription of one user, e.g. for the username the cache does not keep.
+
+        Args:
+            bot_id: ID of the bot
+            user_id: Telegram user ID
+
+        Returns:
+            The subscription, active or not, or None if the user never subscribed
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        try:
+            row = self.db_connection.execute(
+                """
+                SELECT
+                    username, is_active
+                FROM subscription
+                WHERE bot_id = ? AND user_id = ?
+                """, (bot_id, user_id)).fetchone()
+            if row is None:
+                return None
+            return Subscription(user_id=user_id, username=row[0], bot_id=bot_id, is_active=bool(row[1]))
+        except SQLiteError as e:
+            LOG.error("Database error in fetch_subscription: %s", e)
+            raise
+
+    def subscribe(self, subscription: Subscription) -> int:
         """Subscribe a user to a bot.
 
         Args:
             subscription: Subscription details
 
+        Returns:
+            Number of rows changed
+
         Raises:
             SQLiteError: If database operation fails
         """
         try:
-            self.db_connection.execute(
-                """
-                INSERT INTO subscription(user_id, username, bot_id, is_active)
-                VALUES(?, ?, ?, ?)
-                ON CONFLICT(user_id, bot_id) DO UPDATE SET
-                username = excluded.username,
-                is_active = excluded.is_active
-                """, (
-                    subscription.user_id,
-                    subscription.username,
-                    subscription.bot_id,
-                    str(subscription.is_active)
-                ))
-            self.db_connection.commit()
+            with transaction(self.db_connection) as connection:
+                cursor = connection.execute(
+                    """
+                    INSERT INTO subscription(user_id, username, bot_id, is_active)
+                    VALUES(?, ?, ?, ?)
+                    ON CONFLICT(user_id, bot_id) DO UPDATE SET
+                    username = excluded.username,
+                    is_active = excluded.is_active
+                    """, (
+                        subscription.user_id,
+                        subscription.username,
+                        subscription.bot_id,
+                        int(subscription.is_active)
+                    ))
+            return cursor.rowcount
         except SQLiteError as e:
-            LOG.error(f"Database error in subscribe: {e}")
-            self.db_connection.rollback()
+            LOG.error("Database error in subscribe: %s", e)
             raise
 
-    def unsubscribe(self, subscription: Subscription) -> None:
+    def unsubscribe(self, subscription: Subscription) -> int:
         """Unsubscribe a user from a bot.
 
         Args:
             subscription: Subscription to deactivate
 
+        Returns:
+            Number of rows changed
+
         Raises:
             SQLiteError: If database operation fails
         """
         try:
-            self.db_connection.execute(
-                """
-                UPDATE subscription
-                SET is_active = ?
-                WHERE user_id = ? AND bot_id = ?
-                """, (
-                    'False',
-                    subscription.user_id,
-                    subscription.bot_id
-                ))
-            self.db_connection.commit()
+            with transaction(self.db_connection) as connection:
+                cursor = connection.execute(
+                    """
+                    UPDATE subscription
+                    SET is_active = ?
+                    WHERE user_id = ? AND bot_id = ?
+                    """, (
+                        0,
+                        subscription.user_id,
+                        subscription.bot_id
+                    ))
+            return cursor.rowcount
+        except SQLiteError as e:
+            LOG.error("Database error in unsubscribe: %s", e)
+            raise
+
+    def deactivate_subscriptions(self, bot_id: int, user_ids: Sequence[int]) -> int:
+        """Deactivate the subscriptions of many users of a bot in one transaction.
+
+        Used to prune chats that can no longer be reached, e.g. users who
+        blocked the bot.
+
+        Args:
+            bot_id: ID of the bot
+            user_ids: Telegram user IDs to unsubscribe
+
+        Returns:
+            Number of subscriptions that were active and are now deactivated
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        try:
+            with transaction(self.db_connection) as connection:
+                cursor = connection.executemany(
+                    """
+                    UPDATE subscription
+                    SET is_active = ?
+                    WHERE bot_id = ? AND user_id = ? AND is_active = ?
+                    """, [(0, bot_id, user_id, 1) for user_id in user_ids])
+            return cursor.rowcount
         except SQLiteError as e:
-            LOG.error(f"Database error in unsubscribe: {e}")
-            self.db_connection.rollback()
+            LOG.error("Database error in deactivate_subscriptions: %s", e)
             raise
@@ -0,0 +1,51 @@
+import logging
+from sqlite3 import Connection, Error as SQLiteError
+from typing import Optional
+from buzzing.model.broadcast_state import BroadcastState
+
+LOG = logging.getLogger(__name__)
+
+
+class BroadcastStateDao:
+    """Data Access Object for the last broadcast of each bot."""
+
+    def __init__(self, db_connection: Connection):
+        """Initialize the DAO with a database connection.
+
+        Args:
+            db_connection: SQLite database connection
+        """
+        self.db_connection = db_connection
+
+    def fetch_state(self, bot_id: int) -> Optional[BroadcastState]:
+        """Fetch the last broadcast of a bot.
+
+        Returns:
+            The state, or None if the bot has not broadcast yet
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        try:
+            row = self.db_connection.execute(
+                'SELECT bot_id, content_hash, sent_at FROM broadcast_state WHERE bot_id = ?', (bot_id,)).fetchone()
+            return BroadcastState(*row) if row else None
+        except SQLiteError as e:
+            LOG.error("Database error in fetch_state: %s", e)
+            raise
+
+    def save_state(self, state: BroadcastState) -> None:
+        """Remember the last broadcast of a bot, replacing the previous one.
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        try:
+            self.db_connection.execute(
+                """
+                INSERT INTO broadcast_state(bot_id, content_hash, sent_at) VALUES(?, ?, ?)
+                ON CONFLICT(bot_id) DO UPDATE SET content_hash = excluded.content_hash, sent_at = excluded.sent_at
+                """, (state.bot_id, state.content_hash, state.sent_at))
+        except SQLiteError as e:
+            LOG.error("Database error in save_state: %s", e)
+            raise
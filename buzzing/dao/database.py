@@ -0,0 +1,31 @@
+from contextlib import contextmanager
+from sqlite3 import Connection
+from typing import Iterator
+
+
+@contextmanager
+def transaction(connection: Connection) -> Iterator[Connection]:
+    """Run a block of statements in a single transaction.
+
+    Commits on success and rolls back on error. If the connection is already
+    inside a transaction the block joins it and the outermost owner decides
+    whether to commit, which lets callers group several DAO writes into one
+    commit.
+
+    Args:
+        connection: SQLite connection to run the transaction on
+
+    Yields:
+        The same connection
+    """
+    if connection.in_transaction:
+        yield connection
+        return
+    connection.execute('BEGIN')
+    try:
+        yield connection
+    except BaseException:
+        connection.rollback()
+        raise
+    else:
+        connection.commit()
@@ -0,0 +1,45 @@
+-- Schema as created by etc/db_config/v0.sql. IF NOT EXISTS lets databases
+-- created before migrations were introduced adopt the baseline in place.
+
+CREATE TABLE IF NOT EXISTS bots_config(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    description TEXT,
+    token TEXT,
+    password TEXT,
+    entry_module TEXT,
+    entry_class TEXT,
+    metadata TEXT,
+    is_active BOOLEAN
+);
+
+CREATE TABLE IF NOT EXISTS subscription(
+    user_id INTEGER,
+    username TEXT,
+    bot_id INTEGER,
+    is_active BOOLEAN,
+    PRIMARY KEY (user_id, bot_id)
+);
+
+CREATE TABLE IF NOT EXISTS broadcast(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    bot_id INTEGER,
+    payload TEXT,
+    status TEXT,
+    created_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS outbox(
+    broadcast_id INTEGER,
+    bot_id INTEGER,
+    user_id INTEGER,
+    status TEXT,
+    attempts INTEGER,
+    next_attempt_at REAL,
+    last_error TEXT,
+    PRIMARY KEY (broadcast_id, user_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(bot_id, status, next_attempt_at);
+
+CREATE INDEX IF NOT EXISTS idx_outbox_broadcast ON outbox(broadcast_id, status);
@@ -0,0 +1,7 @@
+-- Boolean columns were written as 'True'/'False' strings; store 1/0 instead.
+
+UPDATE subscription
+SET is_active = CASE WHEN lower(CAST(is_active AS TEXT)) IN ('1', 'true') THEN 1 ELSE 0 END;
+
+UPDATE bots_config
+SET is_active = CASE WHEN lower(CAST(is_active AS TEXT)) IN ('1', 'true') THEN 1 ELSE 0 END;
@@ -0,0 +1,7 @@
+-- Covering index for a bot's active audience: an index range scan on
+-- (bot_id, is_active) that never touches the table rows.
+
+CREATE INDEX IF NOT EXISTS idx_subscription_bot_active
+ON subscription(bot_id, is_active, user_id, username);
+
+CREATE INDEX IF NOT EXISTS idx_bots_config_active ON bots_config(is_active);
@@ -0,0 +1,39 @@
+-- Per-table change counters maintained by triggers, so a running process can
+-- cheaply tell which tables other writers have changed.
+
+CREATE TABLE IF NOT EXISTS change_version(
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO change_version(name, version) VALUES ('bots_config', 0), ('subscription', 0);
+
+CREATE TRIGGER IF NOT EXISTS bots_config_inserted AFTER INSERT ON bots_config
+BEGIN
+    UPDATE change_version SET version = version + 1 WHERE name = 'bots_config';
+END;
+
+CREATE TRIGGER IF NOT EXISTS bots_config_updated AFTER UPDATE ON bots_config
+BEGIN
+    UPDATE change_version SET version = version + 1 WHERE name = 'bots_config';
+END;
+
+CREATE TRIGGER IF NOT EXISTS bots_config_deleted AFTER DELETE ON bots_config
+BEGIN
+    UPDATE change_version SET version = version + 1 WHERE name = 'bots_config';
+END;
+
+CREATE TRIGGER IF NOT EXISTS subscription_inserted AFTER INSERT ON subscription
+BEGIN
+    UPDATE change_version SET version = version + 1 WHERE name = 'subscription';
+END;
+
+CREATE TRIGGER IF NOT EXISTS subscription_updated AFTER UPDATE ON subscription
+BEGIN
+    UPDATE change_version SET version = version + 1 WHERE name = 'subscription';
+END;
+
+CREATE TRIGGER IF NOT EXISTS subscription_deleted AFTER DELETE ON subscription
+BEGIN
+    UPDATE change_version SET version = version + 1 WHERE name = 'subscription';
+END;
@@ -0,0 +1,8 @@
+-- Content hash of the last broadcast of each bot, so unchanged content can
+-- be skipped across restarts.
+
+CREATE TABLE IF NOT EXISTS broadcast_state(
+    bot_id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    sent_at REAL NOT NULL
+);
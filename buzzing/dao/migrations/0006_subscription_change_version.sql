@@ -0,0 +1,36 @@
+-- Per-bot subscription change counters, so a running process only reloads
+-- the bots whose subscriptions other writers changed. Processes count their
+-- own changes per bot under an origin of their choosing, through temporary
+-- triggers (see BotsConfigDao.track_own_changes), in the same transaction.
+
+CREATE TABLE IF NOT EXISTS subscription_change_version(
+    bot_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS own_subscription_change_version(
+    origin TEXT NOT NULL,
+    bot_id INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (origin, bot_id)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS subscription_bot_inserted AFTER INSERT ON subscription
+BEGIN
+    INSERT INTO subscription_change_version(bot_id, version) VALUES (NEW.bot_id, 1)
+        ON CONFLICT(bot_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS subscription_bot_updated AFTER UPDATE ON subscription
+BEGIN
+    INSERT INTO subscription_change_version(bot_id, version) VALUES (NEW.bot_id, 1)
+        ON CONFLICT(bot_id) DO UPDATE SET version = version + 1;
+    INSERT INTO subscription_change_version(bot_id, version) SELECT OLD.bot_id, 1 WHERE OLD.bot_id IS NOT NEW.bot_id
+        ON CONFLICT(bot_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS subscription_bot_deleted AFTER DELETE ON subscription
+BEGIN
+    INSERT INTO subscription_change_version(bot_id, version) VALUES (OLD.bot_id, 1)
+        ON CONFLICT(bot_id) DO UPDATE SET version = version + 1;
+END;
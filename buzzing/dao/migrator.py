@@ -0,0 +1,103 @@
+import logging
+import re
+import sqlite3
+from pathlib import Path
+from sqlite3 import Connection
+from typing import List, Tuple
+
+LOG = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent / 'migrations'
+MIGRATION_FILE = re.compile(r'^(\d+)_\w+\.sql$')
+
+# Applied to every connection; journal_mode is persistent, the rest per connection.
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', 5000),
+    ('temp_store', 'MEMORY'),
+    ('cache_size', -16000),
+    ('mmap_size', 134217728),
+)
+
+
+class MigrationError(Exception):
+    """Raised when the migrations or the database schema version are inconsistent."""
+
+
+def configure_connection(connection: Connection) -> None:
+    """Enable WAL mode and the pragmas tuned for Buzzing's workload.
+
+    WAL lets readers proceed while the writer commits, and NORMAL
+    synchronous is durable across application crashes under WAL.
+
+    Args:
+        connection: SQLite connection to configure
+    """
+    for name, value in PRAGMAS:
+        connection.execute(f'PRAGMA {name} = {value}')
+
+
+def schema_version(connection: Connection) -> int:
+    """Return the number of the last migration applied to the database."""
+    return connection.execute('PRAGMA user_version').fetchone()[0]
+
+
+def discover_migrations(directory: Path = MIGRATIONS_DIR) -> List[Tuple[int, Path]]:
+    """Find the numbered migration scripts in a directory.
+
+    Returns:
+        (version, path) pairs sorted by version
+
+    Raises:
+        MigrationError: If two scripts share a version or versions have gaps
+    """
+    migrations = []
+    for path in directory.iterdir():
+        match = MIGRATION_FILE.match(path.name)
+        if match:
+            migrations.append((int(match.group(1)), path))
+    migrations.sort()
+    versions = [version for version, _ in migrations]
+    if versions != list(range(1, len(versions) + 1)):
+        raise MigrationError(f'Migrations in {directory} must be numbered 1..n without gaps: {versions}')
+    return migrations
+
+
+def migrate(connection: Connection, directory: Path = MIGRATIONS_DIR) -> int:
+    """Apply every migration newer than the database's schema version.
+
+    The version is kept in ``PRAGMA user_version``. Each migration runs in its
+    own transaction together with the version bump, so a failing migration
+    leaves the database at the previous version.
+
+    Args:
+        connection: SQLite connection to migrate
+        directory: Directory holding the ``NNNN_name.sql`` scripts
+
+    Returns:
+        The schema version after migrating
+
+    Raises:
+        MigrationError: If the database is newer than the known migrations
+        SQLiteError: If a migration fails
+    """
+    migrations = discover_migrations(directory)
+    current = schema_version(connection)
+    latest = len(migrations)
+    if current > latest:
+        raise MigrationError(f'Database schema version {current} is newer than the latest migration {latest}')
+
+    for version, path in migrations[current:]:
+        LOG.info('Applying migration %s', path.name)
+        script = path.read_text()
+        try:
+            connection.executescript(f'BEGIN;\n{script}\nPRAGMA user_version = {version};\nCOMMIT;')
+        except sqlite3.Error as e:
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+            LOG.error('Migration %s failed: %s', path.name, e)
+            raise
+    if current < latest:
+        LOG.info('Database migrated from version %s to %s', current, latest)
+    return latest
@@ -0,0 +1,227 @@
+import json
+import logging
+import time
+from itertools import islice
+from sqlite3 import Connection, Error as SQLiteError
+from typing import Any, Iterable, List, Optional, Tuple
+from buzzing.dao.database import transaction
+from buzzing.model.outbox_entry import OutboxEntry
+
+LOG = logging.getLogger(__name__)
+
+STATUS_PENDING = 'pending'
+STATUS_SENT = 'sent'
+STATUS_DEAD = 'dead'
+STATUS_DONE = 'done'
+
+INSERT_BATCH_SIZE = 1000
+
+
+class OutboxDao:
+    """Data Access Object for the durable broadcast outbox.
+
+    A broadcast is stored once in ``broadcast`` and fanned out into one
+    ``outbox`` row per recipient. Each row's status is the delivery checkpoint,
+    so a restarted process only sends to recipients still marked pending.
+    Once a broadcast is done its sent rows are deleted; the dead letters are
+    kept until ``purge_done`` removes the broadcast.
+    """
+
+    def __init__(self, db_connection: Connection):
+        """Initialize the DAO with a database connection.
+
+        Args:
+            db_connection: SQLite database connection
+        """
+        self.db_connection = db_connection
+
+    def create_broadcast(self, bot_id: int, payload: Any, user_ids: Iterable[int]) -> int:
+        """Persist a broadcast and one pending delivery per recipient.
+
+        Recipients are inserted in batches inside a single transaction.
+
+        Args:
+            bot_id: ID of the bot sending the broadcast
+            payload: JSON-serializable message to deliver
+            user_ids: Recipients of the broadcast
+
+        Returns:
+            ID of the new broadcast
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        now = time.time()
+        try:
+            with transaction(self.db_connection) as connection:
+                cursor = connection.execute(
+                    """
+                    INSERT INTO broadcast(bot_id, payload, status, created_at)
+                    VALUES(?, ?, ?, ?)
+                    """, (bot_id, json.dumps(payload), STATUS_PENDING, now))
+                broadcast_id = cursor.lastrowid
+                recipients = iter(user_ids)
+                while True:
+                    batch = list(islice(recipients, INSERT_BATCH_SIZE))
+                    if not batch:
+                        break
+                    connection.executemany(
+                        """
+                        INSERT OR IGNORE INTO outbox(
+                            broadcast_id, bot_id, user_id, status, attempts, next_attempt_at)
+                        VALUES(?, ?, ?, ?, 0, ?)
+                        """, [(broadcast_id, bot_id, user_id, STATUS_PENDING, now) for user_id in batch])
+            return broadcast_id
+        except SQLiteError as e:
+            LOG.error("Database error in create_broadcast: %s", e)
+            raise
+
+    def fetch_due(self, bot_id: int, now: float, limit: int) -> List[OutboxEntry]:
+        """Fetch pending deliveries of a bot that are due for an attempt.
+
+        Args:
+            bot_id: ID of the bot
+            now: Current UNIX timestamp
+            limit: Maximum number of entries to return
+
+        Returns:
+            Due entries, oldest attempt time first, then in the order they
+            were enqueued
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        try:
+            cursor = self.db_connection.execute(
+                """
+                SELECT o.broadcast_id, o.bot_id, o.user_id, b.payload, o.attempts
+                FROM outbox o JOIN broadcast b ON b.id = o.broadcast_id
+                WHERE o.bot_id = ? AND o.status = ? AND o.next_attempt_at <= ?
+                ORDER BY o.next_attempt_at, o.rowid
+                LIMIT ?
+                """, (bot_id, STATUS_PENDING, now, limit))
+            return [OutboxEntry(
+                broadcast_id=row[0],
+                bot_id=row[1],
+                user_id=row[2],
+                payload=json.loads(row[3]),
+                attempts=row[4]
+            ) for row in cursor]
+        except SQLiteError as e:
+            LOG.error("Database error in fetch_due: %s", e)
+            raise
+
+    def next_attempt_at(self, bot_id: int) -> Optional[float]:
+        """Return when the earliest pending delivery of a bot becomes due.
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        try:
+            row = self.db_connection.execute(
+                """
+                SELECT MIN(next_attempt_at) FROM outbox
+                WHERE bot_id = ? AND status = ?
+                """, (bot_id, STATUS_PENDING)).fetchone()
+            return row[0] if row else None
+        except SQLiteError as e:
+            LOG.error("Database error in next_attempt_at: %s", e)
+            raise
+
+    def pending_count(self, bot_id: int) -> int:
+        """Count deliveries of a bot that have not been sent or dead-lettered.
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        try:
+            row = self.db_connection.execute(
+                "SELECT COUNT(*) FROM outbox WHERE bot_id = ? AND status = ?",
+                (bot_id, STATUS_PENDING)).fetchone()
+            return row[0]
+        except SQLiteError as e:
+            LOG.error("Database error in pending_count: %s", e)
+            raise
+
+    def record_results(self, sent: Iterable[OutboxEntry],
+                       retries: Iterable[Tuple[OutboxEntry, float, str]],
+                       dead: Iterable[Tuple[OutboxEntry, str]]) -> None:
+        """Record the outcome of a batch of deliveries in one transaction.
+
+        Broadcasts left without pending deliveries are marked done and their
+        sent rows deleted in the same transaction.
+
+        Args:
+            sent: Entries that were delivered
+            retries: Entries to retry, with their next attempt time and error
+            dead: Entries that will not be retried, with their error
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        sent, retries, dead = list(sent), list(retries), list(dead)
+        broadcast_ids = {e.broadcast_id for e in sent}
+        broadcast_ids.update(e.broadcast_id for e, _, _ in retries)
+        broadcast_ids.update(e.broadcast_id for e, _ in dead)
+        try:
+            with transaction(self.db_connection) as connection:
+                connection.executemany(
+                    """
+                    UPDATE outbox SET status = ?, attempts = attempts + 1
+                    WHERE broadcast_id = ? AND user_id = ?
+                    """, [(STATUS_SENT, e.broadcast_id, e.user_id) for e in sent])
+                connection.executemany(
+                    """
+                    UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, last_error = ?
+                    WHERE broadcast_id = ? AND user_id = ?
+                    """, [(at, error, e.broadcast_id, e.user_id) for e, at, error in retries])
+                connection.executemany(
+                    """
+                    UPDATE outbox SET status = ?, attempts = attempts + 1, last_error = ?
+                    WHERE broadcast_id = ? AND user_id = ?
+                    """, [(STATUS_DEAD, error, e.broadcast_id, e.user_id) for e, error in dead])
+                for broadcast_id in broadcast_ids:
+                    done = connection.execute(
+                        """
+                        UPDATE broadcast SET status = ?
+                        WHERE id = ? AND status = ? AND NOT EXISTS (
+                            SELECT 1 FROM outbox WHERE broadcast_id = ? AND status = ?)
+                        """, (STATUS_DONE, broadcast_id, STATUS_PENDING, broadcast_id, STATUS_PENDING))
+                    if done.rowcount:
+                        connection.execute(
+                            "DELETE FROM outbox WHERE broadcast_id = ? AND status = ?",
+                            (broadcast_id, STATUS_SENT))
+        except SQLiteError as e:
+            LOG.error("Database error in record_results: %s", e)
+            raise
+
+    def purge_done(self, bot_id: int, before: float) -> int:
+        """Delete done broadcasts of a bot created before a point in time.
+
+        Removes the broadcasts together with their remaining dead letters.
+
+        Args:
+            bot_id: ID of the bot
+            before: UNIX timestamp; older done broadcasts are deleted
+
+        Returns:
+            Number of broadcasts deleted
+
+        Raises:
+            SQLiteError: If database operation fails
+        """
+        try:
+            with transaction(self.db_connection) as connection:
+                expired = [row[0] for row in connection.execute(
+                    """
+                    SELECT id FROM broadcast
+                    WHERE bot_id = ? AND status = ? AND created_at < ?
+                    """, (bot_id, STATUS_DONE, before))]
+                connection.executemany(
+                    "DELETE FROM outbox WHERE broadcast_id = ?", [(broadcast_id,) for broadcast_id in expired])
+                connection.executemany(
+                    "DELETE FROM broadcast WHERE id = ?", [(broadcast_id,) for broadcast_id in expired])
+            return len(expired)
+        except SQLiteError as e:
+            LOG.error("Database error in purge_done: %s", e)
+            raise
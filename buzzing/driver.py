@@ -1,33 +1,106 @@
 import logging
+import multiprocessing
 import os
 import sqlite3
 import signal
 import asyncio
+import time
+from logging.handlers import QueueListener
+from multiprocessing.process import BaseProcess
 from pathlib import Path
 from sqlite3 import Connection
-from typing import NoReturn
+from typing import Callable, Dict, FrozenSet, Iterable, NoReturn, Optional, Tuple
+from buzzing.bots_manager.bot_interactor import DEFAULT_DRAIN_TIMEOUT
 from buzzing.bots_manager.bots_interactor import BotsInteractor
+from buzzing.bots_manager.config_watcher import DEFAULT_RELOAD_INTERVAL
+from buzzing.bots_manager.metrics_server import MetricsServer
+from buzzing.bots_manager.plugin_executor import DEFAULT_PROCESSES, DEFAULT_THREADS, PluginExecutor
+from buzzing.bots_manager.send_scheduler import DEFAULT_AGING, SendScheduler
+from buzzing.bots_manager.shared_request import DEFAULT_POOL_SIZE, SharedRequest
+from buzzing.bots_manager.webhook_ingress import DEFAULT_WEBHOOK_PORT, WebhookIngress
+from buzzing.dao.migrator import configure_connection, migrate
+from buzzing.util.hash_ring import shard_for
+from buzzing.util.log_setup import DEFAULT_BACKUPS, DEFAULT_MAX_BYTES, parse_sampling, setup_logging
+from buzzing.util.loop_watchdog import DEFAULT_THRESHOLD, LoopWatchdog
+from buzzing.util.sampling_profiler import ProfilerBusy, SamplingProfiler
 
 LOG = logging.getLogger(__name__)
 
-async def main() -> NoReturn:
+# Seconds sampled after SIGUSR1
+DEFAULT_PROFILE_SECONDS = 30.0
+
+async def main(shard: Optional[Tuple[int, int]] = None) -> NoReturn:
     """Main entry point for the Buzzing application.
 
     This function:
     1. Sets up logging
-    2. Initializes database connection
+    2. Initializes database connection and applies pending migrations
     3. Starts bot manager
     4. Handles graceful shutdown
 
+    Args:
+        shard: ``(index, workers)`` when running as a worker of the
+            supervisor; only the bots of that shard are run
+
     Raises:
         Exception: If there's an unrecoverable error during execution
     """
-    setup_logger()
-    LOG.info("Welcome to Buzzing!")
+    # Workers log to files of their own; rotating one shared file would race
+    setup_logger('buzzing.log' if shard is None else f'buzzing-worker-{shard[0]}.log')
+    if shard is None:
+        LOG.info("Welcome to Buzzing!")
+    else:
+        LOG.info("Buzzing worker %d/%d starting", shard[0] + 1, shard[1])
 
     # Get database path from environment or use default
     db_file_path = os.path.abspath(os.environ.get('BUZZING_DB_PATH', 'buzzing.db'))
-    LOG.info(f"Using database at: {db_file_path}")
+    LOG.info("Using database at: %s", db_file_path)
+
+    # Seconds in-flight sends get to finish when shutting down
+    drain_timeout = float(os.environ.get('BUZZING_DRAIN_TIMEOUT', DEFAULT_DRAIN_TIMEOUT))
+
+    # Seconds between checks for changed bots and subscriptions; 0 disables hot reload
+    reload_interval = float(os.environ.get('BUZZING_RELOAD_INTERVAL', DEFAULT_RELOAD_INTERVAL))
+
+    # Optional cap in seconds on startup; slower bots and plugins keep loading in the background
+    startup_budget = os.environ.get('BUZZING_STARTUP_BUDGET')
+
+    # 'polling' (default) or 'webhook', where one HTTP server receives updates for all bots
+    ingress = create_ingress(os.environ.get('BUZZING_INGRESS', 'polling'), shard)
+
+    # One Bot API connection pool shared by all bots
+    pool_size = int(os.environ.get('BUZZING_POOL_SIZE', DEFAULT_POOL_SIZE))
+    request = SharedRequest(
+        pool_size=pool_size,
+        http2=os.environ.get('BUZZING_HTTP2', '').lower() in ('1', 'true', 'yes'),
+    )
+
+    # Send slots of the pool's connections; replies go before broadcasts
+    send_scheduler = SendScheduler(
+        slots=int(os.environ.get('BUZZING_SEND_SLOTS', pool_size)),
+        aging=float(os.environ.get('BUZZING_SEND_AGING', DEFAULT_AGING)),
+    )
+
+    # Pools for plugins whose fetch is blocking or CPU-bound
+    executor = PluginExecutor(
+        threads=int(os.environ.get('BUZZING_PLUGIN_THREADS', DEFAULT_THREADS)),
+        processes=int(os.environ.get('BUZZING_PLUGIN_PROCESSES', DEFAULT_PROCESSES)),
+    )
+
+    # Base URL of a local Bot API server; Telegram's public API when unset
+    api_url = os.environ.get('BUZZING_BOT_API_URL') or None
+
+    # Metrics, health and readiness endpoint; off unless BUZZING_METRICS_PORT is set
+    metrics = create_metrics_server(shard)
+
+    # Report tasks blocking the event loop for longer than this many seconds; 0 disables the watchdog
+    lag_threshold = float(os.environ.get('BUZZING_LOOP_LAG_THRESHOLD', DEFAULT_THRESHOLD))
+    watchdog = LoopWatchdog(threshold=lag_threshold) if lag_threshold > 0 else None
+    if watchdog:
+        watchdog.start()
+
+    # SIGUSR1 writes a flame graph profile of the next BUZZING_PROFILE_SECONDS to the working directory
+    install_profile_signal(float(os.environ.get('BUZZING_PROFILE_SECONDS', DEFAULT_PROFILE_SECONDS)))
 
     try:
         # Initialize database connection
@@ -38,13 +111,23 @@ async def main() -> NoReturn:
         )
 
         try:
+            # Bring the schema up to date before anything reads it
+            configure_connection(connection)
+            migrate(connection)
+
             # Initialize and start bot manager
-            bots_interactor = BotsInteractor(connection)
+            bots_interactor = BotsInteractor(connection, drain_timeout=drain_timeout, ingress=ingress,
+                                             request=request, shard=shard, reload_interval=reload_interval,
+                                             startup_budget=float(startup_budget) if startup_budget else None,
+                                             executor=executor, metrics=metrics, api_url=api_url,
+                                             send_scheduler=send_scheduler)
             loop = await bots_interactor.register_bots()
 
             # Set up signal handlers for graceful shutdown
             def signal_handler() -> None:
                 """Handle shutdown signals by stopping all bots."""
+                if bots_interactor.stopping.is_set():
+                    return
                 LOG.info("Received shutdown signal...")
                 asyncio.create_task(bots_interactor.stop_bots())
 
@@ -57,52 +140,313 @@ async def main() -> NoReturn:
             except asyncio.CancelledError:
                 LOG.info("Tasks cancelled, shutting down...")
             except Exception as e:
-                LOG.error(f"Error in bot tasks: {e}")
+                LOG.error("Error in bot tasks: %s", e)
                 raise
 
         except Exception as e:
-            LOG.error(f"Error in bot manager: {e}")
+            LOG.error("Error in bot manager: %s", e)
             raise
         finally:
             connection.close()
             LOG.info("Database connection closed")
 
     except Exception as e:
-        LOG.error(f"Fatal error in main: {e}")
+        LOG.error("Fatal error in main: %s", e)
         raise
     finally:
+        if watchdog:
+            await watchdog.stop()
         LOG.info("Bye bye!")
 
-def setup_logger() -> None:
+def install_profile_signal(seconds: float) -> None:
+    """Profile the event loop for ``seconds`` whenever the process receives SIGUSR1.
+
+    The collapsed stacks are written to ``buzzing-profile-<pid>-<time>.folded``
+    in the working directory. A signal arriving during a profile is ignored.
+    """
+    loop = asyncio.get_running_loop()
+    profiler = SamplingProfiler(loop)
+
+    async def write_profile() -> None:
+        try:
+            await profiler.write(seconds)
+        except ProfilerBusy:
+            LOG.info("A profile is already running, ignoring SIGUSR1")
+        except OSError as e:
+            LOG.error("Could not write profile: %s", e)
+
+    loop.add_signal_handler(signal.SIGUSR1, lambda: loop.create_task(write_profile()))
+
+def create_ingress(mode: str, shard: Optional[Tuple[int, int]] = None) -> Optional[WebhookIngress]:
+    """Create the update ingress selected by ``BUZZING_INGRESS``.
+
+    Webhook mode is configured with ``BUZZING_WEBHOOK_URL`` (public base URL,
+    required), ``BUZZING_WEBHOOK_HOST`` and ``BUZZING_WEBHOOK_PORT``. Worker
+    ``i`` of a sharded run listens on ``BUZZING_WEBHOOK_PORT + i``; a
+    ``{worker}`` placeholder in the URL is replaced by ``i``.
+
+    Args:
+        mode: ``polling`` or ``webhook``
+        shard: ``(index, workers)`` of the calling worker process
+
+    Returns:
+        The webhook ingress, or None when the bots long-poll
+
+    Raises:
+        ValueError: If the mode is unknown or the webhook URL is missing
+    """
+    if mode == 'polling':
+        return None
+    if mode != 'webhook':
+        raise ValueError(f"Unknown ingress mode '{mode}', expected 'polling' or 'webhook'")
+    base_url = os.environ.get('BUZZING_WEBHOOK_URL')
+    if not base_url:
+        raise ValueError('BUZZING_WEBHOOK_URL is required in webhook mode')
+    host = os.environ.get('BUZZING_WEBHOOK_HOST', '0.0.0.0')
+    port = int(os.environ.get('BUZZING_WEBHOOK_PORT', DEFAULT_WEBHOOK_PORT))
+    if shard is not None:
+        port += shard[0]
+        base_url = base_url.replace('{worker}', str(shard[0]))
+    LOG.info("Receiving updates by webhook at %s (listening on %s:%s)", base_url, host, port)
+    return WebhookIngress(base_url, host, port)
+
+def create_metrics_server(shard: Optional[Tuple[int, int]] = None) -> Optional[MetricsServer]:
+    """Create the metrics endpoint configured by ``BUZZING_METRICS_PORT``.
+
+    It listens on ``BUZZING_METRICS_HOST`` (default ``127.0.0.1``). Worker
+    ``i`` of a sharded run listens on ``BUZZING_METRICS_PORT + i``.
+
+    Args:
+        shard: ``(index, workers)`` of the calling worker process
+
+    Returns:
+        The metrics server, or None when no port is configured
+    """
+    port = os.environ.get('BUZZING_METRICS_PORT')
+    if not port:
+        return None
+    return MetricsServer(os.environ.get('BUZZING_METRICS_HOST', '127.0.0.1'),
+                         int(port) + (shard[0] if shard else 0))
+
+def run_worker(index: int, workers: int) -> None:
+    """Entry point of a worker process running one shard of the bots."""
+    # Ctrl+C reaches the whole process group; the supervisor relays it as SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(main((index, workers)))
+
+def spawn_worker(index: int, workers: int) -> BaseProcess:
+    """Create a worker process; spawned, so it shares no state with the supervisor."""
+    context = multiprocessing.get_context('spawn')
+    return context.Process(target=run_worker, args=(index, workers), name=f'buzzing-worker-{index}')
+
+class Supervisor:
+    """Runs the bots sharded across worker processes.
+
+    Bots are assigned to workers by consistent hashing of their ID, so adding
+    or removing a bot only affects the worker that owns it. The supervisor
+    restarts crashed workers with exponential backoff, restarts a worker when
+    its shard changes and relays shutdown signals to all workers. Workers that
+    hot-reload their bots pick up a changed shard themselves; they are only
+    started when their shard gets its first bot and stopped when it loses its
+    last one.
+    """
+
+    def __init__(self, db_file_path: str, workers: int,
+                 spawn: Callable[[int, int], BaseProcess] = spawn_worker,
+                 poll_interval: float = 1.0, restart_delay: float = 1.0,
+                 max_restart_delay: float = 60.0, stop_timeout: float = 10.0,
+                 workers_reload: bool = False) -> None:
+        """Initialize the supervisor.
+
+        Args:
+            db_file_path: Path of the SQLite database
+            workers: Number of worker processes
+            spawn: Factory creating the (not yet started) process of a worker
+            poll_interval: Seconds between checks of workers and bot changes
+            restart_delay: Delay in seconds before a crashed worker is first restarted
+            max_restart_delay: Upper bound for the exponential restart delay
+            stop_timeout: Seconds a worker gets to stop before it is killed
+            workers_reload: Whether workers hot-reload changes to their shard
+        """
+        self.db_file_path = db_file_path
+        self.workers = workers
+        self.spawn = spawn
+        self.poll_interval = poll_interval
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.stop_timeout = stop_timeout
+        self.workers_reload = workers_reload
+        self.processes: Dict[int, BaseProcess] = {}
+        self.shards: Dict[int, FrozenSet[int]] = {}
+        self.failures: Dict[int, int] = {}
+        self.restart_at: Dict[int, float] = {}
+        self.stopping = asyncio.Event()
+
+    def assign(self, bot_ids: Iterable[int]) -> Dict[int, FrozenSet[int]]:
+        """Partition bot IDs across the workers.
+
+        Returns:
+            The bot IDs of every worker index that owns at least one bot
+        """
+        shards: Dict[int, set] = {}
+        for bot_id in bot_ids:
+            shards.setdefault(shard_for(bot_id, self.workers), set()).add(bot_id)
+        return {index: frozenset(ids) for index, ids in shards.items()}
+
+    async def rebalance(self, shards: Dict[int, FrozenSet[int]]) -> None:
+        """Apply a new assignment, restarting only the workers whose shard changed.
+
+        Workers that hot-reload keep running while their shard is not empty.
+        """
+        for index in range(self.workers):
+            old, new = self.shards.get(index, frozenset()), shards.get(index, frozenset())
+            if old == new:
+                continue
+            LOG.info('Shard %s changed: +%s -%s', index, sorted(new - old), sorted(old - new))
+            if self.workers_reload and old and new and index in self.processes:
+                continue
+            await self.stop_worker(index)
+            self.restart_at.pop(index, None)
+            self.failures.pop(index, None)
+            if new:
+                self.start_worker(index)
+        self.shards = shards
+
+    def start_worker(self, index: int) -> None:
+        """Start the process of a worker."""
+        process = self.spawn(index, self.workers)
+        process.start()
+        self.processes[index] = process
+        LOG.info('Started worker %s (pid %s) with bots %s', index, process.pid, sorted(self.shards.get(index, ())))
+
+    async def stop_worker(self, index: int) -> None:
+        """Ask a worker to shut down gracefully; kill it after ``stop_timeout``."""
+        process = self.processes.pop(index, None)
+        if process is None or not process.is_alive():
+            return
+        process.terminate()
+        deadline = time.monotonic() + self.stop_timeout
+        while process.is_alive() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if process.is_alive():
+            LOG.warning('Worker %s did not stop within %ss, killing it', index, self.stop_timeout)
+            process.kill()
+        process.join(1)
+
+    def check_workers(self) -> None:
+        """Schedule restarts for workers that exited and start those that are due."""
+        now = time.monotonic()
+        for index, process in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            del self.processes[index]
+            attempt = self.failures[index] = self.failures.get(index, 0) + 1
+            delay = min(self.max_restart_delay, self.restart_delay * 2 ** (attempt - 1))
+            LOG.error('Worker %s exited with code %s. Restarting in %.0fs', index, process.exitcode, delay)
+            self.restart_at[index] = now + delay
+        for index, due in list(self.restart_at.items()):
+            if due <= now:
+                del self.restart_at[index]
+                if self.shards.get(index):
+                    self.start_worker(index)
+
+    def _active_bot_ids(self, connection: Connection) -> Iterable[int]:
+        return [row[0] for row in connection.execute('SELECT id FROM bots_config WHERE is_active = 1')]
+
+    async def run(self) -> None:
+        """Supervise the workers until SIGTERM or SIGINT, then stop them all."""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.stopping.set)
+
+        connection = sqlite3.connect(self.db_file_path, isolation_level=None)
+        try:
+            data_version = None
+            while not self.stopping.is_set():
+                # data_version only changes when another connection commits
+                version = connection.execute('PRAGMA data_version').fetchone()[0]
+                if version != data_version:
+                    data_version = version
+                    await self.rebalance(self.assign(self._active_bot_ids(connection)))
+                self.check_workers()
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            LOG.info('Stopping all workers...')
+            await asyncio.gather(*[self.stop_worker(index) for index in list(self.processes)])
+            connection.close()
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.remove_signal_handler(sig)
+
+async def supervise(workers: int) -> None:
+    """Entry point of the supervisor process of a sharded run."""
+    setup_logger()
+    LOG.info("Welcome to Buzzing! Running %d worker processes", workers)
+    db_file_path = os.path.abspath(os.environ.get('BUZZING_DB_PATH', 'buzzing.db'))
+
+    # Migrate once here so workers never race each other on the schema
+    connection = sqlite3.connect(db_file_path, isolation_level=None)
+    try:
+        configure_connection(connection)
+        migrate(connection)
+    finally:
+        connection.close()
+
+    drain_timeout = float(os.environ.get('BUZZING_DRAIN_TIMEOUT', DEFAULT_DRAIN_TIMEOUT))
+    reload_interval = float(os.environ.get('BUZZING_RELOAD_INTERVAL', DEFAULT_RELOAD_INTERVAL))
+    await Supervisor(db_file_path, workers, stop_timeout=drain_timeout + 10.0,
+                     workers_reload=reload_interval > 0).run()
+    LOG.info("Bye bye!")
+
+def run() -> None:
+    """Run all bots in this process, or sharded across ``BUZZING_WORKERS`` processes."""
+    workers = int(os.environ.get('BUZZING_WORKERS', 1))
+    if workers > 1:
+        asyncio.run(supervise(workers))
+    else:
+        asyncio.run(main())
+
+def setup_logger(log_file: str = 'buzzing.log') -> QueueListener:
     """Configure application logging.
 
-    Sets up logging to both console and file with appropriate formatting.
-    Log file is created in the current directory as 'buzzing.log'.
+    Log calls only enqueue their record; a listener thread writes it to the
+    console and to ``log_file`` in the current directory. Configured by:
+
+    - ``BUZZING_LOG_LEVEL``: level of the root logger (default ``INFO``)
+    - ``BUZZING_LOG_FORMAT``: ``text`` (default) or ``json``, which adds the
+      bot and user fields of a record
+    - ``BUZZING_LOG_MAX_BYTES``, ``BUZZING_LOG_BACKUPS``: size rotation
+      (default 10 MiB, 5 files)
+    - ``BUZZING_LOG_ROTATE``: rotate by time instead, e.g. ``midnight``
+    - ``BUZZING_LOG_SAMPLING``: ``logger=N`` pairs keeping 1 in N records
+      below WARNING
+
+    Args:
+        log_file: File to log to
+
+    Returns:
+        The listener thread writing the logs
     """
     try:
-        # Create log formatter
-        log_formatter = logging.Formatter(
-            "%(asctime)s [%(threadName)-13.13s] [%(levelname)-5.5s] %(name)s: %(message)s")
-
-        # Configure root logger
-        root_logger = logging.getLogger()
-        root_logger.setLevel(logging.INFO)
-
-        # Add console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(log_formatter)
-        root_logger.addHandler(console_handler)
-
-        # Add file handler
-        log_file = Path("buzzing.log")
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setFormatter(log_formatter)
-        root_logger.addHandler(file_handler)
-
-        LOG.debug(f"Logging configured. Log file: {log_file.absolute()}")
+        log_format = os.environ.get('BUZZING_LOG_FORMAT', 'text').lower()
+        if log_format not in ('text', 'json'):
+            raise ValueError(f"Unknown log format '{log_format}', expected 'text' or 'json'")
+        listener = setup_logging(
+            log_file,
+            level=logging.getLevelName(os.environ.get('BUZZING_LOG_LEVEL', 'INFO').upper()),
+            json_format=log_format == 'json',
+            max_bytes=int(os.environ.get('BUZZING_LOG_MAX_BYTES', DEFAULT_MAX_BYTES)),
+            backups=int(os.environ.get('BUZZING_LOG_BACKUPS', DEFAULT_BACKUPS)),
+            rotate_when=os.environ.get('BUZZING_LOG_ROTATE') or None,
+            sampling=parse_sampling(os.environ.get('BUZZING_LOG_SAMPLING', '')),
+        )
+        LOG.debug("Logging configured. Log file: %s", Path(log_file).absolute())
+        return listener
     except Exception as e:
         print(f"Failed to configure logging: {e}")
         raise
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run()
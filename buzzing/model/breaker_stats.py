@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+from typing import Optional
+
+@dataclass(frozen=True)
+class BreakerStats:
+    """State and counters of a circuit breaker.
+
+    Attributes:
+        name: Name of the protected upstream, e.g. the bot name
+        state: ``closed``, ``open`` or ``half_open``
+        consecutive_failures: Failures since the last success
+        opened: Times the breaker opened
+        rejected: Calls failed fast while the breaker was open
+        retry_in: Seconds until the next probe is allowed, if open
+    """
+    name: str
+    state: str
+    consecutive_failures: int
+    opened: int
+    rejected: int
+    retry_in: Optional[float]
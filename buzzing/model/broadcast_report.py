@@ -0,0 +1,31 @@
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class BroadcastReport:
+    """Outcome of a single broadcast to a bot's subscribers.
+
+    Attributes:
+        bot_id: ID of the bot that broadcast the message
+        total: Number of recipients the broadcast was addressed to
+        sent: Number of messages delivered successfully
+        failed: Number of messages that could not be delivered
+        elapsed: Wall-clock duration of the broadcast in seconds
+        aborted: Whether the broadcast was cut short by a shutdown
+        skipped: Whether the broadcast was skipped because the content
+            had not changed or the upstream's circuit breaker was open
+        pruned: Number of subscriptions deactivated because their chat
+            can no longer be reached
+    """
+    bot_id: int
+    total: int
+    sent: int
+    failed: int
+    elapsed: float
+    aborted: bool = False
+    skipped: bool = False
+    pruned: int = 0
+
+    @property
+    def throughput(self) -> float:
+        """Delivered messages per second."""
+        return self.sent / self.elapsed if self.elapsed > 0 else float(self.sent)
@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class BroadcastState:
+    """The last broadcast of a bot, as remembered for delta suppression.
+
+    Attributes:
+        bot_id: ID of the bot
+        content_hash: SHA-256 hex digest of the broadcast payload
+        sent_at: Unix time the payload was broadcast
+    """
+    bot_id: int
+    content_hash: str
+    sent_at: float
@@ -0,0 +1,28 @@
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class CacheStats:
+    """Counters of a fetch cache, used to tune its TTLs.
+
+    Attributes:
+        name: Name of the cache, e.g. ``testbot1.fetch_now``
+        hits: Calls answered with a fresh cached value
+        stale_hits: Calls answered with a stale value while refreshing
+        misses: Calls that started an upstream fetch
+        coalesced: Calls that joined a fetch already in flight
+        errors: Upstream fetches that failed
+        fallbacks: Failed fetches answered with the last good value
+    """
+    name: str
+    hits: int
+    stale_hits: int
+    misses: int
+    coalesced: int
+    errors: int
+    fallbacks: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """Share of calls that did not start an upstream fetch."""
+        calls = self.hits + self.stale_hits + self.misses + self.coalesced
+        return (calls - self.misses) / calls if calls else 0.0
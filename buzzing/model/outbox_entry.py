@@ -0,0 +1,26 @@
+from dataclasses import dataclass
+from typing import Any, Tuple
+
+@dataclass(frozen=True)
+class OutboxEntry:
+    """A single pending delivery of a broadcast to one subscriber.
+
+    Attributes:
+        broadcast_id: ID of the broadcast this delivery belongs to
+        bot_id: ID of the bot sending the message
+        user_id: Telegram user ID of the recipient
+        payload: Message to deliver
+        attempts: Number of delivery attempts made so far
+    """
+    # No per-instance __dict__; declared by hand as dataclass(slots=True) needs Python 3.10
+    __slots__ = ('broadcast_id', 'bot_id', 'user_id', 'payload', 'attempts')
+
+    broadcast_id: int
+    bot_id: int
+    user_id: int
+    payload: Any
+    attempts: int
+
+    def __reduce__(self) -> Tuple[type, tuple]:
+        # Frozen instances with slots cannot be restored attribute by attribute
+        return type(self), (self.broadcast_id, self.bot_id, self.user_id, self.payload, self.attempts)
@@ -0,0 +1,19 @@
+from dataclasses import dataclass
+from typing import Dict, List
+
+@dataclass(frozen=True)
+class PluginProfile:
+    """Where the time went while loading the bot plugins.
+
+    Attributes:
+        import_times: Seconds spent importing each plugin module
+        init_times: Seconds spent creating the plugin instance of each bot
+        failed: Error of each bot whose plugin could not be loaded
+        pending: Bots whose plugin was still loading when the profile was taken
+        elapsed: Duration of the warm-up in seconds
+    """
+    import_times: Dict[str, float]
+    init_times: Dict[str, float]
+    failed: Dict[str, str]
+    pending: List[str]
+    elapsed: float
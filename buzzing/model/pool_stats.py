@@ -0,0 +1,32 @@
+from dataclasses import dataclass
+from typing import Optional
+
+@dataclass(frozen=True)
+class PoolStats:
+    """Snapshot of the shared Bot API connection pool.
+
+    Attributes:
+        users: Bots currently sharing the pool
+        requests: Requests completed or in flight since the pool was created
+        active: Requests currently holding a connection slot
+        waiting: Requests currently waiting for a slot
+        total_wait: Seconds all requests spent waiting for a slot
+        max_wait: Longest single wait for a slot in seconds
+        open_connections: Open connections, if the transport reports them
+        idle_connections: Idle keep-alive connections, if reported
+        http2: Whether HTTP/2 multiplexing is enabled
+    """
+    users: int
+    requests: int
+    active: int
+    waiting: int
+    total_wait: float
+    max_wait: float
+    open_connections: Optional[int]
+    idle_connections: Optional[int]
+    http2: bool
+
+    @property
+    def mean_wait(self) -> float:
+        """Average seconds a request waited for a slot."""
+        return self.total_wait / self.requests if self.requests else 0.0
@@ -0,0 +1,20 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from buzzing.model.plugin_profile import PluginProfile
+
+@dataclass(frozen=True)
+class StartupReport:
+    """Outcome of starting all bots of the process.
+
+    Attributes:
+        ready: Seconds from the start of registration until each bot was ready
+        failed: Error of each bot whose first startup attempt failed
+        pending: Bots that were not ready within the startup timeout
+        elapsed: Total duration of the startup in seconds
+        plugins: Profile of loading the bot plugins
+    """
+    ready: Dict[str, float]
+    failed: Dict[str, str]
+    pending: List[str]
+    elapsed: float
+    plugins: Optional[PluginProfile] = None
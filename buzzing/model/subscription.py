@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Tuple
 
 @dataclass(frozen=True)
 class Subscription:
@@ -12,7 +13,14 @@ class Subscription:
         bot_id: ID of the bot being subscribed to
         is_active: Whether the subscription is currently active
     """
+    # No per-instance __dict__; declared by hand as dataclass(slots=True) needs Python 3.10
+    __slots__ = ('user_id', 'username', 'bot_id', 'is_active')
+
     user_id: int
     username: str
     bot_id: int
     is_active: bool
+
+    def __reduce__(self) -> Tuple[type, tuple]:
+        # Frozen instances with slots cannot be restored attribute by attribute
+        return type(self), (self.user_id, self.username, self.bot_id, self.is_active)
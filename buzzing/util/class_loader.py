@@ -22,14 +22,14 @@ def class_from_string(module_name: str, class_name: str) -> Type[Any]:
     try:
         module = importlib.import_module(module_name)
         class_type = getattr(module, class_name)
-        LOG.debug(f"Successfully loaded class {class_name} from module {module_name}")
+        LOG.debug("Successfully loaded class %s from module %s", class_name, module_name)
         return class_type
     except ImportError as e:
-        LOG.error(f"Failed to import module {module_name}: {e}")
+        LOG.error("Failed to import module %s: %s", module_name, e)
         raise
     except AttributeError as e:
-        LOG.error(f"Class {class_name} not found in module {module_name}: {e}")
+        LOG.error("Class %s not found in module %s: %s", class_name, module_name, e)
         raise
     except Exception as e:
-        LOG.error(f"Unexpected error loading class {class_name} from {module_name}: {e}")
+        LOG.error("Unexpected error loading class %s from %s: %s", class_name, module_name, e)
         raise
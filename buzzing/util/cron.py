@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+from typing import FrozenSet, Tuple
+
+# (name, minimum, maximum) for the five standard cron fields
+FIELDS: Tuple[Tuple[str, int, int], ...] = (
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day', 1, 31),
+    ('month', 1, 12),
+    ('weekday', 0, 7),
+)
+
+# Give up searching for a matching time after this many years,
+# e.g. for expressions such as "0 0 31 2 *".
+MAX_YEARS = 5
+
+
+def _parse_field(expression: str, minimum: int, maximum: int, name: str) -> FrozenSet[int]:
+    values = set()
+    for part in expression.split(','):
+        step = 1
+        if '/' in part:
+            part, step_str = part.split('/', 1)
+            step = int(step_str)
+            if step <= 0:
+                raise ValueError(f"Invalid step in cron {name} field: {expression}")
+        if part == '*':
+            start, end = minimum, maximum
+        elif '-' in part:
+            start_str, end_str = part.split('-', 1)
+            start, end = int(start_str), int(end_str)
+        else:
+            start = int(part)
+            end = maximum if step > 1 else start
+        if start < minimum or end > maximum or start > end:
+            raise ValueError(f"Cron {name} field out of range: {expression}")
+        values.update(range(start, end + 1, step))
+    if name == 'weekday':
+        # Both 0 and 7 mean Sunday
+        values = {value % 7 for value in values}
+    return frozenset(values)
+
+
+class CronSchedule:
+    """A standard five-field cron expression (minute hour day month weekday).
+
+    Supports ``*``, lists (``1,15``), ranges (``1-5``) and steps (``*/10``).
+    As in cron, when both day of month and day of week are restricted a time
+    matches if either of them does. Weekdays run from 0 (Sunday) to 6, and 7
+    is accepted as Sunday.
+    """
+
+    def __init__(self, expression: str) -> None:
+        """Parse a cron expression.
+
+        Args:
+            expression: Cron expression, e.g. ``"0 7 * * 1-5"``
+
+        Raises:
+            ValueError: If the expression is malformed
+        """
+        parts = expression.split()
+        if len(parts) != len(FIELDS):
+            raise ValueError(f"Cron expression must have 5 fields: {expression!r}")
+        self.expression = expression
+        try:
+            (self.minutes, self.hours, self.days,
+             self.months, self.weekdays) = (_parse_field(part, low, high, name)
+                                            for part, (name, low, high) in zip(parts, FIELDS))
+        except ValueError as e:
+            raise ValueError(f"Invalid cron expression {expression!r}: {e}") from e
+        self._any_day = parts[2] == '*'
+        self._any_weekday = parts[4] == '*'
+
+    def _day_matches(self, moment: datetime) -> bool:
+        in_days = moment.day in self.days
+        in_weekdays = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Return the first matching time strictly after ``moment``.
+
+        Raises:
+            ValueError: If the expression never matches
+        """
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * MAX_YEARS)
+        while candidate <= limit:
+            if candidate.month not in self.months:
+                year = candidate.year + candidate.month // 12
+                candidate = candidate.replace(year=year, month=candidate.month % 12 + 1,
+                                              day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression {self.expression!r} never matches")
@@ -0,0 +1,74 @@
+import bisect
+import functools
+import hashlib
+from typing import Dict, Generic, Hashable, Iterable, List, TypeVar
+
+DEFAULT_REPLICAS = 160
+
+N = TypeVar('N', bound=Hashable)
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+
+class HashRing(Generic[N]):
+    """Consistent hash ring mapping keys to nodes.
+
+    Every node is placed on the ring at ``replicas`` pseudo-random points, so
+    keys spread evenly and adding or removing a node only moves the keys of
+    its neighbouring ranges, about ``1/len(nodes)`` of them.
+    """
+
+    def __init__(self, nodes: Iterable[N] = (), replicas: int = DEFAULT_REPLICAS) -> None:
+        """Initialize the ring.
+
+        Args:
+            nodes: Initial nodes; their ``str()`` must be unique
+            replicas: Points per node on the ring
+        """
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, N] = {}
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self) -> int:
+        return len(self._points) // self.replicas if self.replicas else 0
+
+    def add(self, node: N) -> None:
+        """Place a node on the ring."""
+        for replica in range(self.replicas):
+            point = _hash(f'{node}#{replica}')
+            if point not in self._owners:
+                bisect.insort(self._points, point)
+            self._owners[point] = node
+
+    def remove(self, node: N) -> None:
+        """Take a node off the ring; its keys move to the following nodes."""
+        for replica in range(self.replicas):
+            point = _hash(f'{node}#{replica}')
+            if self._owners.get(point) == node:
+                del self._owners[point]
+                self._points.pop(bisect.bisect_left(self._points, point))
+
+    def node_for(self, key: Hashable) -> N:
+        """Return the node owning a key.
+
+        Raises:
+            LookupError: If the ring is empty
+        """
+        if not self._points:
+            raise LookupError('Hash ring is empty')
+        index = bisect.bisect_right(self._points, _hash(str(key))) % len(self._points)
+        return self._owners[self._points[index]]
+
+
+@functools.lru_cache(maxsize=8)
+def _worker_ring(workers: int) -> HashRing[int]:
+    return HashRing(range(workers))
+
+
+def shard_for(bot_id: int, workers: int) -> int:
+    """Return the index of the worker process that runs a bot."""
+    return _worker_ring(workers).node_for(bot_id)
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_MAX_BODY = 1024 * 1024
+DEFAULT_IDLE_TIMEOUT = 60.0
+MAX_HEADERS = 100
+
+
+@dataclass(frozen=True)
+class Request:
+    """An HTTP request received by HTTPServer.
+
+    Attributes:
+        method: Request method, e.g. ``POST``
+        path: Path of the request target without the query string
+        query: Query string, without the leading ``?``
+        headers: Header values keyed by lower-cased header name
+        body: Raw request body
+    """
+    method: str
+    path: str
+    query: str
+    headers: Dict[str, str]
+    body: bytes
+
+
+@dataclass(frozen=True)
+class Response:
+    """An HTTP response returned by a route handler.
+
+    Attributes:
+        status: HTTP status code
+        body: Raw response body
+        content_type: Value of the Content-Type header
+        headers: Additional response headers
+    """
+    status: int = 200
+    body: bytes = b''
+    content_type: str = 'text/plain; charset=utf-8'
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class HTTPError(Exception):
+    """Raised while reading a request that cannot be served."""
+
+    def __init__(self, status: int, message: str = '') -> None:
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+
+
+class HTTPServer:
+    """Minimal asyncio HTTP/1.1 server for internal endpoints.
+
+    Serves exact ``(method, path)`` routes over keep-alive connections on the
+    running event loop, without extra dependencies. Bodies must be sent with
+    Content-Length; chunked requests are rejected.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 max_body: int = DEFAULT_MAX_BODY,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT) -> None:
+        """Initialize the server. Nothing is bound until start().
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on; 0 picks a free port
+            max_body: Largest accepted request body in bytes
+            idle_timeout: Seconds an idle keep-alive connection is kept open
+        """
+        self.host = host
+        self.port = port
+        self.max_body = max_body
+        self.idle_timeout = idle_timeout
+        self._routes: Dict[Tuple[str, str], Handler] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+
+    def route(self, method: str, path: str, handler: Handler) -> None:
+        """Serve ``method`` requests for exactly ``path`` with ``handler``."""
+        self._routes[(method.upper(), path)] = handler
+
+    def remove_route(self, method: str, path: str) -> None:
+        """Stop serving a route; unknown routes are ignored."""
+        self._routes.pop((method.upper(), path), None)
+
+    async def start(self) -> None:
+        """Bind the socket and start accepting connections."""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        LOG.info('HTTP server listening on %s:%s', self.host, self.port)
+
+    async def stop(self) -> None:
+        """Stop accepting connections and close the open ones."""
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        await self._server.wait_closed()
+        self._server = None
+        LOG.info('HTTP server on %s:%s stopped', self.host, self.port)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), self.idle_timeout)
+                except HTTPError as e:
+                    await self._write(writer, Response(e.status, str(e).encode()), keep_alive=False)
+                    return
+                if request is None:
+                    return
+                response = await self._dispatch(request)
+                keep_alive = request.headers.get('connection', '').lower() != 'close'
+                await self._write(writer, response, keep_alive)
+                if not keep_alive:
+                    return
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.decode('latin-1').split()
+        except ValueError:
+            raise HTTPError(400, 'Malformed request line')
+
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise HTTPError(431)
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise HTTPError(411)
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(400, 'Invalid Content-Length')
+        if length > self.max_body:
+            raise HTTPError(413)
+        body = await reader.readexactly(length) if length else b''
+
+        url = urlsplit(target)
+        return Request(method=method.upper(), path=url.path, query=url.query, headers=headers, body=body)
+
+    async def _dispatch(self, request: Request) -> Response:
+        handler = self._routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self._routes):
+                return Response(405, b'Method Not Allowed')
+            return Response(404, b'Not Found')
+        try:
+            return await handler(request)
+        except Exception as e:
+            LOG.error('Error handling %s %s: %s', request.method, request.path, e)
+            return Response(500, b'Internal Server Error')
+
+    async def _write(self, writer: asyncio.StreamWriter, response: Response, keep_alive: bool) -> None:
+        reason = HTTPStatus(response.status).phrase
+        headers = {
+            'Content-Type': response.content_type,
+            'Content-Length': str(len(response.body)),
+            'Connection': 'keep-alive' if keep_alive else 'close',
+            **response.headers,
+        }
+        head = f'HTTP/1.1 {response.status} {reason}\r\n'
+        head += ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+        writer.write(head.encode('latin-1') + b'\r\n' + response.body)
+        await writer.drain()
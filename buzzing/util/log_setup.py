@@ -0,0 +1,186 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from typing import Any, Dict, List, MutableMapping, Optional, Tuple
+
+TEXT_FORMAT = "%(asctime)s [%(threadName)-13.13s] [%(levelname)-5.5s] %(name)s: %(message)s"
+DEFAULT_MAX_BYTES = 10 * 2 ** 20
+DEFAULT_BACKUPS = 5
+
+# Record attributes copied into JSON lines when a log call carries them
+CONTEXT_FIELDS = ('bot_id', 'bot_name', 'user_id')
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+_sampled_loggers: List[Tuple[logging.Logger, logging.Filter]] = []
+
+
+class ContextAdapter(logging.LoggerAdapter):
+    """Adds fixed context, e.g. the bot, to every record of a logger.
+
+    Unlike the stock adapter, ``extra`` passed to a call is merged with the
+    fixed context instead of replacing it. Disabled levels return before
+    anything is merged.
+    """
+
+    def process(self, msg: Any, kwargs: MutableMapping[str, Any]) -> Tuple[Any, MutableMapping[str, Any]]:
+        extra = kwargs.get('extra')
+        kwargs['extra'] = {**self.extra, **extra} if extra else self.extra  # type: ignore[dict-item]
+        return msg, kwargs
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line.
+
+    Carries the bot and user fields of ``CONTEXT_FIELDS`` when the log call
+    provided them, e.g. through a ContextAdapter.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if getattr(record, 'sampled', None):
+            entry['sampled'] = record.sampled  # type: ignore[attr-defined]
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps one in ``every`` records per message template below WARNING.
+
+    Counting per template keeps rare messages of a busy logger visible.
+    Kept records carry ``sampled = every``; warnings and errors always pass.
+    """
+
+    def __init__(self, every: int) -> None:
+        """Initialize the filter.
+
+        Args:
+            every: Keep one record in this many
+        """
+        super().__init__()
+        self.every = max(1, every)
+        self._counts: Dict[Any, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.every == 1:
+            return True
+        count = self._counts.get(record.msg, 0)
+        self._counts[record.msg] = count + 1
+        if count % self.every:
+            return False
+        record.sampled = self.every
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments now, as they may change later; the listener
+        # thread does the formatting, including tracebacks
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def parse_sampling(spec: str) -> Dict[str, int]:
+    """Parse ``logger=N`` pairs, e.g. ``buzzing.bots_manager.broadcaster=100,buzzing.x=10``.
+
+    Raises:
+        ValueError: If a pair is malformed or N is not a positive integer
+    """
+    sampling: Dict[str, int] = {}
+    for pair in filter(None, (part.strip() for part in spec.split(','))):
+        name, separator, every = pair.partition('=')
+        if not separator or not name or not every.strip().isdigit() or int(every) < 1:
+            raise ValueError(f"Invalid log sampling '{pair}', expected logger=N with N >= 1")
+        sampling[name.strip()] = int(every)
+    return sampling
+
+
+def setup_logging(log_file: Optional[str] = 'buzzing.log', level: int = logging.INFO, json_format: bool = False,
+                  max_bytes: int = DEFAULT_MAX_BYTES, backups: int = DEFAULT_BACKUPS,
+                  rotate_when: Optional[str] = None, console: bool = True,
+                  sampling: Optional[Dict[str, int]] = None) -> QueueListener:
+    """Route all logging through a queue to a listener thread.
+
+    The root logger gets a single QueueHandler, so a log call only puts the
+    record on a queue; console and file I/O happen on the listener thread.
+    Calling this again replaces the previous pipeline. The queue is flushed
+    when the process exits.
+
+    Args:
+        log_file: File to log to; no file when None
+        level: Level of the root logger
+        json_format: Write JSON lines instead of text
+        max_bytes: Size at which the file is rotated; 0 never rotates by size
+        backups: Rotated files kept
+        rotate_when: Rotate by time instead of size, e.g. ``midnight`` or
+            ``H``, as accepted by TimedRotatingFileHandler
+        console: Also log to stderr
+        sampling: Loggers whose records below WARNING are sampled, mapped
+            to N for one record kept in N
+
+    Returns:
+        The running listener
+    """
+    stop_logging()
+    formatter: logging.Formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    handlers: List[logging.Handler] = []
+    if console:
+        handlers.append(logging.StreamHandler())
+    if log_file:
+        if rotate_when:
+            handlers.append(TimedRotatingFileHandler(log_file, when=rotate_when, backupCount=backups, delay=True))
+        else:
+            handlers.append(RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backups, delay=True))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    global _listener, _queue_handler
+    records: 'queue.SimpleQueue[logging.LogRecord]' = queue.SimpleQueue()
+    _queue_handler = _QueueHandler(records)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    root_logger.addHandler(_queue_handler)
+    for name, every in (sampling or {}).items():
+        sampling_filter = SamplingFilter(every)
+        logging.getLogger(name).addFilter(sampling_filter)
+        _sampled_loggers.append((logging.getLogger(name), sampling_filter))
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """Flush the queue, stop the listener and remove the pipeline, if any."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    for logger, sampling_filter in _sampled_loggers:
+        logger.removeFilter(sampling_filter)
+    _sampled_loggers.clear()
+    if _listener is not None:
+        if getattr(_listener, '_thread', None) is not None:
+            _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+from buzzing.util.metrics import REGISTRY
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 0.1
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_STACK_DEPTH = 8
+
+LOOP_LAG = REGISTRY.histogram('buzzing_loop_lag_seconds', 'Delay of event loop wakeups',
+                              buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+LOOP_STALLS = REGISTRY.counter('buzzing_loop_stalls_total', 'Times a task blocked the event loop', ('task',))
+
+
+def task_name(loop: asyncio.AbstractEventLoop) -> str:
+    """Return the name of the task the loop is running, or ``loop`` for plain callbacks.
+
+    Safe to call from another thread; the answer may be a moment old.
+    """
+    task = asyncio.current_task(loop)
+    return task.get_name() if task is not None else 'loop'
+
+
+class LoopWatchdog:
+    """Measures event loop lag and reports what blocks the loop.
+
+    A heartbeat task on the loop wakes up every ``interval`` and records how
+    late it is. A daemon thread checks the heartbeat; once it is ``threshold``
+    seconds overdue, the thread logs the running task's name (bot tasks are
+    named ``bot_<name>``) and the innermost frames of the loop thread, while
+    the loop is still blocked. Each stall is reported once.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, threshold: float = DEFAULT_THRESHOLD,
+                 stack_depth: int = DEFAULT_STACK_DEPTH) -> None:
+        """Initialize the watchdog.
+
+        Args:
+            interval: Seconds between heartbeats
+            threshold: Seconds of lag reported as a stall
+            stack_depth: Frames of the blocking code to log
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.stack_depth = stack_depth
+        self.stalls = 0
+        self.max_lag = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id = 0
+        self._last_tick = 0.0
+        self._reported = False
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Start watching the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stopped.clear()
+        self._task = self._loop.create_task(self._heartbeat(), name='loop_watchdog')
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        """Stop the heartbeat and the watching thread."""
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._thread:
+            self._thread.join(self.interval * 2)
+            self._thread = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            LOOP_LAG.labels().observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            self._last_tick = now
+
+    def _watch(self) -> None:
+        # Check often enough to catch a stall soon after it crosses the threshold
+        period = min(self.interval, self.threshold) / 2
+        while not self._stopped.wait(period):
+            overdue = time.monotonic() - self._last_tick - self.interval
+            if overdue < self.threshold:
+                self._reported = False
+            elif not self._reported:
+                self._reported = True
+                self._report(overdue)
+
+    def _report(self, overdue: float) -> None:
+        assert self._loop is not None
+        name = task_name(self._loop)
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = ''.join(traceback.format_stack(frame, limit=self.stack_depth)) if frame else ''
+        self.stalls += 1
+        LOOP_STALLS.labels(name).inc()
+        LOG.warning('Event loop blocked for %.3fs+ by task %s:\n%s', overdue, name, stack)
@@ -0,0 +1,243 @@
+import bisect
+import math
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple, Union
+
+# Latency buckets in seconds, from a fast Bot API call to a slow scrape
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + '}'
+
+
+class CounterValue:
+    """One labelled series of a counter."""
+    __slots__ = ('value',)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Add to the counter."""
+        self.value += amount
+
+
+class GaugeValue:
+    """One labelled series of a gauge."""
+    __slots__ = ('value',)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        """Set the gauge."""
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Raise the gauge."""
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        """Lower the gauge."""
+        self.value -= amount
+
+
+class HistogramValue:
+    """One labelled series of a histogram.
+
+    Only the bucket the value falls into is incremented; buckets are made
+    cumulative when rendered, keeping ``observe`` to one bisect and two adds.
+    """
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+Series = Union[CounterValue, GaugeValue, HistogramValue]
+
+
+class Metric:
+    """A named metric with one series per combination of label values."""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        """Initialize the metric.
+
+        Args:
+            name: Metric name, e.g. ``buzzing_sends_total``
+            documentation: Help text
+            label_names: Names of the labels every series has
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._series: Dict[Labels, Series] = {}
+
+    def _new_series(self) -> Series:
+        raise NotImplementedError
+
+    def labels(self, *values: object) -> Series:
+        """Return the series for some label values, creating it on first use.
+
+        Hot paths should keep the returned series instead of calling this per event.
+
+        Raises:
+            ValueError: If the number of values does not match the label names
+        """
+        key = tuple(str(value) for value in values)
+        series = self._series.get(key)
+        if series is None:
+            if len(key) != len(self.label_names):
+                raise ValueError(f'{self.name} expects labels {self.label_names}, got {key}')
+            series = self._series[key] = self._new_series()
+        return series
+
+    def remove(self, *values: object) -> None:
+        """Drop the series of some label values, e.g. of a removed bot."""
+        self._series.pop(tuple(str(value) for value in values), None)
+
+    def _samples(self, labels: Labels, series: Series) -> Iterable[Tuple[str, Sequence[str], Labels, float]]:
+        yield self.name, self.label_names, labels, series.value  # type: ignore[union-attr]
+
+    def render(self) -> List[str]:
+        """Return the metric in Prometheus text exposition format."""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for labels, series in list(self._series.items()):
+            for name, label_names, label_values, value in self._samples(labels, series):
+                lines.append(f'{name}{_format_labels(label_names, label_values)} {_format_value(value)}')
+        return lines
+
+
+class Counter(Metric):
+    """A value that only goes up, e.g. messages sent."""
+
+    kind = 'counter'
+
+    def _new_series(self) -> CounterValue:
+        return CounterValue()
+
+
+class Gauge(Metric):
+    """A value that goes up and down, e.g. subscribers."""
+
+    kind = 'gauge'
+
+    def _new_series(self) -> GaugeValue:
+        return GaugeValue()
+
+
+class Histogram(Metric):
+    """Distribution of observed values, e.g. latencies."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """Initialize the histogram.
+
+        Args:
+            name: Metric name, e.g. ``buzzing_send_seconds``
+            documentation: Help text
+            label_names: Names of the labels every series has
+            buckets: Upper bounds of the buckets, ascending
+        """
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self) -> HistogramValue:
+        return HistogramValue(self.buckets)
+
+    def _samples(self, labels: Labels, series: Series) -> Iterable[Tuple[str, Sequence[str], Labels, float]]:
+        assert isinstance(series, HistogramValue)
+        bucket_labels = self.label_names + ('le',)
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), series.counts):
+            cumulative += count
+            yield f'{self.name}_bucket', bucket_labels, labels + (_format_value(bound),), cumulative
+        yield f'{self.name}_sum', self.label_names, labels, series.sum
+        yield f'{self.name}_count', self.label_names, labels, cumulative
+
+
+Collector = Callable[[], Iterable[Metric]]
+
+
+class MetricsRegistry:
+    """The metrics of the process, rendered in Prometheus text format.
+
+    Metrics updated as things happen are registered once, typically at
+    module level. Values that are cheaper to read when scraped, such as
+    queue sizes, come from collectors called by ``render``.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Collector] = []
+
+    def _register(self, metric: Metric) -> Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                raise ValueError(f'Metric {metric.name} is already registered differently')
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        """Register a counter, or return the one registered under this name."""
+        return self._register(Counter(name, documentation, label_names))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        """Register a gauge, or return the one registered under this name."""
+        return self._register(Gauge(name, documentation, label_names))  # type: ignore[return-value]
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Register a histogram, or return the one registered under this name."""
+        return self._register(Histogram(name, documentation, label_names, buckets))  # type: ignore[return-value]
+
+    def add_collector(self, collector: Collector) -> None:
+        """Add a function returning metrics computed at scrape time."""
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector: Collector) -> None:
+        """Remove a collector added before."""
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def render(self) -> str:
+        """Return all metrics in Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        for collector in list(self._collectors):
+            for metric in collector():
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry served by the metrics endpoint
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from typing import Callable, Dict, Hashable, Optional
+
+
+class TokenBucket:
+    """Asynchronous token bucket rate limiter.
+
+    Tokens are refilled continuously at ``rate`` per second up to ``capacity``.
+    Callers waiting for tokens are served in FIFO order.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Initialize the bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size (defaults to ``rate``)
+            clock: Monotonic clock used to measure elapsed time
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def pause(self, seconds: float) -> None:
+        """Block all acquisitions for the given number of seconds.
+
+        Used to honour server-side back-off requests such as Telegram's
+        ``retry_after``.
+        """
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    async def wait_unpaused(self) -> None:
+        """Wait until a pause set by pause() is over, without taking tokens."""
+        while True:
+            remaining = self._paused_until - self._clock()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(remaining)
+
+    def consume(self, tokens: float = 1.0) -> None:
+        """Take tokens at once, borrowing against the refill if there are too few.
+
+        For sends that must not queue behind waiting acquire() calls, such as
+        replies. The callers of acquire() wait until the debt is repaid, so
+        the rate still holds on average.
+        """
+        self._refill(self._clock())
+        self._tokens -= tokens
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Wait until ``tokens`` are available and consume them."""
+        async with self._lock:
+            while True:
+                now = self._clock()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+class KeyedRateLimiter:
+    """Per-key rate limiter with bounded memory.
+
+    Implements the generic cell rate algorithm: each key only stores the time
+    at which its next request is allowed, so millions of keys stay cheap.
+    Entries that are no longer throttling anything are dropped once the table
+    grows beyond ``max_keys``.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, max_keys: int = 10000,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Initialize the limiter.
+
+        Args:
+            rate: Allowed requests per second for each key
+            burst: Number of requests a key may issue back to back
+            max_keys: Table size that triggers pruning of idle keys
+            clock: Monotonic clock used to measure elapsed time
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.interval = 1.0 / rate
+        self.tolerance = self.interval * max(burst - 1, 0)
+        self.max_keys = max_keys
+        self._clock = clock
+        self._next_allowed: Dict[Hashable, float] = {}
+
+    def _prune(self, now: float) -> None:
+        idle = [key for key, tat in self._next_allowed.items() if tat <= now]
+        for key in idle:
+            del self._next_allowed[key]
+
+    async def acquire(self, key: Hashable) -> None:
+        """Wait until a request for ``key`` is allowed."""
+        now = self._clock()
+        tat = max(self._next_allowed.get(key, now), now)
+        self._next_allowed[key] = tat + self.interval
+        if len(self._next_allowed) > self.max_keys:
+            self._prune(now)
+        delay = tat - now - self.tolerance
+        if delay > 0:
+            await asyncio.sleep(delay)
@@ -0,0 +1,108 @@
+import asyncio
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Counter, Dict, List, Optional
+from buzzing.util.loop_watchdog import task_name
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+DEFAULT_MAX_DEPTH = 64
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is running."""
+
+
+class SamplingProfiler:
+    """Samples the stack of the event loop thread from another thread.
+
+    Every ``interval`` seconds it records the loop thread's stack, rooted at
+    the name of the running task, and counts identical stacks. The result is
+    in the collapsed format read by flamegraph.pl, speedscope and similar
+    tools. Nothing runs between profiles, and sampling never pauses the loop.
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None,
+                 thread_id: Optional[int] = None,
+                 interval: float = DEFAULT_SAMPLE_INTERVAL,
+                 max_depth: int = DEFAULT_MAX_DEPTH) -> None:
+        """Initialize the profiler.
+
+        Args:
+            loop: Loop whose running task names the stacks; the running loop
+                when omitted
+            thread_id: Thread to sample; the calling thread when omitted
+            interval: Seconds between samples
+            max_depth: Innermost frames kept per sample
+        """
+        self.loop = loop or asyncio.get_running_loop()
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.max_depth = max_depth
+        self._running = False
+
+    def _stack(self) -> Optional[str]:
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return None
+        frames: List[str] = []
+        while frame is not None and len(frames) < self.max_depth:
+            code = frame.f_code
+            frames.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+            frame = frame.f_back
+        frames.append(task_name(self.loop))
+        return ';'.join(reversed(frames))
+
+    def sample(self, duration: float) -> Dict[str, int]:
+        """Sample for ``duration`` seconds. Blocks; call it from another thread.
+
+        Returns:
+            Number of samples per collapsed stack
+        """
+        counts: Counter[str] = collections.Counter()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            stack = self._stack()
+            if stack is not None:
+                counts[stack] += 1
+            time.sleep(self.interval)
+        return dict(counts)
+
+    async def profile(self, duration: float) -> Dict[str, int]:
+        """Sample the loop thread for ``duration`` seconds without blocking it.
+
+        Raises:
+            ProfilerBusy: If a profile is already running
+        """
+        if self._running:
+            raise ProfilerBusy('A profile is already running')
+        self._running = True
+        try:
+            return await asyncio.to_thread(self.sample, duration)
+        finally:
+            self._running = False
+
+    @staticmethod
+    def collapse(counts: Dict[str, int]) -> str:
+        """Render sample counts in the collapsed stack format, most frequent first."""
+        return ''.join(f'{stack} {count}\n' for stack, count in
+                       sorted(counts.items(), key=lambda item: item[1], reverse=True))
+
+    async def write(self, duration: float, directory: str = '.') -> str:
+        """Profile for ``duration`` seconds and write the collapsed stacks to a file.
+
+        Returns:
+            Path of the written ``.folded`` file
+        """
+        LOG.info('Profiling the event loop for %ss', duration)
+        counts = await self.profile(duration)
+        path = os.path.join(directory, f'buzzing-profile-{os.getpid()}-{time.strftime("%Y%m%d-%H%M%S")}.folded')
+        with open(path, 'w') as profile_file:
+            profile_file.write(self.collapse(counts))
+        LOG.info('Wrote %d samples to %s', sum(counts.values()), path)
+        return path
@@ -1,29 +1,12 @@
-DROP TABLE IF EXISTS bots_config;
-
-CREATE TABLE IF NOT EXISTS bots_config(
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT,
-    description TEXT,
-    token TEXT,
-    password TEXT,
-    entry_module TEXT,
-    entry_class TEXT,
-    metadata TEXT,
-    is_active BOOLEAN
-);
-
-DROP TABLE IF EXISTS subscription;
-
-CREATE TABLE IF NOT EXISTS subscription(
-    user_id INTEGER,
-    username TEXT,
-    bot_id INTEGER,
-    is_active BOOLEAN,
-    PRIMARY KEY (user_id, bot_id)
-);
+-- Sample bots for local experimentation.
+--
+-- The schema itself is created and upgraded in place by the numbered
+-- migrations in buzzing/dao/migrations, which run on every start. Start the
+-- application once to create the tables, then load this file:
+--   sqlite3 buzzing.db < etc/db_config/v0.sql
 
 INSERT INTO bots_config (name, description, token, password, entry_module, entry_class, metadata, is_active) 
 values ('testbot1', 'Test bot for experimentations 1', '<token1>', 'test123', 'buzzing.bots.test_bot', 'TestBot', null, 1);
 
 INSERT INTO bots_config (name, description, token, password, entry_module, entry_class, metadata, is_active) 
-values ('testbot2', 'Test bot for experimentations 2', '<token2>', 'test321', 'buzzing.bots.test_bot', 'TestBot', null, 1);
\ No newline at end of file
+values ('testbot2', 'Test bot for experimentations 2', '<token2>', 'test321', 'buzzing.bots.test_bot', 'TestBot', null, 1);
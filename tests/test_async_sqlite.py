@@ -0,0 +1,90 @@
+"""Tests for AsyncSQLite and AsyncBotsConfigDao."""
+import asyncio
+import sqlite3
+import pytest
+from buzzing.dao.async_bots_config_dao import AsyncBotsConfigDao
+from buzzing.dao.async_sqlite import AsyncSQLite
+from buzzing.model.subscription import Subscription
+
+@pytest.fixture
+def database(tmp_path):
+    """Create a file database with the subscription table."""
+    path = str(tmp_path / 'buzzing.db')
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE subscription(
+            user_id INTEGER,
+            username TEXT,
+            bot_id INTEGER,
+            is_active BOOLEAN,
+            PRIMARY KEY (user_id, bot_id)
+        )
+    ''')
+    conn.commit()
+    conn.close()
+    database = AsyncSQLite(path)
+    yield database
+    database.close()
+
+def count(conn):
+    return conn.execute('SELECT COUNT(*) FROM subscription').fetchone()[0]
+
+@pytest.mark.asyncio
+async def test_concurrent_subscribes_are_committed(database):
+    """Test that concurrent writes all land and are visible to readers."""
+    dao = AsyncBotsConfigDao(database)
+
+    await asyncio.gather(*[dao.subscribe(Subscription(i, f'user{i}', 1, True)) for i in range(200)])
+
+    user_ids = await database.read(lambda conn: [row[0] for row in conn.execute('SELECT user_id FROM subscription')])
+    assert sorted(user_ids) == list(range(200))
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_share_commits(database):
+    """Test that writes queued together are committed in one transaction."""
+    commits = 0
+    original_execute = database.writer._execute
+
+    def execute(connection, batch):
+        nonlocal commits
+        commits += 1
+        original_execute(connection, batch)
+
+    database.writer._execute = execute
+    dao = AsyncBotsConfigDao(database)
+    await asyncio.gather(*[dao.subscribe(Subscription(i, f'user{i}', 1, True)) for i in range(100)])
+
+    assert commits < 100
+
+@pytest.mark.asyncio
+async def test_failing_write_does_not_affect_batch(database):
+    """Test that a failing write only rolls back its own changes."""
+    def insert(conn, user_id):
+        conn.execute("INSERT INTO subscription VALUES (?, 'user', 1, 1)", (user_id,))
+
+    def insert_then_fail(conn):
+        insert(conn, 99)
+        raise ValueError('boom')
+
+    results = await asyncio.gather(
+        database.write(insert, 1),
+        database.write(insert_then_fail),
+        database.write(insert, 2),
+        return_exceptions=True
+    )
+
+    assert isinstance(results[1], ValueError)
+    assert await database.read(count) == 2
+
+@pytest.mark.asyncio
+async def test_in_memory_database_uses_given_connection():
+    """Test that in-memory databases are accessed through the given connection."""
+    conn = sqlite3.connect(':memory:', isolation_level=None)
+    conn.execute('CREATE TABLE subscription(user_id INTEGER, username TEXT, bot_id INTEGER, is_active BOOLEAN, '
+                 'PRIMARY KEY (user_id, bot_id))')
+    dao = AsyncBotsConfigDao(AsyncSQLite.from_connection(conn))
+
+    await dao.subscribe(Subscription(1, 'user', 1, True))
+    await dao.unsubscribe(Subscription(1, 'user', 1, False))
+
+    assert conn.execute('SELECT is_active FROM subscription').fetchone()[0] == 0
@@ -0,0 +1,74 @@
+"""Tests for Audience and the slotted models."""
+import copy
+import pickle
+from array import array
+from buzzing.cache.audience import Audience
+from buzzing.model.outbox_entry import OutboxEntry
+from buzzing.model.subscription import Subscription
+
+def test_audience_sorts_and_deduplicates():
+    """Test that user IDs are kept sorted and distinct."""
+    audience = Audience([5, 1, 3, 1])
+
+    assert list(audience) == [1, 3, 5]
+    assert len(audience) == 3
+    assert audience.nbytes == 24
+
+def test_audience_membership():
+    """Test membership checks, including values that are not user IDs."""
+    audience = Audience([2, 4, 6])
+
+    assert 4 in audience
+    assert 5 not in audience and 7 not in audience and 0 not in audience
+    assert '4' not in audience
+
+def test_audience_add_and_discard():
+    """Test that changes keep the order and report whether they applied."""
+    audience = Audience([2, 6])
+
+    assert audience.add(4) and not audience.add(4)
+    assert audience.discard(2) and not audience.discard(2)
+    assert list(audience) == [4, 6]
+
+def test_audience_discard_all():
+    """Test that few and many removals both keep the remaining users sorted."""
+    audience = Audience(range(1000))
+
+    assert audience.discard_all([3, 5, 5, 2000]) == 2
+    assert audience.discard_all(range(100, 900)) == 800
+    assert len(audience) == 198
+    assert list(audience)[:4] == [0, 1, 2, 4] and 900 in audience and 500 not in audience
+
+def test_audience_chunks_and_snapshot():
+    """Test that chunks slice a snapshot unaffected by later changes."""
+    audience = Audience(range(10))
+
+    chunks = audience.chunks(4)
+    snapshot = audience.snapshot()
+    first = next(chunks)
+    audience.discard(0)
+    audience.add(42)
+
+    assert first == array('q', [0, 1, 2, 3])
+    assert list(chunks) == [array('q', [4, 5, 6, 7]), array('q', [8, 9])]
+    assert list(snapshot) == list(range(10))
+
+def test_audience_from_sorted_shares_buffer():
+    """Test that a sorted buffer is wrapped without a copy."""
+    user_ids = array('q', [1, 2, 3])
+
+    audience = Audience.from_sorted(user_ids)
+
+    assert 2 in audience
+    user_ids.append(4)
+    assert 4 in audience
+
+def test_slotted_models_copy_and_pickle():
+    """Test that the slotted models have no __dict__ and still copy and pickle."""
+    subscription = Subscription(1, 'user', 2, True)
+    entry = OutboxEntry(1, 2, 3, {'text': 'hi'}, 0)
+
+    assert not hasattr(subscription, '__dict__') and not hasattr(entry, '__dict__')
+    assert copy.copy(subscription) == subscription
+    assert pickle.loads(pickle.dumps(subscription)) == subscription
+    assert pickle.loads(pickle.dumps(entry)) == entry
@@ -0,0 +1,84 @@
+"""Tests for the fake Bot API server and the benchmark harness."""
+import json
+import httpx
+import pytest
+from benchmarks.fake_bot_api import FakeBotApi
+from benchmarks.harness import BenchmarkConfig, compare, percentile, run_benchmark, save_results
+from benchmarks.memory import MemoryBenchmarkConfig, run_memory_benchmark
+
+@pytest.fixture
+async def fake_api():
+    """Start a fake Bot API serving one bot."""
+    fake = FakeBotApi(seed=1)
+    await fake.start()
+    fake.add_bot('1:token', 1, 'fake_bot')
+    yield fake
+    await fake.stop()
+
+@pytest.mark.asyncio
+async def test_fake_api_methods(fake_api):
+    """Test that the fake answers like the Bot API and queues updates."""
+    async with httpx.AsyncClient(base_url=f'{fake_api.url}/bot1:token') as client:
+        assert (await client.post('/getMe')).json()['result']['username'] == 'fake_bot'
+        assert (await client.post('/deleteWebhook')).json() == {'ok': True, 'result': True}
+
+        fake_api.push_update('1:token', 42, '/help')
+        updates = (await client.post('/getUpdates', data={'offset': '0', 'timeout': '5'})).json()['result']
+        assert updates[0]['message']['text'] == '/help'
+        assert updates[0]['message']['entities'][0]['type'] == 'bot_command'
+        acknowledged = await client.post('/getUpdates', data={'offset': str(updates[0]['update_id'] + 1),
+                                                              'timeout': '0'})
+        assert acknowledged.json()['result'] == []
+
+        reply = fake_api.wait_for_message('1:token', 42)
+        response = await client.post('/sendMessage', data={'chat_id': '42', 'text': 'hi'})
+        assert response.json()['result']['chat']['id'] == 42
+        assert (await reply).text == 'hi'
+    assert fake_api.calls == {'getMe': 1, 'deleteWebhook': 1, 'getUpdates': 2, 'sendMessage': 1}
+
+@pytest.mark.asyncio
+async def test_fake_api_injects_errors(fake_api):
+    """Test that sends are rejected with 429 or 500 at the configured rates."""
+    fake_api.rate_limited, fake_api.failure_rate = 0.3, 0.3
+    async with httpx.AsyncClient(base_url=f'{fake_api.url}/bot1:token') as client:
+        responses = [await client.post('/sendMessage', data={'chat_id': '1', 'text': 'x'}) for _ in range(100)]
+    statuses = [response.status_code for response in responses]
+    assert statuses.count(429) == fake_api.rejected > 10
+    assert statuses.count(500) == fake_api.failed > 10
+    assert statuses.count(200) == len(fake_api.sent) > 10
+    rejected = next(response for response in responses if response.status_code == 429)
+    assert rejected.json()['parameters'] == {'retry_after': 1}
+
+@pytest.mark.asyncio
+async def test_run_benchmark(tmp_path):
+    """Test a small end-to-end run of real bots against the fake API."""
+    config = BenchmarkConfig(bots=2, subscribers=5, broadcasts=2, updates=4)
+
+    results = await run_benchmark(config)
+
+    assert results['broadcast']['messages'] == 2 * 5 * 2
+    assert results['broadcast']['failed'] == 0
+    assert results['updates']['handled'] == 4
+    assert results['startup']['seconds'] > 0
+    assert results['broadcast']['send_latency']['p99_ms'] >= results['broadcast']['send_latency']['p50_ms']
+
+    path = save_results(config, results, str(tmp_path), 'smoke')
+    document = json.load(open(path))
+    assert document['config']['bots'] == 2
+    assert document['results'] == results
+    assert any('broadcast msg/s' in line for line in compare(document, document))
+
+def test_percentile():
+    """Test nearest-rank percentiles."""
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([], 0.5) is None
+
+def test_memory_benchmark():
+    """Test that the memory benchmark measures each storage."""
+    results = run_memory_benchmark(MemoryBenchmarkConfig(subscribers=2000, lookups=100, chunk_size=100))
+
+    assert set(results) == {'dataclass_list', 'slotted_list', 'array_index'}
+    assert results['array_index']['mb'] < results['dataclass_list']['mb']
+    assert results['slotted_list']['mb'] < results['dataclass_list']['mb']
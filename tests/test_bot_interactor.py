@@ -5,6 +5,7 @@ from unittest.mock import MagicMock, patch, AsyncMock
 from telegram import Update
 from telegram.ext import Application, CallbackContext
 from buzzing.bots_manager.bot_interactor import BotInteractor
+from buzzing.bots_manager.circuit_breaker import CircuitBreaker
 from buzzing.model.bot_config import BotConfig
 from buzzing.model.subscription import Subscription
 from buzzing.bots.test_bot import TestBot
@@ -27,7 +28,8 @@ def bot_config():
 def dao():
     """Create a mock DAO."""
     mock_dao = MagicMock()
-    mock_dao.fetch_all_subscriptions.return_value = []
+    mock_dao.subscribe = AsyncMock()
+    mock_dao.unsubscribe = AsyncMock()
     return mock_dao
 
 @pytest.fixture
@@ -88,6 +90,7 @@ async def test_stop_command(bot_interactor, mock_update, mock_context):
     """Test the /stop command handler."""
     await bot_interactor.stop(mock_update, mock_context)
     
+    bot_interactor.bots_config_dao.unsubscribe.assert_awaited_once()
     mock_update.message.reply_html.assert_called_once()
     assert "sad to see you go" in mock_update.message.reply_html.call_args[0][0].lower()
 
@@ -153,6 +156,24 @@ async def test_fetch_method(bot_interactor):
     assert await_args is not None
     assert await_args.args == (123456789, test_data)
 
+@pytest.mark.asyncio
+async def test_fetch_sends_nothing_while_circuit_is_open(bot_interactor):
+    """Test that a scheduled fetch skips the broadcast instead of re-sending the last good value."""
+    bot_interactor.breaker = CircuitBreaker('test_bot', failure_threshold=1, reset_timeout=60)
+    bot_interactor.config.bot.fetch = AsyncMock(return_value="good")
+    bot_interactor.application.bot = AsyncMock()
+    bot_interactor.subscriptions = [Subscription(123456789, "test_user", bot_interactor.config.id, True)]
+    await bot_interactor.fetch()
+
+    bot_interactor.config.bot.fetch.side_effect = ConnectionError("upstream down")
+    with pytest.raises(ConnectionError):
+        await bot_interactor.fetch()
+    report = await bot_interactor.fetch()
+
+    assert report.skipped and report.total == 0
+    assert bot_interactor.config.bot.fetch.await_count == 2
+    assert bot_interactor.application.bot.send_message.await_count == 1
+
 @pytest.mark.asyncio
 async def test_stop_polling_error_handling(bot_interactor):
     """Test error handling in stop_polling method."""
@@ -182,3 +203,52 @@ async def test_cancel_command(bot_interactor, mock_update, mock_context):
     
     mock_update.message.reply_text.assert_called_once()
     assert "bye" in mock_update.message.reply_text.call_args[0][0].lower()
+
+@pytest.mark.asyncio
+async def test_stop_polling_wakes_initiate_immediately(bot_interactor):
+    """Test that stopping a running bot does not wait for a polling interval."""
+    bot_interactor.application = AsyncMock()
+    bot_interactor.application.add_handler = MagicMock()
+    task = asyncio.create_task(bot_interactor.initiate())
+    await bot_interactor.wait_ready()
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await bot_interactor.stop_polling()
+    await asyncio.wait_for(task, timeout=1.0)
+
+    assert loop.time() - started < 0.1
+    assert bot_interactor.broadcaster.closed
+
+@pytest.mark.asyncio
+async def test_concurrent_fetch_now_calls_upstream_once(bot_interactor, mock_update, mock_context):
+    """Test that simultaneous /fetchnow commands share one upstream fetch."""
+    async def fetch_now():
+        await asyncio.sleep(0.01)
+        return "shared data"
+
+    bot_interactor.config.bot.fetch_now = AsyncMock(side_effect=fetch_now)
+
+    await asyncio.gather(*[bot_interactor.fetch_now(mock_update, mock_context) for _ in range(5)])
+
+    assert bot_interactor.config.bot.fetch_now.await_count == 1
+    assert mock_update.message.reply_text.await_count == 5
+
+@pytest.mark.asyncio
+async def test_webhook_mode_registers_with_ingress(bot_config, dao):
+    """Test that a bot behind the ingress registers its webhook instead of polling."""
+    ingress = MagicMock()
+    ingress.register = AsyncMock()
+    bot_interactor = BotInteractor(bot_config, [], dao, ingress=ingress)
+    bot_interactor.application = AsyncMock()
+    bot_interactor.application.add_handler = MagicMock()
+
+    task = asyncio.create_task(bot_interactor.initiate())
+    await bot_interactor.wait_ready()
+    await bot_interactor.stop_polling()
+    await asyncio.wait_for(task, timeout=1.0)
+
+    ingress.register.assert_awaited_once_with(bot_config.name, bot_config.token, bot_interactor.application)
+    bot_interactor.application.updater.start_polling.assert_not_called()
+    bot_interactor.application.bot.delete_webhook.assert_not_called()
+    ingress.unregister.assert_called_with(bot_config.token)
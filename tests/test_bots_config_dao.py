@@ -4,6 +4,9 @@ import sqlite3
 from buzzing.dao.bots_config_dao import BotsConfigDao
 from buzzing.model.subscription import Subscription
 
+# Below every user ID, so the first page starts at the lowest one
+FIRST_PAGE = -2 ** 63
+
 @pytest.fixture
 def db_connection():
     """Create an in-memory SQLite database for testing."""
@@ -56,17 +59,26 @@ def test_fetch_all_bots_configs(dao):
     assert config.description == 'Test Bot'
     assert config.is_active is True
 
-def test_fetch_all_subscriptions(dao, db_connection):
-    """Test fetching all subscriptions."""
-    # Insert test subscription
+def test_fetch_audience_page(dao, db_connection):
+    """Test fetching the active subscribers of a bot page by page."""
+    # Insert test subscriptions
+    db_connection.executemany('''
+        INSERT INTO subscription (user_id, username, bot_id, is_active)
+        VALUES (?, ?, ?, ?)
+    ''', [(3, 'c', 1, 1), (1, 'a', 1, 1), (2, 'b', 1, 0), (4, 'd', 2, 1), (5, 'e', 1, 1)])
+
+    assert list(dao.fetch_audience_page(1, FIRST_PAGE, 2)) == [1, 3]
+    assert list(dao.fetch_audience_page(1, 3, 2)) == [5]
+    assert list(dao.fetch_audience_page(1, 5, 2)) == []
+
+def test_fetch_subscription(dao, db_connection):
+    """Test fetching one subscription with its username."""
     db_connection.execute('''
         INSERT INTO subscription (user_id, username, bot_id, is_active)
         VALUES (?, ?, ?, ?)
-    ''', (123456789, 'test_user', 1, 'True'))
-    
-    subscriptions = dao.fetch_all_subscriptions()
-    assert len(subscriptions) == 1
-    sub = subscriptions[0]
+    ''', (123456789, 'test_user', 1, 1))
+
+    sub = dao.fetch_subscription(1, 123456789)
     assert sub.user_id == 123456789
     assert sub.username == 'test_user'
     assert sub.is_active is True
@@ -81,9 +93,7 @@ def test_subscribe_new_user(dao):
     )
     dao.subscribe(subscription)
     
-    subscriptions = dao.fetch_all_subscriptions()
-    assert len(subscriptions) == 1
-    assert subscriptions[0].user_id == 987654321
+    assert list(dao.fetch_audience_page(1, FIRST_PAGE, 10)) == [987654321]
 
 def test_unsubscribe_user(dao, db_connection):
     """Test unsubscribing a user."""
@@ -91,7 +101,7 @@ def test_unsubscribe_user(dao, db_connection):
     db_connection.execute('''
         INSERT INTO subscription (user_id, username, bot_id, is_active)
         VALUES (?, ?, ?, ?)
-    ''', (123456789, 'test_user', 1, 'True'))
+    ''', (123456789, 'test_user', 1, 1))
     
     subscription = Subscription(
         user_id=123456789,
@@ -102,8 +112,7 @@ def test_unsubscribe_user(dao, db_connection):
     dao.unsubscribe(subscription)
     
     # Should not appear in active subscriptions
-    subscriptions = dao.fetch_all_subscriptions()
-    assert len(subscriptions) == 0
+    assert list(dao.fetch_audience_page(1, FIRST_PAGE, 10)) == []
 
 def test_sql_injection_prevention(dao):
     """Test that SQL injection is prevented."""
@@ -118,5 +127,4 @@ def test_sql_injection_prevention(dao):
     dao.subscribe(malicious_subscription)
     
     # Table should still exist and we should be able to query it
-    subscriptions = dao.fetch_all_subscriptions()
-    assert len(subscriptions) == 1
+    assert list(dao.fetch_audience_page(1, FIRST_PAGE, 10)) == [123456789]
@@ -6,7 +6,9 @@ import telegram
 from unittest.mock import MagicMock, patch, AsyncMock
 from buzzing.bots_manager.bots_interactor import BotsInteractor
 from buzzing.model.bot_config import BotConfig
+from buzzing.model.subscription import Subscription
 from buzzing.bots.test_bot import TestBot
+from buzzing.dao.migrator import migrate
 
 @pytest.fixture
 def db_connection():
@@ -182,6 +184,25 @@ async def test_stop_bots(bots_interactor):
             # We expect an exception from asyncio.sleep
             assert str(e) == 'Stop loop'
 
+@pytest.mark.asyncio
+async def test_stop_bots_shares_one_drain_deadline(db_connection):
+    """Test that draining sends and waiting for bot tasks together take at most drain_timeout."""
+    bots_interactor = BotsInteractor(db_connection, drain_timeout=0.3)
+    async def stop_polling(drain_timeout):
+        await asyncio.sleep(drain_timeout)
+
+    bot = MagicMock()
+    bot.stop_polling = stop_polling
+    bots_interactor.bot_interactors.append(bot)
+    stuck = asyncio.create_task(asyncio.Event().wait())
+    bots_interactor.tasks.append(stuck)
+
+    started = asyncio.get_running_loop().time()
+    await bots_interactor.stop_bots()
+
+    assert asyncio.get_running_loop().time() - started < 0.5
+    assert stuck.cancelled()
+
 @pytest.mark.asyncio
 async def test_register_bots_with_invalid_config(db_connection):
     """Test registering bots with invalid configuration."""
@@ -198,12 +219,254 @@ async def test_register_bots_with_invalid_config(db_connection):
     mock_builder.token.side_effect = telegram.error.InvalidToken('Invalid token')
     
     with patch('telegram.ext.Application.builder', return_value=mock_builder):
-        # Should raise InvalidToken during initialization
-        with pytest.raises(telegram.error.InvalidToken) as exc_info:
-            await bots_interactor.register_bots()
+        # A bot that cannot be created is reported instead of aborting startup
+        await bots_interactor.register_bots()
         
-        # Verify the error message
-        assert str(exc_info.value) == 'Invalid token'
+        # Verify the error is reported
+        assert bots_interactor.startup_report.failed == {'test_bot': 'Invalid token'}
         
         # No tasks should be registered due to error
         assert len(bots_interactor.tasks) == 0
+
+def make_mock_app(start_delay=0.0, fail=False):
+    """Create a mock application that takes start_delay seconds to start polling."""
+    mock_app = AsyncMock()
+    mock_app.__aenter__ = AsyncMock(return_value=mock_app)
+    mock_app.add_handler = MagicMock()
+    mock_app.running = False
+    mock_app.updater.running = False
+
+    async def start_polling():
+        await asyncio.sleep(start_delay)
+        if fail:
+            raise telegram.error.NetworkError('Network down')
+
+    mock_app.updater.start_polling = AsyncMock(side_effect=start_polling)
+    return mock_app
+
+@pytest.mark.asyncio
+async def test_register_bots_starts_bots_concurrently(db_connection):
+    """Test that startup time does not grow with the number of bots."""
+    for i in range(9):
+        db_connection.execute('''
+            INSERT INTO bots_config (name, description, token, password, entry_module, entry_class, metadata, is_active)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (f'bot_{i}', 'Bot', f'token_{i}', 'pass', 'buzzing.bots.test_bot', 'TestBot', '{}', 1))
+    bots_interactor = BotsInteractor(db_connection)
+
+    mock_builder = MagicMock()
+    mock_builder.token.return_value = mock_builder
+    mock_builder.build.side_effect = lambda: make_mock_app(start_delay=0.1)
+
+    with patch('telegram.ext.Application.builder', return_value=mock_builder):
+        await bots_interactor.register_bots()
+        report = bots_interactor.startup_report
+        await bots_interactor.stop_bots()
+
+    assert len(report.ready) == 10
+    assert report.elapsed < 0.5
+    assert all(seconds >= 0.1 for seconds in report.ready.values())
+
+@pytest.mark.asyncio
+async def test_register_bots_does_not_create_process_plugins(db_connection):
+    """Test that plugins running in process mode are not created in the parent by the warm-up."""
+    db_connection.execute('''
+        INSERT INTO bots_config (name, description, token, password, entry_module, entry_class, metadata, is_active)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', ('cpu_bot', 'Bot', 'cpu_token', 'pass', 'buzzing.bots.test_bot', 'TestBot',
+          '{"execution": {"mode": "process"}}', 1))
+    bots_interactor = BotsInteractor(db_connection)
+
+    mock_builder = MagicMock()
+    mock_builder.token.return_value = mock_builder
+    mock_builder.build.side_effect = lambda: make_mock_app()
+
+    with patch('telegram.ext.Application.builder', return_value=mock_builder):
+        await bots_interactor.register_bots()
+        await bots_interactor.stop_bots()
+
+    assert bots_interactor.bot_interactor(1).config.bot.loaded
+    assert not bots_interactor.bot_interactor(2).config.bot.loaded
+
+@pytest.mark.asyncio
+async def test_failing_bot_is_isolated_and_restarted(db_connection):
+    """Test that a failing bot does not stop the others and is retried."""
+    db_connection.execute('''
+        INSERT INTO bots_config (name, description, token, password, entry_module, entry_class, metadata, is_active)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', ('flaky_bot', 'Flaky Bot', 'flaky_token', 'pass', 'buzzing.bots.test_bot', 'TestBot', '{}', 1))
+    bots_interactor = BotsInteractor(db_connection, restart_delay=0.01)
+
+    attempts = {'flaky_token': 0}
+
+    def build_for(token):
+        builder = MagicMock()
+        def build():
+            if token == 'flaky_token':
+                attempts[token] += 1
+                return make_mock_app(fail=attempts[token] == 1)
+            return make_mock_app()
+        builder.build.side_effect = build
+        return builder
+
+    mock_builder = MagicMock()
+    mock_builder.token.side_effect = build_for
+
+    with patch('telegram.ext.Application.builder', return_value=mock_builder):
+        await bots_interactor.register_bots()
+        report = bots_interactor.startup_report
+        assert 'test_bot' in report.ready
+        assert report.failed == {'flaky_bot': 'Network down'}
+
+        # The flaky bot is restarted in the background
+        for _ in range(100):
+            flaky = bots_interactor.bot_interactor(2)
+            if flaky.ready.is_set():
+                break
+            await asyncio.sleep(0.01)
+        assert flaky.ready.is_set()
+        assert attempts['flaky_token'] == 2
+        await bots_interactor.stop_bots()
+
+@pytest.mark.asyncio
+async def test_new_subscriber_reaches_bot_without_restart(bots_interactor):
+    """Test that a subscription made through the DAO is seen by the running bot."""
+    config = bots_interactor.bots_config[0]
+    bot_interactor = bots_interactor.create_bot_interactor(config)
+
+    await bot_interactor.subscriptions.load(bots_interactor.async_bots_config_dao.stream_audience)
+    await bots_interactor.async_bots_config_dao.subscribe(Subscription(42, 'new_user', config.id, True))
+
+    assert 42 in bot_interactor.subscriptions
+    assert bot_interactor.subscriptions.user_ids() == [42]
+
+@pytest.mark.asyncio
+async def test_subscriptions_load_on_first_use(bots_interactor, db_connection):
+    """Test that startup reads no subscriptions and membership falls back to the database."""
+    config = bots_interactor.bots_config[0]
+    db_connection.execute("INSERT INTO subscription (user_id, username, bot_id, is_active) VALUES (5, 'user5', ?, 1)",
+                          (config.id,))
+    bot_interactor = bots_interactor.create_bot_interactor(config)
+
+    assert not bot_interactor.subscriptions.loaded
+    assert await bot_interactor.is_subscribed(5)
+    assert not await bot_interactor.is_subscribed(6)
+
+    await bot_interactor.subscriptions.load(bots_interactor.async_bots_config_dao.stream_audience)
+    assert bot_interactor.subscriptions.user_ids() == [5]
+
+def test_shards_partition_bots(db_connection):
+    """Test that worker shards together run every bot exactly once."""
+    for i in range(2, 11):
+        db_connection.execute('''
+            INSERT INTO bots_config (name, description, token, password, entry_module, entry_class, metadata, is_active)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (f'bot{i}', 'Test Bot', f'token{i}', 'pass', 'buzzing.bots.test_bot', 'TestBot', '{}', 1))
+
+    shards = [BotsInteractor(db_connection, shard=(index, 3)) for index in range(3)]
+
+    ids = [config.id for shard in shards for config in shard.bots_config]
+    assert sorted(ids) == list(range(1, 11))
+    assert all(shard.owns(config.id) for shard in shards for config in shard.bots_config)
+
+@pytest.fixture
+def migrated_db(tmp_path):
+    """Create a migrated database file with two bots, plus a second connection acting as another process."""
+    db_path = str(tmp_path / 'test.db')
+    conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+    migrate(conn)
+    conn.executemany('''
+        INSERT INTO bots_config (name, description, token, password, entry_module, entry_class, metadata, is_active)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(f'bot{i}', 'Bot', f'token{i}', 'pass', 'buzzing.bots.test_bot', 'TestBot', '{}', 1) for i in (1, 2)])
+    other = sqlite3.connect(db_path, isolation_level=None)
+    yield conn, other
+    other.close()
+    conn.close()
+
+@pytest.fixture
+async def reloading_interactor(migrated_db):
+    """Create a running BotsInteractor with hot reload enabled and mocked Applications."""
+    conn, _ = migrated_db
+    # Long interval: the tests trigger checks themselves
+    bots_interactor = BotsInteractor(conn, reload_interval=3600)
+    mock_builder = MagicMock()
+    mock_builder.token.return_value = mock_builder
+    mock_builder.build.side_effect = lambda: make_mock_app()
+    with patch('telegram.ext.Application.builder', return_value=mock_builder):
+        await bots_interactor.register_bots()
+        yield bots_interactor
+        await bots_interactor.stop_bots()
+
+@pytest.mark.asyncio
+async def test_reload_starts_added_bot(reloading_interactor, migrated_db):
+    """Test that a bot added by another process is started without touching the others."""
+    _, other = migrated_db
+    running = list(reloading_interactor.bot_interactors)
+    other.execute('''
+        INSERT INTO bots_config (name, description, token, password, entry_module, entry_class, metadata, is_active)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', ('bot3', 'Bot', 'token3', 'pass', 'buzzing.bots.test_bot', 'TestBot', '{}', 1))
+
+    await reloading_interactor.watcher.check()
+
+    assert [b.config.name for b in reloading_interactor.bot_interactors] == ['bot1', 'bot2', 'bot3']
+    assert reloading_interactor.bot_interactors[:2] == running
+    assert not any(b.stop_bot for b in running)
+
+@pytest.mark.asyncio
+async def test_reload_restarts_only_changed_bot(reloading_interactor, migrated_db):
+    """Test that changing one bot's row restarts that bot only."""
+    _, other = migrated_db
+    bot1, bot2 = reloading_interactor.bot_interactors
+    other.execute("UPDATE bots_config SET token = 'new_token' WHERE name = 'bot2'")
+
+    await reloading_interactor.watcher.check()
+
+    assert reloading_interactor.bot_interactor(1) is bot1
+    assert not bot1.stop_bot
+    assert bot2.stop_bot
+    assert reloading_interactor.bot_interactor(2).config.token == 'new_token'
+    assert len(reloading_interactor.tasks) == 3
+
+@pytest.mark.asyncio
+async def test_reload_stops_removed_bot(reloading_interactor, migrated_db):
+    """Test that a deactivated bot is stopped and the process keeps running."""
+    _, other = migrated_db
+    bot1, bot2 = reloading_interactor.bot_interactors
+    other.execute("UPDATE bots_config SET is_active = 0 WHERE name = 'bot1'")
+
+    await reloading_interactor.watcher.check()
+
+    assert bot1.stop_bot
+    assert reloading_interactor.bot_interactors == [bot2]
+    assert [config.name for config in reloading_interactor.bots_config] == ['bot2']
+    assert not any(task.done() for task in reloading_interactor.tasks)
+
+@pytest.mark.asyncio
+async def test_reload_applies_external_subscriptions(reloading_interactor, migrated_db):
+    """Test that subscriptions written by another process reach the running bot."""
+    _, other = migrated_db
+    bot1 = reloading_interactor.bot_interactor(1)
+    await bot1.subscriptions.load(reloading_interactor.async_bots_config_dao.stream_audience)
+    other.execute("INSERT INTO subscription (user_id, username, bot_id, is_active) VALUES (7, 'user7', 1, 1)")
+
+    await reloading_interactor.watcher.check()
+
+    assert 7 in bot1.subscriptions
+    assert not bot1.stop_bot
+
+@pytest.mark.asyncio
+async def test_reload_only_streams_changed_bots(reloading_interactor, migrated_db):
+    """Test that a subscription written for one bot does not reload the other bots' indexes."""
+    _, other = migrated_db
+    bot1, bot2 = reloading_interactor.bot_interactors
+    for bot in (bot1, bot2):
+        await bot.subscriptions.load(reloading_interactor.async_bots_config_dao.stream_audience)
+    other.execute("INSERT INTO subscription (user_id, username, bot_id, is_active) VALUES (7, 'user7', 2, 1)")
+
+    with patch.object(bot1.subscriptions, 'reload', AsyncMock()) as reload:
+        await reloading_interactor.watcher.check()
+
+    reload.assert_not_called()
+    assert 7 in bot2.subscriptions
@@ -0,0 +1,180 @@
+"""Tests for Broadcaster and the rate limiters it uses."""
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock
+from telegram.error import BadRequest, RetryAfter, Forbidden
+from buzzing.bots_manager.broadcaster import BroadcastAborted, Broadcaster, is_dead_chat
+from buzzing.util.rate_limiter import KeyedRateLimiter, TokenBucket
+
+@pytest.mark.asyncio
+async def test_broadcast_sends_to_every_subscriber():
+    """Test that every recipient receives the message exactly once."""
+    send = AsyncMock()
+    broadcaster = Broadcaster(1, send, concurrency=8, global_rate=10000)
+
+    report = await broadcaster.broadcast(range(100), "hello")
+
+    assert report.total == 100
+    assert report.sent == 100
+    assert report.failed == 0
+    assert sorted(call.args[0] for call in send.await_args_list) == list(range(100))
+
+@pytest.mark.asyncio
+async def test_broadcast_runs_sends_concurrently():
+    """Test that sends overlap instead of running one after another."""
+    in_flight = 0
+    peak = 0
+
+    async def send(chat_id, data):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+    broadcaster = Broadcaster(1, send, concurrency=4, global_rate=10000)
+    await broadcaster.broadcast(range(20), "hello")
+
+    assert peak == 4
+
+@pytest.mark.asyncio
+async def test_broadcast_counts_failures():
+    """Test that a failing recipient does not stop the broadcast."""
+    async def send(chat_id, data):
+        if chat_id == 3:
+            raise Forbidden("blocked")
+
+    broadcaster = Broadcaster(1, send, global_rate=10000)
+    report = await broadcaster.broadcast(range(5), "hello")
+
+    assert report.sent == 4
+    assert report.failed == 1
+
+def test_is_dead_chat():
+    """Test that only errors about the chat itself are permanent."""
+    assert is_dead_chat(Forbidden("Forbidden: bot was blocked by the user"))
+    assert is_dead_chat(BadRequest("Chat not found"))
+    assert not is_dead_chat(BadRequest("Message is too long"))
+    assert not is_dead_chat(RetryAfter(1))
+
+@pytest.mark.asyncio
+async def test_broadcast_prunes_dead_chats_in_one_call():
+    """Test that blocked and missing chats are deactivated together after the broadcast."""
+    async def send(chat_id, data):
+        if chat_id == 1:
+            raise Forbidden("bot was blocked by the user")
+        if chat_id == 2:
+            raise BadRequest("Chat not found")
+        if chat_id == 3:
+            raise BadRequest("Message is too long")
+
+    deactivate = AsyncMock(side_effect=lambda chat_ids: len(chat_ids))
+    broadcaster = Broadcaster(1, send, global_rate=10000, deactivate=deactivate)
+    report = await broadcaster.broadcast(range(5), "hello")
+
+    assert report.failed == 3
+    assert report.pruned == 2
+    deactivate.assert_awaited_once()
+    assert sorted(deactivate.await_args.args[0]) == [1, 2]
+
+@pytest.mark.asyncio
+async def test_failed_prune_does_not_fail_broadcast():
+    """Test that a failing deactivation is logged and leaves the report intact."""
+    send = AsyncMock(side_effect=Forbidden("bot was blocked by the user"))
+    broadcaster = Broadcaster(1, send, global_rate=10000, deactivate=AsyncMock(side_effect=RuntimeError("locked")))
+
+    report = await broadcaster.broadcast([1], "hello")
+
+    assert report.failed == 1
+    assert report.pruned == 0
+
+@pytest.mark.asyncio
+async def test_broadcast_retries_after_rate_limit():
+    """Test that RetryAfter pauses the bucket and retries the send."""
+    send = AsyncMock(side_effect=[RetryAfter(0.01), None])
+    broadcaster = Broadcaster(1, send, global_rate=10000)
+
+    report = await broadcaster.broadcast([42], "hello")
+
+    assert report.sent == 1
+    assert send.await_count == 2
+
+@pytest.mark.asyncio
+async def test_call_waits_for_rate_limit_pause():
+    """Test that a call after a RetryAfter waits for the bucket's pause like a send."""
+    broadcaster = Broadcaster(1, AsyncMock(), global_rate=10000)
+    broadcaster.global_bucket.pause(0.05)
+    started = time.monotonic()
+
+    assert await broadcaster.call(AsyncMock(return_value='reply')) == 'reply'
+    assert time.monotonic() - started >= 0.04
+
+def test_from_metadata():
+    """Test that broadcast settings are read from bot metadata."""
+    broadcaster = Broadcaster.from_metadata(1, AsyncMock(), {"broadcast": {"concurrency": 3, "global_rate": 5}})
+    assert broadcaster.concurrency == 3
+    assert broadcaster.global_bucket.rate == 5
+
+    deactivate = AsyncMock()
+    assert Broadcaster.from_metadata(1, AsyncMock(), {}, deactivate=deactivate).deactivate is deactivate
+    assert Broadcaster.from_metadata(1, AsyncMock(), {"broadcast": {"prune": False}},
+                                     deactivate=deactivate).deactivate is None
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate():
+    """Test that the bucket throttles once the burst is used up."""
+    bucket = TokenBucket(rate=100, capacity=1)
+    started = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+    assert time.monotonic() - started >= 0.04
+
+@pytest.mark.asyncio
+async def test_token_bucket_consume_borrows_tokens():
+    """Test that consumed tokens are taken at once and repaid by later acquirers."""
+    bucket = TokenBucket(rate=100, capacity=1)
+    for _ in range(5):
+        bucket.consume()
+    started = time.monotonic()
+    await bucket.acquire()
+    assert time.monotonic() - started >= 0.04
+
+@pytest.mark.asyncio
+async def test_keyed_rate_limiter_is_per_key():
+    """Test that different keys do not throttle each other."""
+    limiter = KeyedRateLimiter(rate=1)
+    started = time.monotonic()
+    for key in range(50):
+        await limiter.acquire(key)
+    assert time.monotonic() - started < 0.5
+
+@pytest.mark.asyncio
+async def test_close_drains_in_flight_sends():
+    """Test that closing lets in-flight sends finish and skips the rest."""
+    delivered = []
+
+    async def send(chat_id, data):
+        await asyncio.sleep(0.05)
+        delivered.append(chat_id)
+
+    broadcaster = Broadcaster(1, send, concurrency=2, global_rate=10000)
+    broadcast = asyncio.create_task(broadcaster.broadcast(range(100), "hello"))
+    await asyncio.sleep(0.01)
+
+    assert await broadcaster.close(timeout=1.0)
+    report = await broadcast
+
+    assert report.aborted
+    assert sorted(delivered) == [0, 1]
+    assert report.sent == 2
+
+@pytest.mark.asyncio
+async def test_send_batch_marks_unsent_messages_aborted():
+    """Test that messages skipped by a close are reported as aborted."""
+    broadcaster = Broadcaster(1, AsyncMock(), global_rate=10000)
+    await broadcaster.close(timeout=0.1)
+
+    results = await broadcaster.send_batch([(1, "a"), (2, "b")])
+
+    assert all(isinstance(r, BroadcastAborted) for r in results)
@@ -0,0 +1,125 @@
+"""Tests for CircuitBreaker."""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from buzzing.bots_manager.circuit_breaker import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker,
+                                                  CircuitOpenError)
+from buzzing.cache.fetch_cache import FetchCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    """Create a manually advanced clock."""
+    return FakeClock()
+
+@pytest.fixture
+def breaker(clock):
+    """Create a breaker opening after three failures for ten seconds."""
+    return CircuitBreaker('bot', failure_threshold=3, reset_timeout=10, max_reset_timeout=40, clock=clock)
+
+async def fail():
+    raise ConnectionError('upstream down')
+
+async def succeed():
+    return 'data'
+
+async def trip(breaker):
+    """Make the breaker open."""
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(ConnectionError):
+            await breaker.call(fail)
+
+@pytest.mark.asyncio
+async def test_opens_after_threshold_and_fails_fast(breaker):
+    """Test that repeated failures open the breaker and stop calling the upstream."""
+    await trip(breaker)
+    upstream = AsyncMock()
+
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(upstream)
+
+    upstream.assert_not_called()
+    stats = breaker.stats()
+    assert stats.state == OPEN
+    assert stats.opened == 1
+    assert stats.rejected == 1
+    assert stats.retry_in == 10
+
+@pytest.mark.asyncio
+async def test_success_resets_failure_count(breaker):
+    """Test that failures must be consecutive to open the breaker."""
+    for _ in range(5):
+        with pytest.raises(ConnectionError):
+            await breaker.call(fail)
+        await breaker.call(succeed)
+
+    assert breaker.state == CLOSED
+
+@pytest.mark.asyncio
+async def test_half_open_probe_closes_breaker(breaker, clock):
+    """Test that a successful probe after the reset timeout closes the breaker."""
+    await trip(breaker)
+    clock.now = 10
+
+    assert await breaker.call(succeed) == 'data'
+    assert breaker.state == CLOSED
+
+@pytest.mark.asyncio
+async def test_failed_probe_doubles_open_period(breaker, clock):
+    """Test exponential backoff between probes, capped at max_reset_timeout."""
+    await trip(breaker)
+    for retry_in in (20, 40, 40):
+        clock.now += breaker.stats().retry_in
+        with pytest.raises(ConnectionError):
+            await breaker.call(fail)
+        assert breaker.stats().retry_in == retry_in
+
+@pytest.mark.asyncio
+async def test_only_one_probe_at_a_time(breaker, clock):
+    """Test that calls during a probe fail fast instead of piling onto the upstream."""
+    await trip(breaker)
+    clock.now = 10
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+        return 'data'
+
+    probe = asyncio.create_task(breaker.call(slow))
+    await asyncio.sleep(0)
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(succeed)
+    release.set()
+    assert await probe == 'data'
+
+@pytest.mark.asyncio
+async def test_fetch_cache_serves_last_good_value_while_open(breaker):
+    """Test that an open breaker is answered with the last good value."""
+    upstream = AsyncMock(return_value='good')
+    cache = FetchCache('bot.fetch_now', lambda: breaker.call(upstream), fallback_on=(CircuitOpenError,))
+    assert await cache.get() == 'good'
+
+    upstream.side_effect = ConnectionError('upstream down')
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            await cache.get()
+
+    assert await cache.get() == 'good'
+    assert upstream.await_count == 4
+    assert cache.stats().fallbacks == 1
+
+def test_from_metadata():
+    """Test that breaker settings are read from the bot metadata."""
+    breaker = CircuitBreaker.from_metadata('bot', {'circuit_breaker': {'failure_threshold': 2, 'reset_timeout': 5}})
+
+    assert breaker.failure_threshold == 2
+    assert breaker.reset_timeout == 5
+    with pytest.raises(ValueError):
+        CircuitBreaker.from_metadata('bot', {'circuit_breaker': {'failure_threshold': 0}})
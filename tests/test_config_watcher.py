@@ -0,0 +1,157 @@
+"""Tests for ConfigWatcher."""
+import asyncio
+import sqlite3
+import time
+import pytest
+from unittest.mock import AsyncMock
+from buzzing.bots_manager.config_watcher import ConfigWatcher
+from buzzing.dao.async_sqlite import AsyncSQLite
+from buzzing.dao.bots_config_dao import BotsConfigDao
+from buzzing.dao.migrator import migrate
+
+ORIGIN = 'this-process'
+
+@pytest.fixture
+def connections(tmp_path):
+    """Create a migrated database file with a connection for the watcher and one for another process."""
+    db_path = str(tmp_path / 'test.db')
+    watched = sqlite3.connect(db_path, isolation_level=None)
+    migrate(watched)
+    other = sqlite3.connect(db_path, isolation_level=None)
+    yield watched, other
+    other.close()
+    watched.close()
+
+@pytest.fixture
+async def database(connections, tmp_path):
+    """Create the database access through which this process writes, counting its own changes."""
+    database = AsyncSQLite(str(tmp_path / 'test.db'),
+                           setup=lambda connection: BotsConfigDao(connection).track_own_changes(ORIGIN))
+    yield database
+    database.close()
+
+@pytest.fixture
+async def watcher(connections, database):
+    """Create a watcher with mocked callbacks."""
+    watched, _ = connections
+    watcher = ConfigWatcher(watched, AsyncMock(), AsyncMock(), database, ORIGIN)
+    await watcher.snapshot()
+    return watcher
+
+def subscribe(user_id, bot_id=1):
+    """Return a write operation inserting one subscription."""
+    def operation(connection):
+        connection.execute("INSERT INTO subscription (user_id, username, bot_id, is_active) VALUES (?, 'u', ?, 1)",
+                           (user_id, bot_id))
+    return operation
+
+@pytest.mark.asyncio
+async def test_no_callbacks_without_changes(watcher):
+    """Test that nothing is reloaded while the database is unchanged."""
+    await watcher.check()
+
+    watcher.on_bots_changed.assert_not_called()
+    watcher.on_subscriptions_changed.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_bots_config_change_detected(watcher, connections):
+    """Test that a change to bots_config triggers a bot reload only."""
+    _, other = connections
+    other.execute("INSERT INTO bots_config (name, is_active) VALUES ('bot', 1)")
+
+    await watcher.check()
+
+    watcher.on_bots_changed.assert_awaited_once()
+    watcher.on_subscriptions_changed.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_own_subscription_changes_ignored(watcher, database):
+    """Test that subscription changes this process made do not trigger a reload."""
+    await database.write(subscribe(1))
+
+    await watcher.check()
+
+    watcher.on_subscriptions_changed.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_own_change_checked_before_its_writer_resumes(watcher, database, connections):
+    """Test that an own write is not mistaken for a foreign one between its commit and its caller resuming."""
+    watched, _ = connections
+    data_version = watched.execute('PRAGMA data_version').fetchone()[0]
+    committed = database.writer.submit(subscribe(1))
+    while watched.execute('PRAGMA data_version').fetchone()[0] == data_version:
+        time.sleep(0.001)
+
+    await watcher.check()
+    await committed
+
+    watcher.on_subscriptions_changed.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_external_subscription_changes_detected(watcher, database, connections):
+    """Test that subscription changes made elsewhere trigger a subscription reload."""
+    _, other = connections
+    other.execute("INSERT INTO subscription (user_id, username, bot_id, is_active) VALUES (1, 'u', 1, 1)")
+    await database.write(subscribe(2))
+
+    await watcher.check()
+
+    watcher.on_subscriptions_changed.assert_awaited_once_with({1})
+    watcher.on_bots_changed.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_only_changed_bots_reported(watcher, database, connections):
+    """Test that only the bots whose subscriptions others changed are reported."""
+    _, other = connections
+    other.execute("INSERT INTO subscription (user_id, username, bot_id, is_active) VALUES (1, 'u', 2, 1)")
+    other.execute("UPDATE subscription SET is_active = 0 WHERE bot_id = 2")
+    await database.write(subscribe(1, bot_id=1))
+    await database.write(subscribe(1, bot_id=3))
+
+    await watcher.check()
+
+    watcher.on_subscriptions_changed.assert_awaited_once_with({2})
+
+@pytest.mark.asyncio
+async def test_check_does_not_take_the_write_lock(watcher, connections):
+    """Test that the counters are read while another connection holds the write lock."""
+    _, other = connections
+    other.execute("INSERT INTO subscription (user_id, username, bot_id, is_active) VALUES (1, 'u', 1, 1)")
+    other.execute('BEGIN IMMEDIATE')
+    try:
+        await asyncio.wait_for(watcher.check(), timeout=1)
+    finally:
+        other.execute('ROLLBACK')
+
+    watcher.on_subscriptions_changed.assert_awaited_once_with({1})
+
+@pytest.mark.asyncio
+async def test_rolled_back_own_write_not_counted(watcher, database, connections):
+    """Test that a failed own write leaves the counters in step with the data."""
+    _, other = connections
+
+    def failing(connection):
+        subscribe(1)(connection)
+        raise ValueError('rolled back')
+
+    with pytest.raises(ValueError):
+        await database.write(failing)
+    other.execute("INSERT INTO subscription (user_id, username, bot_id, is_active) VALUES (2, 'u', 1, 1)")
+
+    await watcher.check()
+
+    watcher.on_subscriptions_changed.assert_awaited_once_with({1})
+
+def test_own_changes_counted_per_bot_until_forgotten(connections):
+    """Test that own changes are counted per bot and left to others once forgotten."""
+    watched, _ = connections
+    dao = BotsConfigDao(watched)
+    dao.track_own_changes(ORIGIN)
+    subscribe(1, bot_id=1)(watched)
+    subscribe(1, bot_id=2)(watched)
+    watched.execute('UPDATE subscription SET is_active = 0 WHERE bot_id = 2')
+
+    assert dao.fetch_foreign_subscription_versions(ORIGIN) == {1: 0, 2: 0}
+    assert dao.fetch_foreign_subscription_versions() == {1: 1, 2: 2}
+    dao.forget_own_changes(ORIGIN)
+    assert dao.fetch_foreign_subscription_versions(ORIGIN) == {1: 1, 2: 2}
@@ -0,0 +1,89 @@
+"""Tests for DeltaFilter."""
+import sqlite3
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from buzzing.bots.test_bot import TestBot
+from buzzing.bots_manager.bot_interactor import BotInteractor
+from buzzing.bots_manager.delta_filter import SKIPPED, DeltaFilter, content_hash
+from buzzing.dao.async_sqlite import AsyncSQLite
+from buzzing.dao.migrator import migrate
+from buzzing.model.bot_config import BotConfig
+from buzzing.model.subscription import Subscription
+
+class FakeClock:
+    """Manually advanced wall clock."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def database():
+    """Create async access to a migrated in-memory database."""
+    connection = sqlite3.connect(':memory:')
+    migrate(connection)
+    yield AsyncSQLite.from_connection(connection)
+    connection.close()
+
+def test_content_hash():
+    """Test that equal payloads hash equally, whatever their key order."""
+    assert content_hash('a') == content_hash(b'a')
+    assert content_hash({'x': 1, 'y': 2}) == content_hash({'y': 2, 'x': 1})
+    assert content_hash('a') != content_hash('b')
+
+def test_from_metadata(database):
+    """Test that delta mode is opt-in and validates its settings."""
+    assert DeltaFilter.from_metadata(1, database, {}) is None
+    assert DeltaFilter.from_metadata(1, database, {'delta': True}).min_resend_interval is None
+    assert DeltaFilter.from_metadata(
+        1, database, {'delta': {'min_resend_interval': 3600}}).min_resend_interval == 3600.0
+    with pytest.raises(ValueError):
+        DeltaFilter.from_metadata(1, database, {'delta': {'min_resend_interval': -1}})
+
+@pytest.mark.asyncio
+async def test_skips_unchanged_content_across_restarts(database):
+    """Test that unchanged content is skipped, also by a filter created after a restart."""
+    delta = DeltaFilter(1, database, name='delta_bot')
+    assert await delta.changed('v1')
+    await delta.record('v1')
+    assert not await delta.changed('v1')
+    assert await delta.changed('v2')
+
+    restarted = DeltaFilter(1, database, name='delta_bot')
+    assert not await restarted.changed('v1')
+    assert await DeltaFilter(2, database).changed('v1')
+    assert delta.skipped == restarted.skipped == 1
+    assert SKIPPED.labels('delta_bot').value >= 2
+
+@pytest.mark.asyncio
+async def test_min_resend_interval(database):
+    """Test that unchanged content is sent again once the resend interval has passed."""
+    clock = FakeClock()
+    delta = DeltaFilter(1, database, min_resend_interval=60, clock=clock)
+    await delta.record('v1')
+
+    clock.now += 59
+    assert not await delta.changed('v1')
+    clock.now += 1
+    assert await delta.changed('v1')
+
+@pytest.mark.asyncio
+async def test_fetch_skips_unchanged_broadcast(database):
+    """Test that a delta-mode bot fans out only when its content changes."""
+    config = BotConfig(1, 'delta_bot', 'Delta bot', 'token', 'password', TestBot(), {'delta': True}, True)
+    dao = MagicMock()
+    dao.database = database
+    bot_interactor = BotInteractor(config, [Subscription(7, 'u', 1, True)], dao)
+    bot_interactor.application.bot = AsyncMock()
+
+    first = await bot_interactor.fetch()
+    second = await bot_interactor.fetch()
+    config.bot.fetch = AsyncMock(return_value='news')
+    third = await bot_interactor.fetch()
+
+    assert (first.sent, first.skipped) == (1, False)
+    assert (second.sent, second.skipped) == (0, True)
+    assert (third.sent, third.skipped) == (1, False)
+    assert bot_interactor.application.bot.send_message.await_count == 2
@@ -4,8 +4,12 @@ import pytest
 import logging
 import asyncio
 import sqlite3
+from logging.handlers import QueueHandler, RotatingFileHandler
 from unittest.mock import MagicMock, AsyncMock, patch
-from buzzing.driver import main, setup_logger
+from buzzing.driver import Supervisor, main, setup_logger
+from buzzing.dao.migrator import migrate
+from buzzing.util.hash_ring import shard_for
+from buzzing.util.log_setup import stop_logging
 from buzzing.bots_manager.bots_interactor import BotsInteractor
 
 @pytest.fixture
@@ -85,7 +89,7 @@ async def test_main_task_error(mock_bots_interactor, tmp_path):
         assert "Task failed" in str(exc_info.value)
 
 def test_setup_logger(tmp_path):
-    """Test logger setup."""
+    """Test that logging goes through a queue to a listener writing console and rotated file."""
     # Change to temporary directory
     os.chdir(tmp_path)
     
@@ -95,16 +99,133 @@ def test_setup_logger(tmp_path):
         root_logger.removeHandler(handler)
     
     # Set up logger
-    setup_logger()
+    listener = setup_logger()
     
-    # Verify logger configuration
+    # Verify logger configuration: only the queue handler is on the root logger
     assert root_logger.level == logging.INFO
-    assert len(root_logger.handlers) == 2  # Console and file handler
+    assert len(root_logger.handlers) == 1
+    assert isinstance(root_logger.handlers[0], QueueHandler)
     
-    # Verify log file was created
-    assert os.path.exists("buzzing.log")
-    
-    # Verify handler types
-    handlers = root_logger.handlers
+    # Verify handler types of the listener thread
+    handlers = listener.handlers
     assert any(isinstance(h, logging.StreamHandler) and not isinstance(h, logging.FileHandler) for h in handlers)
-    assert any(isinstance(h, logging.FileHandler) for h in handlers)
+    assert any(isinstance(h, RotatingFileHandler) for h in handlers)
+
+    # Verify records reach the log file once the queue is flushed
+    logging.getLogger('buzzing.test').info('hello %s', 'file')
+    stop_logging()
+    assert not root_logger.handlers
+    assert 'buzzing.test: hello file' in open('buzzing.log').read()
+
+class FakeProcess:
+    """Stand-in for a worker process."""
+
+    def __init__(self, index):
+        self.index = index
+        self.pid = 1000 + index
+        self.alive = False
+        self.exitcode = None
+        self.terminated = False
+
+    def start(self):
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+    def terminate(self):
+        self.terminated = True
+        self.alive = False
+        self.exitcode = 0
+
+    def kill(self):
+        self.alive = False
+
+    def join(self, timeout=None):
+        pass
+
+@pytest.fixture
+def supervisor():
+    """Create a Supervisor over fake worker processes."""
+    spawned = []
+
+    def spawn(index, workers):
+        process = FakeProcess(index)
+        spawned.append(process)
+        return process
+
+    supervisor = Supervisor(':memory:', 3, spawn=spawn, restart_delay=0.0)
+    supervisor.spawned = spawned
+    return supervisor
+
+@pytest.mark.asyncio
+async def test_supervisor_starts_one_worker_per_shard(supervisor):
+    """Test that every shard owning bots gets its own worker."""
+    shards = supervisor.assign(range(1, 31))
+    await supervisor.rebalance(shards)
+
+    assert set(supervisor.processes) == set(shards)
+    assert sorted(bot for ids in shards.values() for bot in ids) == list(range(1, 31))
+
+@pytest.mark.asyncio
+async def test_supervisor_rebalance_restarts_only_changed_shard(supervisor):
+    """Test that adding a bot only restarts the worker owning it."""
+    await supervisor.rebalance(supervisor.assign(range(1, 31)))
+    before = dict(supervisor.processes)
+
+    await supervisor.rebalance(supervisor.assign(range(1, 32)))
+
+    owner = shard_for(31, 3)
+    assert before[owner].terminated
+    assert supervisor.processes[owner] is not before[owner]
+    for index, process in before.items():
+        if index != owner:
+            assert not process.terminated
+            assert supervisor.processes[index] is process
+
+@pytest.mark.asyncio
+async def test_supervisor_restarts_crashed_worker(supervisor):
+    """Test that a worker that exits unexpectedly is started again."""
+    await supervisor.rebalance(supervisor.assign(range(1, 31)))
+    crashed = supervisor.processes[0]
+    crashed.alive = False
+    crashed.exitcode = 1
+
+    supervisor.check_workers()
+
+    assert supervisor.processes[0] is not crashed
+    assert supervisor.processes[0].is_alive()
+    assert supervisor.failures[0] == 1
+
+@pytest.mark.asyncio
+async def test_supervisor_stops_workers_on_signal(supervisor, tmp_path):
+    """Test that stopping the supervisor terminates every worker."""
+    db_path = str(tmp_path / "test.db")
+    connection = sqlite3.connect(db_path, isolation_level=None)
+    migrate(connection)
+    connection.executemany('INSERT INTO bots_config (name, is_active) VALUES (?, 1)', [(f'bot{i}',) for i in range(10)])
+    connection.close()
+    supervisor.db_file_path = db_path
+    supervisor.poll_interval = 0.01
+
+    task = asyncio.create_task(supervisor.run())
+    await asyncio.sleep(0.05)
+    assert supervisor.processes
+    supervisor.stopping.set()
+    await asyncio.wait_for(task, timeout=1.0)
+
+    assert supervisor.spawned and all(p.terminated for p in supervisor.spawned)
+    assert not supervisor.processes
+
+@pytest.mark.asyncio
+async def test_supervisor_keeps_reloading_workers_running(supervisor):
+    """Test that workers which hot-reload are not restarted when their shard changes."""
+    supervisor.workers_reload = True
+    await supervisor.rebalance(supervisor.assign(range(1, 31)))
+    before = dict(supervisor.processes)
+
+    await supervisor.rebalance(supervisor.assign(range(1, 32)))
+
+    assert supervisor.processes == before
+    assert not any(process.terminated for process in before.values())
+    assert 31 in supervisor.shards[shard_for(31, 3)]
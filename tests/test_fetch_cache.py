@@ -0,0 +1,99 @@
+"""Tests for FetchCache."""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from buzzing.cache.fetch_cache import FetchCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    """Create a manually advanced clock."""
+    return FakeClock()
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_fetch():
+    """Test that concurrent callers are coalesced onto one upstream call."""
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 'data'
+
+    cache = FetchCache('bot.fetch_now', fetch)
+    results = await asyncio.gather(*[cache.get() for _ in range(50)])
+
+    assert results == ['data'] * 50
+    assert calls == 1
+    stats = cache.stats()
+    assert stats.misses == 1
+    assert stats.coalesced == 49
+
+@pytest.mark.asyncio
+async def test_fresh_value_is_served_from_cache(clock):
+    """Test that values younger than the TTL do not hit upstream."""
+    fetch = AsyncMock(side_effect=['first', 'second'])
+    cache = FetchCache('bot.fetch_now', fetch, ttl=10, clock=clock)
+
+    assert await cache.get() == 'first'
+    clock.now = 5
+    assert await cache.get() == 'first'
+    clock.now = 11
+    assert await cache.get() == 'second'
+    assert cache.stats().hits == 1
+
+@pytest.mark.asyncio
+async def test_stale_value_is_served_while_revalidating(clock):
+    """Test that a stale value is returned instantly and refreshed in the background."""
+    fetch = AsyncMock(side_effect=['first', 'second'])
+    cache = FetchCache('bot.fetch_now', fetch, ttl=10, stale_ttl=60, clock=clock)
+    await cache.get()
+
+    clock.now = 20
+    assert await cache.get() == 'first'
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert await cache.get() == 'second'
+    assert fetch.await_count == 2
+    assert cache.stats().stale_hits == 1
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached(clock):
+    """Test that a failed fetch is raised to its callers and retried next time."""
+    fetch = AsyncMock(side_effect=[RuntimeError('down'), 'data'])
+    cache = FetchCache('bot.fetch_now', fetch, ttl=10, clock=clock)
+
+    with pytest.raises(RuntimeError):
+        await cache.get()
+    assert await cache.get() == 'data'
+    assert cache.stats().errors == 1
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_last_good_value(clock):
+    """Test that a failing background refresh keeps serving the stale value."""
+    fetch = AsyncMock(side_effect=['first', RuntimeError('down')])
+    cache = FetchCache('bot.fetch_now', fetch, ttl=10, stale_ttl=60, clock=clock)
+    await cache.get()
+
+    clock.now = 20
+    assert await cache.get() == 'first'
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert await cache.get() == 'first'
+
+def test_from_metadata():
+    """Test that TTLs are read from bot metadata."""
+    metadata = {'fetch_cache': {'fetch_now': {'ttl': 30, 'stale_ttl': 300}}}
+    cache = FetchCache.from_metadata('bot.fetch_now', AsyncMock(), metadata, 'fetch_now')
+    assert cache.ttl == 30
+    assert cache.stale_ttl == 300
+    assert FetchCache.from_metadata('bot.fetch', AsyncMock(), metadata, 'fetch').ttl == 0
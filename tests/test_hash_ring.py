@@ -0,0 +1,44 @@
+"""Tests for HashRing."""
+from collections import Counter
+import pytest
+from buzzing.util.hash_ring import HashRing, shard_for
+
+def test_keys_spread_evenly():
+    """Test that every node gets a similar share of the keys."""
+    ring = HashRing(range(4))
+    counts = Counter(ring.node_for(key) for key in range(10000))
+
+    assert set(counts) == {0, 1, 2, 3}
+    assert max(counts.values()) < 1.3 * min(counts.values())
+
+def test_adding_a_node_moves_few_keys():
+    """Test that a new node only takes keys, roughly its fair share."""
+    ring = HashRing(range(4))
+    before = {key: ring.node_for(key) for key in range(10000)}
+    ring.add(4)
+    after = {key: ring.node_for(key) for key in range(10000)}
+
+    moved = [key for key in before if before[key] != after[key]]
+    assert all(after[key] == 4 for key in moved)
+    assert len(moved) < 10000 * 0.3
+
+def test_removing_a_node_only_moves_its_keys():
+    """Test that keys of the remaining nodes stay where they are."""
+    ring = HashRing(range(4))
+    before = {key: ring.node_for(key) for key in range(1000)}
+    ring.remove(2)
+
+    for key, node in before.items():
+        if node != 2:
+            assert ring.node_for(key) == node
+    assert len(ring) == 3
+
+def test_empty_ring_raises():
+    """Test that looking up a key on an empty ring fails clearly."""
+    with pytest.raises(LookupError):
+        HashRing().node_for(1)
+
+def test_shard_for_is_stable():
+    """Test that shard assignment is deterministic and in range."""
+    assert all(0 <= shard_for(bot_id, 3) < 3 for bot_id in range(100))
+    assert [shard_for(bot_id, 3) for bot_id in range(100)] == [shard_for(bot_id, 3) for bot_id in range(100)]
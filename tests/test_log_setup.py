@@ -0,0 +1,112 @@
+"""Tests for the queue-based logging pipeline."""
+import json
+import logging
+from logging.handlers import TimedRotatingFileHandler
+import pytest
+from buzzing.util.log_setup import (ContextAdapter, JsonFormatter, SamplingFilter, parse_sampling,
+                                    setup_logging, stop_logging)
+
+@pytest.fixture
+def pipeline(tmp_path):
+    """Yield a factory for pipelines writing to a file; restores the root logger afterwards."""
+    root_logger = logging.getLogger()
+    saved = root_logger.handlers[:], root_logger.level
+    root_logger.handlers.clear()
+    path = tmp_path / 'test.log'
+
+    def create(**kwargs):
+        return setup_logging(str(path), console=False, **kwargs)
+
+    yield create, path
+    stop_logging()
+    root_logger.handlers[:], root_logger.level = saved
+
+def test_json_format_with_context(pipeline):
+    """Test that JSON lines carry the bot fields of the adapter and the user of the call."""
+    create, path = pipeline
+    create(json_format=True)
+    log = ContextAdapter(logging.getLogger('buzzing.test.json'), {'bot_id': 3, 'bot_name': 'news'})
+
+    log.info('Hello %s', 'there', extra={'user_id': 42})
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        log.exception('Failed')
+    stop_logging()
+
+    first, second = [json.loads(line) for line in path.read_text().splitlines()]
+    assert first['message'] == 'Hello there'
+    assert (first['bot_id'], first['bot_name'], first['user_id']) == (3, 'news', 42)
+    assert first['logger'] == 'buzzing.test.json' and first['level'] == 'INFO'
+    assert 'user_id' not in second
+    assert 'ValueError: boom' in second['exception']
+
+def test_arguments_are_captured_at_call_time(pipeline):
+    """Test that mutable arguments are formatted as they were when logged."""
+    create, path = pipeline
+    create()
+    items = ['a']
+    logging.getLogger('buzzing.test.args').info('items %s', items)
+    items.append('b')
+    stop_logging()
+    assert "items ['a']" in path.read_text()
+
+def test_disabled_level_does_not_format():
+    """Test that arguments of a filtered-out call are never formatted."""
+    class Expensive:
+        def __str__(self):
+            raise AssertionError('formatted')
+
+    logger = logging.getLogger('buzzing.test.lazy')
+    logger.setLevel(logging.INFO)
+    try:
+        ContextAdapter(logger, {'bot_id': 1}).debug('value %s', Expensive())
+        logger.debug('value %s', Expensive())
+    finally:
+        logger.setLevel(logging.NOTSET)
+
+def test_sampling_filter():
+    """Test that one in N records per template is kept and warnings always pass."""
+    sampling_filter = SamplingFilter(10)
+
+    def record(msg, level=logging.INFO):
+        return logging.LogRecord('buzzing.test', level, __file__, 1, msg, (), None)
+
+    kept = [r for r in (record('send %s') for _ in range(100)) if sampling_filter.filter(r)]
+    assert len(kept) == 10
+    assert kept[0].sampled == 10
+    assert sampling_filter.filter(record('rare %s'))
+    assert all(sampling_filter.filter(record('send %s', logging.WARNING)) for _ in range(5))
+
+def test_sampling_is_applied_per_logger(pipeline):
+    """Test that configured loggers are sampled and others are not."""
+    create, path = pipeline
+    create(sampling={'buzzing.test.busy': 5})
+    for i in range(10):
+        logging.getLogger('buzzing.test.busy').info('busy %d', i)
+        logging.getLogger('buzzing.test.quiet').info('quiet %d', i)
+    stop_logging()
+    lines = path.read_text().splitlines()
+    assert sum('busy' in line for line in lines) == 2
+    assert sum('quiet' in line for line in lines) == 10
+
+def test_rotation(pipeline):
+    """Test size rotation, and time rotation when asked for."""
+    create, path = pipeline
+    create(max_bytes=200, backups=2)
+    for i in range(20):
+        logging.getLogger('buzzing.test.rotate').info('line %d', i)
+    stop_logging()
+    assert (path.parent / 'test.log.1').exists()
+    assert not (path.parent / 'test.log.3').exists()
+
+    listener = create(rotate_when='midnight')
+    assert any(isinstance(handler, TimedRotatingFileHandler) for handler in listener.handlers)
+
+def test_parse_sampling():
+    """Test parsing of logger=N pairs."""
+    assert parse_sampling('') == {}
+    assert parse_sampling('a.b=100, c=2') == {'a.b': 100, 'c': 2}
+    for spec in ('a', 'a=0', 'a=x', '=3'):
+        with pytest.raises(ValueError):
+            parse_sampling(spec)
@@ -0,0 +1,43 @@
+"""Tests for LoopWatchdog."""
+import asyncio
+import logging
+import time
+import pytest
+from buzzing.util.loop_watchdog import LOOP_STALLS, LoopWatchdog
+
+@pytest.mark.asyncio
+async def test_reports_blocking_task(caplog):
+    """Test that a task blocking the loop is reported once, with its name and stack."""
+    watchdog = LoopWatchdog(interval=0.02, threshold=0.1)
+    watchdog.start()
+
+    async def block():
+        time.sleep(0.4)
+
+    try:
+        with caplog.at_level(logging.WARNING, logger='buzzing.util.loop_watchdog'):
+            await asyncio.create_task(block(), name='bot_sleepy')
+            await asyncio.sleep(0.05)
+    finally:
+        await watchdog.stop()
+
+    assert watchdog.stalls == 1
+    assert watchdog.max_lag >= 0.3
+    assert LOOP_STALLS.labels('bot_sleepy').value >= 1
+    message = caplog.records[0].getMessage()
+    assert 'by task bot_sleepy' in message
+    assert 'in block' in message
+
+@pytest.mark.asyncio
+async def test_quiet_when_loop_is_responsive(caplog):
+    """Test that nothing is reported while every wakeup is on time."""
+    watchdog = LoopWatchdog(interval=0.01, threshold=0.2)
+    watchdog.start()
+    try:
+        with caplog.at_level(logging.WARNING, logger='buzzing.util.loop_watchdog'):
+            await asyncio.sleep(0.2)
+    finally:
+        await watchdog.stop()
+
+    assert watchdog.stalls == 0
+    assert not caplog.records
@@ -0,0 +1,86 @@
+"""Tests for the metrics registry."""
+import pytest
+from unittest.mock import AsyncMock
+from telegram.error import NetworkError, RetryAfter
+from buzzing.bots_manager.broadcaster import Broadcaster
+from buzzing.util.metrics import REGISTRY, Gauge, MetricsRegistry
+
+@pytest.fixture
+def registry():
+    """Create an empty registry."""
+    return MetricsRegistry()
+
+def test_counter_and_gauge_render(registry):
+    """Test the Prometheus text format of labelled counters and gauges."""
+    sends = registry.counter('sends_total', 'Messages sent', ('bot',))
+    sends.labels('a').inc()
+    sends.labels('a').inc(2)
+    registry.gauge('queue', 'Queue depth').labels().set(4)
+
+    text = registry.render()
+
+    assert '# TYPE sends_total counter\nsends_total{bot="a"} 3\n' in text
+    assert '# HELP queue Queue depth\n# TYPE queue gauge\nqueue 4\n' in text
+
+def test_histogram_buckets_are_cumulative(registry):
+    """Test that histogram buckets, sum and count are rendered cumulatively."""
+    latency = registry.histogram('latency_seconds', 'Latency', ('bot',), buckets=(0.1, 1))
+    series = latency.labels('a')
+    for value in (0.05, 0.5, 0.7, 3):
+        series.observe(value)
+
+    lines = registry.render().splitlines()
+
+    assert 'latency_seconds_bucket{bot="a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{bot="a",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{bot="a",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{bot="a"} 4.25' in lines
+    assert 'latency_seconds_count{bot="a"} 4' in lines
+
+def test_label_values_are_escaped(registry):
+    """Test that quotes, backslashes and newlines in labels are escaped."""
+    registry.counter('c', 'C', ('bot',)).labels('a"b\\c\nd').inc()
+
+    assert 'c{bot="a\\"b\\\\c\\nd"} 1' in registry.render()
+
+def test_registration_is_idempotent(registry):
+    """Test that registering a metric again returns it, and conflicts are rejected."""
+    first = registry.counter('c', 'C', ('bot',))
+
+    assert registry.counter('c', 'C', ('bot',)) is first
+    with pytest.raises(ValueError):
+        registry.gauge('c', 'C', ('bot',))
+    with pytest.raises(ValueError):
+        first.labels('a', 'b')
+
+def test_collectors_are_rendered_at_scrape_time(registry):
+    """Test that collector metrics are computed on every render."""
+    depth = {'value': 1}
+
+    def collect():
+        gauge = Gauge('depth', 'Depth')
+        gauge.labels().set(depth['value'])
+        return [gauge]
+
+    registry.add_collector(collect)
+    assert 'depth 1' in registry.render()
+    depth['value'] = 5
+    assert 'depth 5' in registry.render()
+    registry.remove_collector(collect)
+    assert 'depth' not in registry.render()
+
+@pytest.mark.asyncio
+async def test_broadcaster_counts_sends_failures_and_rate_limits():
+    """Test that the send path updates latency, send, failure and 429 metrics."""
+    send = AsyncMock(side_effect=[None, RetryAfter(0), None, NetworkError('down')])
+    broadcaster = Broadcaster(1, send, global_rate=10000, name='metrics_bot')
+
+    report = await broadcaster.broadcast([1, 2, 3], 'hello')
+
+    assert report.sent == 2
+    assert report.failed == 1
+    text = REGISTRY.render()
+    assert 'buzzing_sends_total{bot="metrics_bot"} 2' in text
+    assert 'buzzing_send_failures_total{bot="metrics_bot"} 1' in text
+    assert 'buzzing_send_rate_limited_total{bot="metrics_bot"} 1' in text
+    assert 'buzzing_send_seconds_count{bot="metrics_bot"} 4' in text
@@ -0,0 +1,98 @@
+"""Tests for MetricsServer."""
+import asyncio
+import sqlite3
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from buzzing.bots_manager.bots_interactor import BotsInteractor
+from buzzing.bots_manager.metrics_server import MetricsServer
+from buzzing.dao.migrator import migrate
+
+def make_mock_app(started):
+    """Create a mock application whose polling starts once ``started`` is set."""
+    mock_app = AsyncMock()
+    mock_app.__aenter__ = AsyncMock(return_value=mock_app)
+    mock_app.add_handler = MagicMock()
+    mock_app.running = False
+    mock_app.updater.running = False
+    mock_app.updater.start_polling = AsyncMock(side_effect=started.wait)
+    mock_app.update_queue = asyncio.Queue()
+    return mock_app
+
+@pytest.fixture
+def db_connection():
+    """Create a migrated in-memory database with one bot and one subscriber."""
+    conn = sqlite3.connect(':memory:')
+    migrate(conn)
+    conn.execute("""
+        INSERT INTO bots_config (name, description, token, password, entry_module, entry_class, metadata, is_active)
+        VALUES ('server_bot', 'Bot', 'token', 'pass', 'buzzing.bots.test_bot', 'TestBot', '{}', 1)
+    """)
+    conn.execute("INSERT INTO subscription (user_id, username, bot_id, is_active) VALUES (7, 'u', 1, 1)")
+    return conn
+
+@pytest.mark.asyncio
+async def test_metrics_health_and_readiness(db_connection):
+    """Test that the endpoint serves metrics and reports bot readiness."""
+    started = asyncio.Event()
+    metrics = MetricsServer('127.0.0.1', 0)
+    bots_interactor = BotsInteractor(db_connection, task_timeout=0.05, metrics=metrics)
+    mock_builder = MagicMock()
+    mock_builder.token.return_value = mock_builder
+    mock_builder.build.side_effect = lambda: make_mock_app(started)
+
+    with patch('telegram.ext.Application.builder', return_value=mock_builder):
+        await bots_interactor.register_bots()
+        url = f'http://127.0.0.1:{metrics.server.port}'
+        async with httpx.AsyncClient(base_url=url) as client:
+            assert (await client.get('/health')).text == 'ok'
+
+            response = await client.get('/ready')
+            assert response.status_code == 503
+            assert response.json()['bots']['server_bot']['state'] == 'starting'
+
+            started.set()
+            await bots_interactor.bot_interactor(1).wait_ready()
+            response = await client.get('/ready')
+            assert response.status_code == 200
+            assert response.json() == {'ready': True, 'bots': {
+                'server_bot': {'state': 'ready', 'circuit': 'closed', 'subscribers': None}}}
+            assert 'buzzing_subscribers{bot="server_bot"}' not in (await client.get('/metrics')).text
+
+            bot = bots_interactor.bot_interactor(1)
+            await bot.fetch_now_cache.get()
+            await bot.subscriptions.load(bots_interactor.async_bots_config_dao.stream_audience)
+            assert (await client.get('/ready')).json()['bots']['server_bot']['subscribers'] == 1
+            response = await client.get('/metrics')
+            assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+            lines = response.text.splitlines()
+            assert 'buzzing_subscribers{bot="server_bot"} 1' in lines
+            assert 'buzzing_bot_ready{bot="server_bot"} 1' in lines
+            assert 'buzzing_circuit_state{bot="server_bot"} 0' in lines
+            assert 'buzzing_fetch_cache_calls_total{bot="server_bot",method="fetch_now",result="miss"} 1' in lines
+            assert 'buzzing_fetch_cache_errors_total{bot="server_bot",method="fetch"} 0' in lines
+            assert 'buzzing_update_queue_depth{bot="server_bot"} 0' in lines
+            assert any(line.startswith('buzzing_tasks ') for line in lines)
+        await bots_interactor.stop_bots()
+
+@pytest.mark.asyncio
+async def test_profile_endpoint():
+    """Test that the profile route samples the loop and rejects bad or overlapping requests."""
+    metrics = MetricsServer('127.0.0.1', 0)
+    await metrics.start()
+    try:
+        async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{metrics.server.port}') as client:
+            assert (await client.get('/debug/profile?seconds=abc')).status_code == 400
+            assert (await client.get('/debug/profile?seconds=0')).status_code == 400
+
+            first = asyncio.create_task(client.get('/debug/profile?seconds=0.3'))
+            await asyncio.sleep(0.1)
+            assert (await client.get('/debug/profile?seconds=0.1')).status_code == 409
+
+            response = await first
+            assert response.status_code == 200
+            stack, count = response.text.splitlines()[0].rsplit(' ', 1)
+            assert int(count) > 0
+            assert 'base_events.py:run_forever' in stack
+    finally:
+        await metrics.stop()
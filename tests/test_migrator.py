@@ -0,0 +1,83 @@
+"""Tests for the schema migrator."""
+import sqlite3
+import pytest
+from buzzing.dao.bots_config_dao import BotsConfigDao
+from buzzing.dao.migrator import (MigrationError, configure_connection, discover_migrations,
+                                  migrate, schema_version)
+
+LEGACY_SCHEMA = '''
+    CREATE TABLE bots_config(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT, description TEXT, token TEXT, password TEXT,
+        entry_module TEXT, entry_class TEXT, metadata TEXT, is_active BOOLEAN
+    );
+    CREATE TABLE subscription(
+        user_id INTEGER, username TEXT, bot_id INTEGER, is_active BOOLEAN,
+        PRIMARY KEY (user_id, bot_id)
+    );
+'''
+
+@pytest.fixture
+def db_connection():
+    """Create an empty in-memory SQLite database."""
+    return sqlite3.connect(':memory:', isolation_level=None)
+
+def test_migrate_fresh_database(db_connection):
+    """Test that a fresh database gets every table at the latest version."""
+    version = migrate(db_connection)
+
+    assert version == len(discover_migrations())
+    assert schema_version(db_connection) == version
+    tables = {row[0] for row in db_connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'bots_config', 'subscription', 'broadcast', 'outbox'} <= tables
+
+def test_migrate_is_idempotent(db_connection):
+    """Test that running the migrations again changes nothing."""
+    version = migrate(db_connection)
+    assert migrate(db_connection) == version
+
+def test_migrate_converts_legacy_booleans(db_connection):
+    """Test that string booleans of a legacy database become integers."""
+    db_connection.executescript(LEGACY_SCHEMA)
+    db_connection.executemany('INSERT INTO subscription VALUES (?, ?, 1, ?)',
+                              [(1, 'a', 'True'), (2, 'b', 'False'), (3, 'c', 'True')])
+
+    migrate(db_connection)
+
+    rows = dict(db_connection.execute('SELECT user_id, is_active FROM subscription'))
+    assert rows == {1: 1, 2: 0, 3: 1}
+    assert list(BotsConfigDao(db_connection).fetch_audience_page(1, 0, 10)) == [1, 3]
+
+def test_bot_audience_uses_covering_index(db_connection):
+    """Test that fetching one bot's audience is an index-only range scan."""
+    migrate(db_connection)
+
+    plan = ' '.join(row[3] for row in db_connection.execute(
+        'EXPLAIN QUERY PLAN SELECT user_id, username FROM subscription WHERE bot_id = ? AND is_active = ?',
+        (1, 1)))
+
+    assert 'COVERING INDEX idx_subscription_bot_active' in plan
+
+def test_failed_migration_keeps_previous_version(db_connection, tmp_path):
+    """Test that a failing migration is rolled back with its version bump."""
+    (tmp_path / '0001_create.sql').write_text('CREATE TABLE a(x);')
+    (tmp_path / '0002_broken.sql').write_text('CREATE TABLE b(x); INSERT INTO missing VALUES (1);')
+
+    with pytest.raises(sqlite3.Error):
+        migrate(db_connection, tmp_path)
+
+    assert schema_version(db_connection) == 1
+    tables = {row[0] for row in db_connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert tables == {'a'}
+
+def test_newer_database_is_rejected(db_connection):
+    """Test that a database from a newer release is not touched."""
+    db_connection.execute('PRAGMA user_version = 999')
+    with pytest.raises(MigrationError):
+        migrate(db_connection)
+
+def test_configure_connection_enables_wal(tmp_path):
+    """Test that file databases are switched to WAL mode."""
+    conn = sqlite3.connect(str(tmp_path / 'buzzing.db'))
+    configure_connection(conn)
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
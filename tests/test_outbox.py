@@ -0,0 +1,220 @@
+"""Tests for OutboxDao and OutboxDispatcher."""
+import sqlite3
+import threading
+import pytest
+from unittest.mock import AsyncMock
+from telegram.error import Forbidden, NetworkError
+from buzzing.bots_manager.broadcaster import Broadcaster
+from buzzing.bots_manager.outbox_dispatcher import OutboxDispatcher
+from buzzing.dao.async_outbox_dao import AsyncOutboxDao
+from buzzing.dao.async_sqlite import AsyncSQLite
+from buzzing.dao.outbox_dao import OutboxDao, STATUS_DEAD, STATUS_DONE, STATUS_PENDING, STATUS_SENT
+
+SCHEMA = '''
+        CREATE TABLE broadcast(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bot_id INTEGER,
+            payload TEXT,
+            status TEXT,
+            created_at REAL
+        );
+        CREATE TABLE outbox(
+            broadcast_id INTEGER,
+            bot_id INTEGER,
+            user_id INTEGER,
+            status TEXT,
+            attempts INTEGER,
+            next_attempt_at REAL,
+            last_error TEXT,
+            PRIMARY KEY (broadcast_id, user_id)
+        );
+'''
+
+@pytest.fixture
+def db_connection():
+    """Create an in-memory SQLite database with the outbox tables."""
+    conn = sqlite3.connect(':memory:', isolation_level=None)
+    conn.executescript(SCHEMA)
+    return conn
+
+@pytest.fixture
+def outbox_dao(db_connection):
+    """Create an OutboxDao instance."""
+    return OutboxDao(db_connection)
+
+def make_dispatcher(outbox_dao, send, **kwargs):
+    broadcaster = Broadcaster(1, send, global_rate=10000)
+    database = AsyncSQLite.from_connection(outbox_dao.db_connection)
+    return OutboxDispatcher(1, AsyncOutboxDao(database), broadcaster, **kwargs)
+
+def statuses(db_connection):
+    return dict(db_connection.execute('SELECT user_id, status FROM outbox'))
+
+def test_create_broadcast(outbox_dao, db_connection):
+    """Test that a broadcast creates one pending row per recipient."""
+    broadcast_id = outbox_dao.create_broadcast(1, "hello", range(2500))
+
+    assert outbox_dao.pending_count(1) == 2500
+    entries = outbox_dao.fetch_due(1, now=float('inf'), limit=10)
+    assert len(entries) == 10
+    assert all(e.broadcast_id == broadcast_id and e.payload == "hello" for e in entries)
+
+def test_fetch_due_oldest_attempt_first(outbox_dao):
+    """Test that due entries come by attempt time, then in enqueue order."""
+    first = outbox_dao.create_broadcast(1, "first", [3, 1])
+    second = outbox_dao.create_broadcast(1, "second", [2])
+    entries = outbox_dao.fetch_due(1, now=float('inf'), limit=10)
+    outbox_dao.record_results([], [(entries[0], float('inf'), "boom")], [])
+
+    due = outbox_dao.fetch_due(1, now=float('inf'), limit=10)
+
+    assert [(e.broadcast_id, e.user_id) for e in due] == [(first, 1), (second, 2), (first, 3)]
+
+@pytest.mark.asyncio
+async def test_outbox_writes_run_off_the_event_loop(tmp_path, monkeypatch):
+    """Test that enqueueing and draining use the database threads, not the loop's."""
+    connection = sqlite3.connect(str(tmp_path / 'outbox.db'), isolation_level=None)
+    connection.executescript(SCHEMA)
+    database = AsyncSQLite.from_connection(connection)
+    threads = set()
+    create_broadcast = OutboxDao.create_broadcast
+
+    def record_thread(self, *args):
+        threads.add(threading.current_thread().name)
+        return create_broadcast(self, *args)
+
+    monkeypatch.setattr(OutboxDao, 'create_broadcast', record_thread)
+    dispatcher = OutboxDispatcher(1, AsyncOutboxDao(database), Broadcaster(1, AsyncMock(), global_rate=10000))
+    try:
+        await dispatcher.enqueue("hello", [1, 2, 3])
+        report = await dispatcher.drain()
+    finally:
+        database.close()
+        connection.close()
+
+    assert threads == {'sqlite-writer'}
+    assert report.sent == 3
+
+@pytest.mark.asyncio
+async def test_drain_sends_and_checkpoints(outbox_dao, db_connection):
+    """Test that draining delivers everything and marks the broadcast done."""
+    send = AsyncMock()
+    dispatcher = make_dispatcher(outbox_dao, send, batch_size=2)
+    await dispatcher.enqueue("hello", [1, 2, 3, 4, 5])
+
+    report = await dispatcher.drain()
+
+    assert report.sent == 5
+    assert send.await_count == 5
+    assert statuses(db_connection) == {}
+    assert db_connection.execute('SELECT status FROM broadcast').fetchone()[0] == STATUS_DONE
+
+def test_done_broadcast_drops_sent_rows(outbox_dao, db_connection):
+    """Test that sent rows are kept while a broadcast is pending and deleted once it is done."""
+    outbox_dao.create_broadcast(1, "hello", [1, 2, 3])
+    first, second, third = outbox_dao.fetch_due(1, now=float('inf'), limit=10)
+    outbox_dao.record_results([first], [], [])
+    assert statuses(db_connection) == {1: STATUS_SENT, 2: STATUS_PENDING, 3: STATUS_PENDING}
+
+    outbox_dao.record_results([second], [], [(third, "blocked")])
+
+    assert statuses(db_connection) == {3: STATUS_DEAD}
+
+@pytest.mark.asyncio
+async def test_drain_purges_done_broadcasts_after_retention(outbox_dao, db_connection):
+    """Test that done broadcasts past the retention are purged with their dead letters."""
+    async def send(chat_id, data):
+        if chat_id == 2:
+            raise Forbidden("bot was blocked by the user")
+        if chat_id == 3:
+            raise NetworkError("boom")
+
+    dispatcher = make_dispatcher(outbox_dao, send)
+    await dispatcher.enqueue("old", [1, 2])
+    await dispatcher.drain()
+    assert statuses(db_connection) == {2: STATUS_DEAD}
+
+    other = outbox_dao.create_broadcast(2, "other bot", [4])
+    dispatcher.retention = 0
+    pending = await dispatcher.enqueue("new", [3])
+    await dispatcher.drain()
+    dispatcher.close()
+
+    assert list(db_connection.execute('SELECT id, bot_id FROM broadcast')) == [(other, 2), (pending, 1)]
+    assert statuses(db_connection) == {3: STATUS_PENDING, 4: STATUS_PENDING}
+
+@pytest.mark.asyncio
+async def test_resume_skips_already_sent(outbox_dao):
+    """Test that a restarted dispatcher only sends to pending recipients."""
+    outbox_dao.create_broadcast(1, "hello", [1, 2, 3, 4, 5])
+    first = outbox_dao.fetch_due(1, now=float('inf'), limit=2)
+    outbox_dao.record_results(first, [], [])
+
+    send = AsyncMock()
+    await make_dispatcher(outbox_dao, send).resume()
+
+    sent_to = sorted(call.args[0] for call in send.await_args_list)
+    assert sent_to == sorted({1, 2, 3, 4, 5} - {e.user_id for e in first})
+
+@pytest.mark.asyncio
+async def test_transient_failure_is_retried_later(outbox_dao, db_connection):
+    """Test that a transient error reschedules the delivery with backoff."""
+    send = AsyncMock(side_effect=NetworkError("boom"))
+    dispatcher = make_dispatcher(outbox_dao, send, base_backoff=60)
+    await dispatcher.enqueue("hello", [1])
+
+    report = await dispatcher.drain()
+    dispatcher.close()
+
+    assert report.sent == 0
+    assert outbox_dao.pending_count(1) == 1
+    row = db_connection.execute('SELECT attempts, last_error FROM outbox').fetchone()
+    assert row == (1, "boom")
+
+@pytest.mark.asyncio
+async def test_permanent_failure_is_dead_lettered(outbox_dao, db_connection):
+    """Test that permanent errors and exhausted retries are dead-lettered."""
+    async def send(chat_id, data):
+        if chat_id == 1:
+            raise Forbidden("bot was blocked by the user")
+        raise NetworkError("boom")
+
+    dispatcher = make_dispatcher(outbox_dao, send, max_attempts=1)
+    await dispatcher.enqueue("hello", [1, 2])
+
+    report = await dispatcher.drain()
+
+    assert report.failed == 2
+    assert statuses(db_connection) == {1: STATUS_DEAD, 2: STATUS_DEAD}
+    assert outbox_dao.pending_count(1) == 0
+
+@pytest.mark.asyncio
+async def test_drain_prunes_dead_chats(outbox_dao):
+    """Test that only chats failing with a permanent error are pruned."""
+    async def send(chat_id, data):
+        if chat_id == 1:
+            raise Forbidden("bot was blocked by the user")
+        raise NetworkError("boom")
+
+    dispatcher = make_dispatcher(outbox_dao, send, max_attempts=1)
+    dispatcher.broadcaster.deactivate = AsyncMock(side_effect=lambda chat_ids: len(chat_ids))
+    await dispatcher.enqueue("hello", [1, 2])
+
+    report = await dispatcher.drain()
+
+    assert report.pruned == 1
+    dispatcher.broadcaster.deactivate.assert_awaited_once_with([1])
+
+@pytest.mark.asyncio
+async def test_closed_dispatcher_leaves_deliveries_pending(outbox_dao):
+    """Test that deliveries not sent before shutdown stay in the outbox."""
+    send = AsyncMock()
+    dispatcher = make_dispatcher(outbox_dao, send)
+    await dispatcher.enqueue("hello", [1, 2, 3])
+    await dispatcher.broadcaster.close(timeout=0.1)
+
+    report = await dispatcher.drain()
+
+    assert report.aborted
+    assert send.await_count == 0
+    assert outbox_dao.pending_count(1) == 3
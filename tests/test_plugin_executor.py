@@ -0,0 +1,171 @@
+"""Tests for PluginExecutor."""
+import asyncio
+import itertools
+import os
+import sys
+import time
+import pytest
+from buzzing.bots.plugin_registry import PluginRegistry
+from buzzing.bots.test_bot import TestBot
+from buzzing.bots_manager.plugin_executor import (ASYNC, PROCESS, THREAD, ExecutionPolicy,
+                                                  PluginExecutor)
+
+PLUGIN_SOURCE = '''
+import os
+import time
+
+class SyncBot:
+    def fetch(self):
+        time.sleep(0.2)
+        return 'sync'
+
+    def fetch_now(self):
+        return os.getpid()
+
+class BlockingBot:
+    execution = 'thread'
+
+    async def fetch(self):
+        time.sleep(0.2)
+        return 'blocking'
+
+    async def fetch_now(self):
+        return 'blocking now'
+
+class CpuBot:
+    execution = 'process'
+
+    def fetch(self):
+        time.sleep(5)
+
+    def fetch_now(self):
+        return os.getpid()
+
+class OtherCpuBot:
+    execution = 'process'
+
+    def fetch(self):
+        time.sleep(0.5)
+        return 'other'
+
+    def fetch_now(self):
+        return os.getpid()
+'''
+
+_counter = itertools.count()
+
+@pytest.fixture
+def plugin_module(tmp_path, monkeypatch):
+    """Create an importable module of test plugins, also visible to spawned processes."""
+    monkeypatch.syspath_prepend(str(tmp_path))
+    name = f'executor_plugins_{next(_counter)}'
+    (tmp_path / f'{name}.py').write_text(PLUGIN_SOURCE)
+    yield name
+    sys.modules.pop(name, None)
+
+@pytest.fixture
+def executor():
+    """Create an executor with small pools."""
+    executor = PluginExecutor(threads=2, processes=1)
+    yield executor
+    executor.close()
+
+async def count_ticks(coroutine):
+    """Await a coroutine while counting event loop ticks."""
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticking = asyncio.create_task(ticker())
+    try:
+        return await coroutine, ticks
+    finally:
+        ticking.cancel()
+
+def test_policy_from_metadata():
+    """Test that the execution section of the metadata is parsed and validated."""
+    assert ExecutionPolicy.from_metadata({}) == ExecutionPolicy()
+    assert ExecutionPolicy.from_metadata({'execution': {'mode': 'process', 'timeout': 20}}) == \
+        ExecutionPolicy(PROCESS, 20.0)
+    with pytest.raises(ValueError):
+        ExecutionPolicy.from_metadata({'execution': {'mode': 'fork'}})
+    with pytest.raises(ValueError):
+        ExecutionPolicy.from_metadata({'execution': {'timeout': 0}})
+
+def test_mode_for(plugin_module):
+    """Test that sync fetches and declared plugins leave the event loop."""
+    registry = PluginRegistry()
+    sync_bot = registry.resolve(plugin_module, 'SyncBot')()
+    blocking_bot = registry.resolve(plugin_module, 'BlockingBot')()
+
+    assert PluginExecutor.mode_for(TestBot(), 'fetch', ExecutionPolicy()) == ASYNC
+    assert PluginExecutor.mode_for(sync_bot, 'fetch', ExecutionPolicy()) == THREAD
+    assert PluginExecutor.mode_for(blocking_bot, 'fetch', ExecutionPolicy()) == THREAD
+    assert PluginExecutor.mode_for(blocking_bot, 'fetch', ExecutionPolicy(PROCESS)) == PROCESS
+
+@pytest.mark.asyncio
+async def test_sync_fetch_runs_in_thread(executor, plugin_module):
+    """Test that a plain sync fetch does not block the event loop."""
+    bot = PluginRegistry().lazy('sync', plugin_module, 'SyncBot')
+
+    result, ticks = await count_ticks(executor.call(bot, 'fetch'))
+
+    assert result == 'sync'
+    assert ticks > 10
+
+@pytest.mark.asyncio
+async def test_declared_blocking_async_fetch_runs_in_thread(executor, plugin_module):
+    """Test that an async fetch declared blocking gets its own loop in a thread."""
+    bot = PluginRegistry().lazy('blocking', plugin_module, 'BlockingBot')
+
+    result, ticks = await count_ticks(executor.call(bot, 'fetch'))
+
+    assert result == 'blocking'
+    assert ticks > 10
+
+@pytest.mark.asyncio
+async def test_timeout(executor, plugin_module):
+    """Test that a fetch exceeding the bot's timeout fails."""
+    bot = PluginRegistry().lazy('sync', plugin_module, 'SyncBot')
+
+    with pytest.raises(asyncio.TimeoutError):
+        await executor.call(bot, 'fetch', ExecutionPolicy(timeout=0.05))
+
+@pytest.mark.asyncio
+async def test_process_mode_runs_in_pool_and_recovers_from_timeout(executor, plugin_module):
+    """Test that process fetches run in another process and a stuck one is stopped."""
+    bot = PluginRegistry().lazy('cpu', plugin_module, 'CpuBot')
+
+    pid = await executor.call(bot, 'fetch_now', ExecutionPolicy(timeout=30))
+    assert pid != os.getpid()
+    assert not bot.loaded
+
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        await executor.call(bot, 'fetch', ExecutionPolicy(timeout=0.2))
+    assert time.monotonic() - started < 1
+
+    # A fresh pool serves the next call
+    assert await executor.call(bot, 'fetch_now', ExecutionPolicy(timeout=30)) != pid
+
+@pytest.mark.asyncio
+async def test_process_timeout_spares_other_plugins(executor, plugin_module):
+    """Test that recycling a timed-out plugin's processes does not fail another bot's call."""
+    registry = PluginRegistry()
+    stuck = registry.lazy('cpu', plugin_module, 'CpuBot')
+    other = registry.lazy('other', plugin_module, 'OtherCpuBot')
+    other_pid = await executor.call(other, 'fetch_now', ExecutionPolicy(timeout=30))
+    await executor.call(stuck, 'fetch_now', ExecutionPolicy(timeout=30))
+
+    timed_out, result = await asyncio.gather(
+        executor.call(stuck, 'fetch', ExecutionPolicy(timeout=0.2)),
+        executor.call(other, 'fetch', ExecutionPolicy(timeout=30)),
+        return_exceptions=True)
+
+    assert isinstance(timed_out, asyncio.TimeoutError)
+    assert result == 'other'
+    assert await executor.call(other, 'fetch_now', ExecutionPolicy(timeout=30)) == other_pid
@@ -0,0 +1,154 @@
+"""Tests for PluginRegistry and LazyBot."""
+import asyncio
+import itertools
+import sqlite3
+import sys
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from buzzing.bots.plugin_registry import LazyBot, PluginRegistry
+from buzzing.bots_manager.bots_interactor import BotsInteractor
+from buzzing.dao.bots_config_dao import BotsConfigDao
+from buzzing.dao.migrator import migrate
+
+PLUGIN_SOURCE = '''
+import time
+time.sleep({import_delay})
+
+class SlowBot:
+    kind = 'slow'
+
+    async def fetch(self):
+        return 'fetched'
+
+    async def fetch_now(self):
+        return 'fetched now'
+'''
+
+_counter = itertools.count()
+
+@pytest.fixture
+def make_plugin(tmp_path, monkeypatch):
+    """Create importable plugin modules that take a while to import."""
+    monkeypatch.syspath_prepend(str(tmp_path))
+    names = []
+
+    def make(import_delay=0.0):
+        name = f'test_plugin_{next(_counter)}'
+        (tmp_path / f'{name}.py').write_text(PLUGIN_SOURCE.format(import_delay=import_delay))
+        names.append(name)
+        return name
+
+    yield make
+    for name in names:
+        sys.modules.pop(name, None)
+
+@pytest.fixture
+def registry():
+    """Create an empty registry."""
+    return PluginRegistry()
+
+def test_reading_configs_imports_no_plugin(make_plugin, registry):
+    """Test that plugins are not imported while the bot configurations are read."""
+    module = make_plugin()
+    conn = sqlite3.connect(':memory:')
+    migrate(conn)
+    conn.execute("INSERT INTO bots_config (name, token, entry_module, entry_class, is_active) VALUES ('slow', 't', ?, 'SlowBot', 1)",
+                 (module,))
+
+    configs = BotsConfigDao(conn, registry).fetch_all_bots_configs()
+
+    assert isinstance(configs[0].bot, LazyBot)
+    assert not configs[0].bot.loaded
+    assert module not in sys.modules
+
+def test_resolved_class_is_cached(make_plugin, registry):
+    """Test that a plugin class is imported once and then served from the cache."""
+    module = make_plugin()
+
+    first = registry.resolve(module, 'SlowBot')
+    del sys.modules[module]
+    second = registry.resolve(module, 'SlowBot')
+
+    assert first is second
+    assert list(registry.import_times) == [module]
+
+@pytest.mark.asyncio
+async def test_lazy_bot_loads_on_first_fetch(make_plugin, registry):
+    """Test that a lazy bot creates its plugin on first use and then proxies it."""
+    bot = registry.lazy('slow', make_plugin(), 'SlowBot')
+
+    with pytest.raises(AttributeError):
+        bot.kind
+    assert await bot.fetch_now() == 'fetched now'
+    assert bot.loaded
+    assert bot.kind == 'slow'
+    assert 'slow' in registry.init_times
+
+@pytest.mark.asyncio
+async def test_warm_up_loads_plugins_concurrently_off_the_loop(make_plugin, registry):
+    """Test that independent plugins import side by side without blocking the event loop."""
+    bots = [registry.lazy(f'bot{i}', make_plugin(import_delay=0.2), 'SlowBot') for i in range(3)]
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticking = asyncio.create_task(ticker())
+    started = time.monotonic()
+    profile = await registry.warm_up(bots)
+    elapsed = time.monotonic() - started
+    ticking.cancel()
+
+    assert all(bot.loaded for bot in bots)
+    assert elapsed < 0.5
+    assert ticks > 10
+    assert len(profile.import_times) == 3
+    assert all(seconds >= 0.2 for seconds in profile.import_times.values())
+    assert set(profile.init_times) == {'bot0', 'bot1', 'bot2'}
+
+@pytest.mark.asyncio
+async def test_warm_up_reports_broken_plugin(make_plugin, registry):
+    """Test that a plugin that fails to load is reported without affecting the others."""
+    good = registry.lazy('good', make_plugin(), 'SlowBot')
+    broken = registry.lazy('broken', make_plugin(), 'MissingBot')
+
+    profile = await registry.warm_up([good, broken])
+
+    assert good.loaded
+    assert list(profile.failed) == ['broken']
+    assert profile.pending == []
+    with pytest.raises(AttributeError):
+        await broken.fetch()
+
+@pytest.mark.asyncio
+async def test_startup_budget_caps_register_bots(make_plugin, tmp_path):
+    """Test that startup returns within its budget while a slow plugin keeps loading."""
+    conn = sqlite3.connect(str(tmp_path / 'test.db'), check_same_thread=False, isolation_level=None)
+    migrate(conn)
+    conn.execute("INSERT INTO bots_config (name, token, entry_module, entry_class, is_active) VALUES ('slow', 't', ?, 'SlowBot', 1)",
+                 (make_plugin(import_delay=0.5),))
+    bots_interactor = BotsInteractor(conn, startup_budget=0.1)
+
+    mock_app = AsyncMock()
+    mock_app.__aenter__ = AsyncMock(return_value=mock_app)
+    mock_app.add_handler = MagicMock()
+    mock_app.running = False
+    mock_app.updater.running = False
+    mock_builder = MagicMock()
+    mock_builder.token.return_value = mock_builder
+    mock_builder.build.return_value = mock_app
+
+    with patch('telegram.ext.Application.builder', return_value=mock_builder):
+        started = time.monotonic()
+        await bots_interactor.register_bots()
+        elapsed = time.monotonic() - started
+        report = bots_interactor.startup_report
+        await bots_interactor.stop_bots()
+
+    assert elapsed < 0.4
+    assert report.plugins.pending == ['slow']
+    conn.close()
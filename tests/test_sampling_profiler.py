@@ -0,0 +1,50 @@
+"""Tests for SamplingProfiler."""
+import asyncio
+import time
+import pytest
+from buzzing.util.sampling_profiler import ProfilerBusy, SamplingProfiler
+
+def busy_work(seconds):
+    """Burn CPU for some seconds."""
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+@pytest.mark.asyncio
+async def test_profile_attributes_samples_to_task():
+    """Test that samples of a busy task are rooted at its name and end in its code."""
+    profiler = SamplingProfiler(interval=0.002)
+
+    async def bot():
+        await asyncio.sleep(0.05)
+        busy_work(0.2)
+
+    profiling = asyncio.create_task(profiler.profile(0.4))
+    await asyncio.create_task(bot(), name='bot_busy')
+    counts = await profiling
+
+    busy = {stack: count for stack, count in counts.items() if stack.startswith('bot_busy;')}
+    assert busy
+    assert all(stack.endswith('test_sampling_profiler.py:busy_work') for stack in busy)
+    assert sum(busy.values()) > 10
+
+@pytest.mark.asyncio
+async def test_one_profile_at_a_time():
+    """Test that a second profile is refused while one is running."""
+    profiler = SamplingProfiler()
+    running = asyncio.create_task(profiler.profile(0.1))
+    await asyncio.sleep(0)
+    with pytest.raises(ProfilerBusy):
+        await profiler.profile(0.1)
+    await running
+
+def test_collapse():
+    """Test the collapsed stack output, most frequent stack first."""
+    assert SamplingProfiler.collapse({'a;b': 2, 'a;c': 5}) == 'a;c 5\na;b 2\n'
+
+@pytest.mark.asyncio
+async def test_write(tmp_path):
+    """Test that a profile is written as a folded file."""
+    path = await SamplingProfiler().write(0.05, str(tmp_path))
+    assert path.endswith('.folded')
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in open(path).read().splitlines())
@@ -0,0 +1,114 @@
+"""Tests for the Scheduler and cron parsing."""
+import asyncio
+from datetime import datetime
+import pytest
+from buzzing.bots_manager.scheduler import (CronTrigger, IntervalTrigger, ScheduledJob, Scheduler,
+                                            POLICY_COALESCE, POLICY_QUEUE, POLICY_SKIP)
+from buzzing.util.cron import CronSchedule
+
+class FakeClock:
+    """Manually advanced wall clock."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def counting_job(name="job", interval=10.0, **kwargs):
+    calls = []
+
+    async def callback():
+        calls.append(name)
+
+    return ScheduledJob(name, callback, IntervalTrigger(interval), **kwargs), calls
+
+def test_cron_next_after():
+    """Test cron expressions against known dates."""
+    moment = datetime(2026, 10, 16, 7, 30)  # a Friday
+    assert CronSchedule("0 * * * *").next_after(moment) == datetime(2026, 10, 16, 8, 0)
+    assert CronSchedule("*/15 * * * *").next_after(moment) == datetime(2026, 10, 16, 7, 45)
+    assert CronSchedule("0 7 * * 1-5").next_after(moment) == datetime(2026, 10, 19, 7, 0)
+    assert CronSchedule("30 9 1 * 7").next_after(moment) == datetime(2026, 10, 18, 9, 30)
+
+def test_cron_invalid_expression():
+    """Test that malformed expressions are rejected."""
+    with pytest.raises(ValueError):
+        CronSchedule("61 * * * *")
+    with pytest.raises(ValueError):
+        CronSchedule("* * *")
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 31 2 *").next_after(datetime(2026, 1, 1))
+
+def test_job_from_metadata():
+    """Test building jobs from bot metadata."""
+    async def callback():
+        pass
+
+    assert ScheduledJob.from_metadata("bot", callback, {}) is None
+    job = ScheduledJob.from_metadata("bot", callback, {"schedule": {"cron": "0 7 * * *", "overlap": "queue"}})
+    assert isinstance(job.trigger, CronTrigger)
+    assert job.overlap_policy == POLICY_QUEUE
+    with pytest.raises(ValueError):
+        ScheduledJob.from_metadata("bot", callback, {"schedule": {"interval": 60, "misfire": "sometimes"}})
+
+def test_stagger_spreads_jobs():
+    """Test that jobs on the same schedule get different fixed offsets."""
+    offsets = {counting_job(f"bot{i}", stagger=60)[0].offset for i in range(20)}
+    assert len(offsets) > 1
+    assert all(0 <= offset < 60 for offset in offsets)
+
+@pytest.mark.asyncio
+async def test_scheduler_runs_jobs_periodically():
+    """Test that a single scheduler task drives many jobs."""
+    scheduler = Scheduler()
+    all_calls = []
+    for i in range(50):
+        job, calls = counting_job(f"bot{i}", interval=0.05)
+        all_calls.append(calls)
+        scheduler.add_job(job)
+    scheduler.start()
+    await asyncio.sleep(0.18)
+    await scheduler.stop()
+
+    assert all(len(calls) >= 2 for calls in all_calls)
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("policy,expected_runs", [(POLICY_SKIP, 0), (POLICY_COALESCE, 1), (POLICY_QUEUE, 3)])
+async def test_misfire_policies(policy, expected_runs):
+    """Test handling of runs missed while the process was stalled."""
+    clock = FakeClock()
+    scheduler = Scheduler(clock=clock)
+    job, calls = counting_job(interval=10, misfire_policy=policy, misfire_grace=1)
+    scheduler.add_job(job)
+
+    clock.now += 35  # the run due at +10s is late and the ones at +20s and +30s were missed
+    scheduler._fire(job)
+    if job.task:
+        await job.task
+
+    assert len(calls) == expected_runs
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("policy,expected_pending", [(POLICY_SKIP, 0), (POLICY_COALESCE, 1), (POLICY_QUEUE, 2)])
+async def test_overlap_policies(policy, expected_pending):
+    """Test handling of runs that fire while the previous one is running."""
+    clock = FakeClock()
+    scheduler = Scheduler(clock=clock)
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+
+    job = ScheduledJob("slow", slow, IntervalTrigger(10), overlap_policy=policy)
+    scheduler.add_job(job)
+    clock.now = job.nominal + job.offset
+    scheduler._fire(job)
+    await asyncio.sleep(0)
+    for _ in range(2):
+        clock.now = job.nominal + job.offset
+        scheduler._fire(job)
+
+    assert job.pending_runs == expected_pending
+    release.set()
+    await job.task
@@ -0,0 +1,130 @@
+"""Tests for SendScheduler."""
+import asyncio
+import pytest
+from buzzing.bots_manager.broadcaster import Broadcaster
+from buzzing.bots_manager.send_scheduler import (BULK, INTERACTIVE, TRANSACTIONAL, SendScheduler,
+                                                 parse_priority)
+
+class FakeClock:
+    """Clock advanced by hand."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+async def queue(scheduler, order, name, bot_id, priority):
+    """Start a task that records ``name`` once it gets a slot and releases it, and let it queue."""
+    async def send():
+        async with scheduler.slot(bot_id, priority):
+            order.append(name)
+    task = asyncio.ensure_future(send())
+    await asyncio.sleep(0)
+    return task
+
+async def serve(scheduler, tasks):
+    """Release the held slot and wait until the queued tasks ran one by one."""
+    scheduler.release()
+    await asyncio.wait_for(asyncio.gather(*tasks), 5)
+
+def test_parse_priority():
+    """Test that priority classes are parsed by name."""
+    assert parse_priority('interactive') == INTERACTIVE
+    assert parse_priority('bulk') == BULK
+    with pytest.raises(ValueError):
+        parse_priority('urgent')
+
+@pytest.mark.asyncio
+async def test_free_slots_are_granted_at_once():
+    """Test that sends do not wait while slots are free."""
+    scheduler = SendScheduler(slots=2)
+
+    await scheduler.acquire(1, BULK)
+    await scheduler.acquire(1, BULK)
+
+    assert scheduler.stats() == {'in_flight': 2, 'interactive': 0, 'transactional': 0, 'bulk': 0}
+    scheduler.release()
+    assert scheduler.in_flight == 1
+
+@pytest.mark.asyncio
+async def test_higher_classes_go_first():
+    """Test that replies overtake confirmations, which overtake broadcasts."""
+    scheduler = SendScheduler(slots=1, clock=FakeClock())
+    await scheduler.acquire(1, BULK)
+    order = []
+
+    tasks = [await queue(scheduler, order, 'bulk', 1, BULK),
+             await queue(scheduler, order, 'transactional', 1, TRANSACTIONAL),
+             await queue(scheduler, order, 'interactive', 2, INTERACTIVE)]
+    assert scheduler.waiting() == 3
+    await serve(scheduler, tasks)
+
+    assert order == ['interactive', 'transactional', 'bulk']
+
+@pytest.mark.asyncio
+async def test_bots_take_turns_within_a_class():
+    """Test that a bot with many queued sends does not hold up another bot."""
+    scheduler = SendScheduler(slots=1, clock=FakeClock())
+    await scheduler.acquire(1, BULK)
+    order = []
+
+    tasks = [await queue(scheduler, order, f'a{i}', 1, BULK) for i in range(3)]
+    tasks.append(await queue(scheduler, order, 'b0', 2, BULK))
+    await serve(scheduler, tasks)
+
+    assert order == ['a0', 'b0', 'a1', 'a2']
+
+@pytest.mark.asyncio
+async def test_waiting_sends_age_into_higher_classes():
+    """Test that a broadcast send waiting long enough goes before a new reply."""
+    clock = FakeClock()
+    scheduler = SendScheduler(slots=1, aging=5.0, clock=clock)
+    await scheduler.acquire(1, BULK)
+    order = []
+
+    tasks = [await queue(scheduler, order, 'bulk', 1, BULK)]
+    clock.now = 11.0
+    tasks.append(await queue(scheduler, order, 'interactive', 2, INTERACTIVE))
+    await serve(scheduler, tasks)
+
+    assert order == ['bulk', 'interactive']
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_keep_a_slot():
+    """Test that cancelling a waiting send passes its turn on."""
+    scheduler = SendScheduler(slots=1)
+    await scheduler.acquire(1, BULK)
+    order = []
+    cancelled = await queue(scheduler, order, 'cancelled', 1, INTERACTIVE)
+    waiting = await queue(scheduler, order, 'waiting', 2, BULK)
+
+    cancelled.cancel()
+    await serve(scheduler, [waiting])
+
+    assert order == ['waiting']
+    assert scheduler.in_flight == 0 and scheduler.waiting() == 0
+
+@pytest.mark.asyncio
+async def test_reply_overtakes_running_broadcast():
+    """Test that a reply only waits for the sends in flight, not the rest of the broadcast."""
+    scheduler = SendScheduler(slots=2)
+    sent = []
+
+    async def send(chat_id, data):
+        await asyncio.sleep(0.01)
+        sent.append(chat_id)
+
+    broadcaster = Broadcaster(1, send, concurrency=4, global_rate=10000, per_chat_rate=10000,
+                              scheduler=scheduler)
+    broadcast = asyncio.ensure_future(broadcaster.broadcast(range(50), 'news'))
+    await asyncio.sleep(0.02)
+
+    async def reply():
+        return len(sent)
+
+    sent_before_reply = await broadcaster.call(reply)
+    report = await broadcast
+
+    assert report.sent == 50
+    assert sent_before_reply < 10
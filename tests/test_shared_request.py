@@ -0,0 +1,94 @@
+"""Tests for SharedRequest."""
+import asyncio
+import pytest
+from unittest.mock import patch
+from telegram.error import TimedOut
+from telegram.ext import Application
+from telegram.request import HTTPXRequest
+from buzzing.bots_manager.shared_request import SharedRequest
+
+@pytest.mark.asyncio
+async def test_client_stays_open_until_last_user_shuts_down():
+    """Test that one bot stopping does not close the client of the others."""
+    request = SharedRequest()
+    await request.initialize()
+    await request.initialize()
+
+    await request.shutdown()
+    assert not request._client.is_closed
+
+    await request.shutdown()
+    assert request._client.is_closed
+
+@pytest.mark.asyncio
+async def test_failed_initialize_is_not_counted():
+    """Test that a bot whose initialize failed does not keep the client from being opened or closed."""
+    request = SharedRequest()
+    with patch.object(HTTPXRequest, 'initialize', side_effect=OSError('no network')):
+        with pytest.raises(OSError):
+            await request.initialize()
+    assert request._users == 0
+
+    with patch.object(HTTPXRequest, 'initialize') as initialize:
+        await request.initialize()
+    initialize.assert_awaited_once()
+
+    await request.shutdown()
+    assert request._client.is_closed
+
+def test_applications_share_one_request():
+    """Test that every Application built with the request uses the same client."""
+    request = SharedRequest()
+    first = Application.builder().token('1:a').request(request).build()
+    second = Application.builder().token('2:b').request(request).build()
+
+    assert first.bot.request is second.bot.request is request
+
+@pytest.mark.asyncio
+async def test_pool_limits_apply_to_every_client():
+    """Test that the pool size and keep-alive expiry reach the client, also when it is rebuilt."""
+    request = SharedRequest(pool_size=7, keepalive_expiry=12.0)
+    await request.initialize()
+    await request.shutdown()
+    await request.initialize()
+
+    pool = request._client._transport._pool
+    assert pool._max_connections == 7
+    assert pool._keepalive_expiry == 12.0
+    await request.shutdown()
+
+@pytest.mark.asyncio
+async def test_stats_record_wait_for_a_slot():
+    """Test that requests beyond the pool size wait and the wait is measured."""
+    async def do_request(self, *args, **kwargs):
+        await asyncio.sleep(0.05)
+        return 200, b'{}'
+
+    request = SharedRequest(pool_size=1)
+    with patch.object(HTTPXRequest, 'do_request', do_request):
+        await asyncio.gather(request.do_request('url', 'POST'), request.do_request('url', 'POST'))
+
+    stats = request.stats()
+    assert stats.requests == 2
+    assert stats.active == 0
+    assert stats.max_wait >= 0.04
+
+@pytest.mark.asyncio
+async def test_pool_timeout_raises_timed_out():
+    """Test that a request gives up when no slot frees up in time."""
+    async def do_request(self, *args, **kwargs):
+        await asyncio.sleep(0.2)
+        return 200, b'{}'
+
+    request = SharedRequest(pool_size=1, pool_timeout=0.01)
+    with patch.object(HTTPXRequest, 'do_request', do_request):
+        first = asyncio.create_task(request.do_request('url', 'POST'))
+        await asyncio.sleep(0)
+        with pytest.raises(TimedOut):
+            await request.do_request('url', 'POST')
+        await first
+
+def test_http2_falls_back_without_h2():
+    """Test that HTTP/2 is only enabled when h2 is installed."""
+    with patch('buzzing.bots_manager.shared_request.http2_available', return_value=False):
+        assert SharedRequest(http2=True).stats().http2 is False
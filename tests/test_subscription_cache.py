@@ -0,0 +1,150 @@
+"""Tests for SubscriptionCache and its propagation of DAO writes."""
+import asyncio
+import sqlite3
+from array import array
+import pytest
+from buzzing.cache.subscription_cache import SubscriptionCache, SubscriptionIndex
+from buzzing.dao.async_bots_config_dao import AsyncBotsConfigDao
+from buzzing.dao.async_sqlite import AsyncSQLite
+from buzzing.dao.bots_config_dao import BotsConfigDao
+from buzzing.dao.migrator import migrate
+from buzzing.model.subscription import Subscription
+
+@pytest.fixture
+def db_connection():
+    """Create a migrated in-memory SQLite database."""
+    conn = sqlite3.connect(':memory:', isolation_level=None)
+    migrate(conn)
+    return conn
+
+def test_index_membership_and_order():
+    """Test that the index answers membership and keeps user IDs sorted."""
+    index = SubscriptionIndex(1, [Subscription(3, 'c', 1, True), Subscription(1, 'a', 1, True),
+                                  Subscription(2, 'b', 1, False)])
+
+    assert 3 in index and 1 in index
+    assert 2 not in index
+    assert index.user_ids() == [1, 3]
+    assert list(index.snapshot()) == [1, 3]
+
+def test_cache_splits_subscriptions_per_bot():
+    """Test that each bot only sees its own subscribers."""
+    cache = SubscriptionCache([Subscription(1, 'a', 1, True), Subscription(2, 'b', 2, True)])
+
+    assert cache.index(1).user_ids() == [1]
+    assert cache.index(2).user_ids() == [2]
+    assert len(cache.index(3)) == 0
+
+def test_fetch_subscription_loads_username(db_connection):
+    """Test that a username the cache does not keep is loaded on demand."""
+    dao = BotsConfigDao(db_connection)
+    dao.subscribe(Subscription(7, 'user', 1, True))
+
+    assert dao.fetch_subscription(1, 7) == Subscription(7, 'user', 1, True)
+    assert dao.fetch_subscription(1, 8) is None
+
+@pytest.mark.asyncio
+async def test_dao_writes_update_live_index(db_connection):
+    """Test that committed subscribe/unsubscribe calls reach the live index."""
+    cache = SubscriptionCache()
+    index = cache.index(1)
+    dao = AsyncBotsConfigDao(AsyncSQLite.from_connection(db_connection), cache)
+
+    await dao.subscribe(Subscription(7, 'user', 1, True))
+    assert 7 in index
+
+    await dao.unsubscribe(Subscription(7, 'user', 1, False))
+    assert 7 not in index
+
+@pytest.mark.asyncio
+async def test_deactivate_subscriptions_prunes_index(db_connection):
+    """Test that many users are deactivated in one write and leave the live index."""
+    cache = SubscriptionCache()
+    index = cache.index(1)
+    dao = AsyncBotsConfigDao(AsyncSQLite.from_connection(db_connection), cache)
+    for user_id in (1, 2, 3):
+        await dao.subscribe(Subscription(user_id, 'user', 1, True))
+    await dao.unsubscribe(Subscription(3, 'user', 1, False))
+
+    assert await dao.deactivate_subscriptions(1, [1, 3, 4]) == 1
+
+    assert index.user_ids() == [2]
+    assert BotsConfigDao(db_connection).fetch_audience_page(1, -1, 10) == array('q', [2])
+
+@pytest.mark.asyncio
+async def test_failed_write_leaves_index_untouched(db_connection):
+    """Test that the index only changes when the write commits."""
+    cache = SubscriptionCache()
+    dao = AsyncBotsConfigDao(AsyncSQLite.from_connection(db_connection), cache)
+    db_connection.execute('DROP TABLE subscription')
+
+    with pytest.raises(sqlite3.Error):
+        await dao.subscribe(Subscription(7, 'user', 1, True))
+
+    assert 7 not in cache.index(1)
+
+@pytest.mark.asyncio
+async def test_stream_pages_by_keyset(db_connection):
+    """Test that audiences stream in ordered keyset pages."""
+    for user_id in (5, 1, 4, 2, 3):
+        db_connection.execute('INSERT INTO subscription (user_id, username, bot_id, is_active) VALUES (?, ?, 1, 1)',
+                              (user_id, f'user{user_id}'))
+    db_connection.execute("INSERT INTO subscription (user_id, username, bot_id, is_active) VALUES (6, 'x', 1, 0)")
+    dao = AsyncBotsConfigDao(AsyncSQLite.from_connection(db_connection))
+
+    pages = [list(page) async for page in dao.stream_audience(1, page_size=2)]
+    assert pages == [[1, 2], [3, 4], [5]]
+    assert [list(page) async for page in dao.stream_audience(1, page_size=5)] == [[1, 2, 3, 4, 5]]
+    assert [page async for page in dao.stream_audience(2)] == []
+
+@pytest.mark.asyncio
+async def test_lazy_index_loads_once_and_keeps_concurrent_writes():
+    """Test that concurrent loads share one stream and writes made meanwhile are kept."""
+    cache = SubscriptionCache(lazy=True)
+    index = cache.index(1)
+    streams = 0
+    first_page_read = asyncio.Event()
+    resume = asyncio.Event()
+
+    async def stream(bot_id):
+        nonlocal streams
+        streams += 1
+        yield array('q', [1, 2])
+        first_page_read.set()
+        await resume.wait()
+        yield array('q', [3, 4])
+
+    assert not index.loaded and len(index) == 0
+    loads = asyncio.gather(index.load(stream), index.load(stream))
+    await first_page_read.wait()
+    cache.apply(Subscription(9, 'new', 1, True))
+    cache.apply(Subscription(1, 'gone', 1, False))
+    resume.set()
+    await loads
+
+    assert streams == 1
+    assert index.loaded and index.user_ids() == [2, 3, 4, 9]
+    await index.load(stream)
+    assert streams == 1
+
+@pytest.mark.asyncio
+async def test_invalidate_during_load_streams_again():
+    """Test that a stream started before invalidate() is discarded."""
+    index = SubscriptionIndex(1, loaded=False)
+    pages = iter([[1], [2]])
+    started = asyncio.Event()
+    resume = asyncio.Event()
+
+    async def stream(bot_id):
+        page = next(pages)
+        started.set()
+        await resume.wait()
+        yield array('q', page)
+
+    loading = asyncio.ensure_future(index.load(stream))
+    await started.wait()
+    index.invalidate()
+    resume.set()
+    await loading
+
+    assert index.user_ids() == [2]
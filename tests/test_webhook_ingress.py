@@ -0,0 +1,112 @@
+"""Tests for WebhookIngress and the HTTP server it runs on."""
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from telegram import Update
+from buzzing.bots_manager.webhook_ingress import SECRET_HEADER, WebhookIngress
+
+UPDATE = {
+    'update_id': 1,
+    'message': {
+        'message_id': 7,
+        'date': 0,
+        'chat': {'id': 42, 'type': 'private'},
+        'text': '/help',
+    },
+}
+
+def make_application():
+    application = MagicMock()
+    application.bot.set_webhook = AsyncMock()
+    application.update_queue = asyncio.Queue()
+    return application
+
+async def post(port, path, body, headers=None):
+    """Send one POST like Telegram does and return the status code."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    payload = json.dumps(body).encode()
+    head = f'POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(payload)}\r\nConnection: close\r\n'
+    head += ''.join(f'{name}: {value}\r\n' for name, value in (headers or {}).items())
+    writer.write(head.encode() + b'\r\n' + payload)
+    await writer.drain()
+    status_line = await reader.readline()
+    writer.close()
+    return int(status_line.split()[1])
+
+@pytest.fixture
+async def ingress():
+    """Start an ingress on a free local port."""
+    ingress = WebhookIngress('https://bots.example.com', host='127.0.0.1', port=0)
+    await ingress.start()
+    yield ingress
+    await ingress.stop()
+
+@pytest.mark.asyncio
+async def test_register_sets_webhook(ingress):
+    """Test that registering a bot points its webhook at the ingress."""
+    application = make_application()
+    await ingress.register('bot', '123:abc', application)
+
+    kwargs = application.bot.set_webhook.await_args.kwargs
+    assert kwargs['url'] == 'https://bots.example.com' + WebhookIngress.path_for('123:abc')
+    assert kwargs['secret_token'] == ingress.secret_token
+
+@pytest.mark.asyncio
+async def test_updates_are_routed_to_their_bot(ingress):
+    """Test that each POSTed update lands on the right Application's queue."""
+    first, second = make_application(), make_application()
+    await ingress.register('first', '1:a', first)
+    await ingress.register('second', '2:b', second)
+
+    status = await post(ingress.server.port, WebhookIngress.path_for('2:b'), UPDATE,
+                        {SECRET_HEADER: ingress.secret_token})
+
+    assert status == 200
+    assert first.update_queue.empty()
+    update = second.update_queue.get_nowait()
+    assert isinstance(update, Update)
+    assert update.message.text == '/help'
+
+@pytest.mark.asyncio
+async def test_wrong_secret_is_rejected(ingress):
+    """Test that requests without the secret token are refused."""
+    application = make_application()
+    await ingress.register('bot', '1:a', application)
+
+    status = await post(ingress.server.port, WebhookIngress.path_for('1:a'), UPDATE, {SECRET_HEADER: 'guess'})
+
+    assert status == 403
+    assert application.update_queue.empty()
+
+@pytest.mark.asyncio
+async def test_unregistered_bot_is_not_found(ingress):
+    """Test that updates for an unregistered bot are not accepted."""
+    application = make_application()
+    await ingress.register('bot', '1:a', application)
+    ingress.unregister('1:a')
+
+    status = await post(ingress.server.port, WebhookIngress.path_for('1:a'), UPDATE,
+                        {SECRET_HEADER: ingress.secret_token})
+
+    assert status == 404
+
+@pytest.mark.asyncio
+async def test_keep_alive_connection_serves_several_requests(ingress):
+    """Test that one connection can carry consecutive updates."""
+    application = make_application()
+    await ingress.register('bot', '1:a', application)
+    reader, writer = await asyncio.open_connection('127.0.0.1', ingress.server.port)
+    payload = json.dumps(UPDATE).encode()
+    path = WebhookIngress.path_for('1:a')
+
+    for _ in range(3):
+        writer.write(f'POST {path} HTTP/1.1\r\nContent-Length: {len(payload)}\r\n'
+                     f'{SECRET_HEADER}: {ingress.secret_token}\r\n\r\n'.encode() + payload)
+        await writer.drain()
+        assert (await reader.readline()).split()[1] == b'200'
+        while (await reader.readline()) != b'\r\n':
+            pass
+    writer.close()
+
+    assert application.update_queue.qsize() == 3